@@ -3,15 +3,40 @@ Client for VSC API.
 """
 
 import base64
+import email.utils
+import functools
 import json
 import ipaddr
+import dns.exception
 import dns.resolver
 import random
+import re
+import StringIO
+import sys
+import threading
+import time
 import urllib
 import urllib2
+import urlparse
 import uuid
 
 from .errors import *
+from . import acl
+from .cache import ResponseCache, ValidatorCache
+from . import codec
+from .concurrency import WAIT_SLICE, Executor, Future
+from .endpoints import EndpointTracker
+from . import hedging
+from . import jobwatch
+from . import jsonstream
+from . import metrics
+from . import provision
+from . import rbac
+from . import records
+from .retry import RetryPolicy, isCreate
+from .pool import IDEMPOTENT_METHODS, ConnectError, ConnectionPool
+from .throttle import Throttle
+from . import transfer
 
 # ----------------------------------------------------------------------
 # local definitions
@@ -20,6 +45,13 @@ DEFAULT_HOSTNAME = 'api.vsc.com'
 DEFAULT_TCP_PORT = 8914
 DEFAULT_TIMEOUT = 5
 SRV_PREFIX = '_vsc-api-server._tcp.'
+SRV_NEGATIVE_TTL = 60
+SRV_STALE_TTL = 30
+MAX_REDIRECTS = 10
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PAGE_SIZE = 500
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+JSON_ARRAY_START = re.compile(r'\s*\[')
 ID_ALLOWED_CHARS = (
     "QWERTYUIOPASDFGHJKLZXCVBNMqwertyuiopasdfghjklzxcvbnm"
     "0123456789._-")
@@ -45,20 +77,51 @@ def checkIdOrRaise(xid):
 class VscApiClient():
     """
     VSC API Client implementation.
+    A client instance is safe to share between threads: the
+    connections are pooled and the credentials are sent by one
+    thread at a time while the others wait for the new cookie.
     """
 
+    # checked by AsyncVscApiClient before sharing the client
+    # between its worker threads
+    thread_safe = True
+
     __addrs = []
+    __hostname = None
+    __port = None
+    __endpoint = None
     __secure = True
     __username = None
     __password = None
     __user_id = None
     __cookie_key = None
     __stale_cookie_auth = False
+    __auth_cond = None
+    __authenticating = False
+    __sessions = None
+    __discovery = None
+    __role_graph = None
     __timeout = DEFAULT_TIMEOUT
+    __pool = None
+    __tracker = None
+    __cache = None
+    __validators = None
+    __instrument = None
+    __retry = None
+    __hedge = None
+    __throttle = None
+    __codec = None
+    __lazy_lists = False
 
     def __init__(self, username = None, password = None,
                  hostname = None, port = None, secure = True,
-                 timeout = None):
+                 timeout = None, pool = None, cache = None,
+                 validator_cache = None, instrument = None,
+                 retry_policy = None, hedge_policy = None,
+                 throttle = None, session_store = None,
+                 user_id = None, discover_user_id = False,
+                 role_graph = None, json_codec = None,
+                 lazy_lists = False):
         """
         Class constructor.
 
@@ -74,12 +137,99 @@ class VscApiClient():
         :type secure: boolean
         :param timeout: maximum timeout
         :type timeout: integer
-        """
+        :param pool: pool of persistent connections to use. Can be
+            shared between several clients. A private pool will be
+            created when not defined.
+        :type pool: instance of VscApiClient.pool.ConnectionPool or None
+        :param cache: cache for GET responses. Can be shared between
+            several clients. Responses are not cached when not defined.
+        :type cache: instance of VscApiClient.cache.ResponseCache or None
+        :param validator_cache: store of ETag/Last-Modified validators
+            of GET responses. When defined, GET requests are made
+            conditional and the previously decoded result is returned
+            when the server replies with '304 Not Modified'. Such
+            results are shared between calls and must not be modified.
+        :type validator_cache: instance of
+            VscApiClient.cache.ValidatorCache or None
+        :param instrument: hook to be notified about each request made,
+            with timings of the request phases. See
+            VscApiClient.metrics.HistogramCollector for an example.
+        :type instrument: instance of VscApiClient.metrics.Instrument
+            or None
+        :param retry_policy: policy of repeating idempotent requests
+            failed due to network errors or transient server errors.
+            Failed requests are not repeated when not defined.
+        :type retry_policy: instance of VscApiClient.retry.RetryPolicy
+            or None
+        :param hedge_policy: policy of hedging latency critical
+            read requests (jobGetData, whoami, jobGetForwardMap) when
+            several VSC API Servers are available. Requests are not
+            hedged when not defined.
+        :type hedge_policy: instance of
+            VscApiClient.hedging.HedgePolicy or None
+        :param throttle: limits of request rate and concurrency.
+            Requests are not limited when not defined.
+        :type throttle: instance of VscApiClient.throttle.Throttle
+            or None
+        :param session_store: persistent store of sessions shared
+            with other processes. When a session for the endpoint and
+            the username is found there, the authentication with the
+            credentials is skipped. Sessions are not stored when not
+            defined.
+        :type session_store: instance of
+            VscApiClient.session.SessionStore or None
+        :param user_id: UUID of the user, when known in advance.
+            Lets the list methods request user's resources directly
+            instead of following a redirect.
+        :type user_id: string or None
+        :param discover_user_id: when the user ID is neither given
+            nor found in the session store, learn it in background
+            right away, so even the first call of a list method
+            requests user's resources directly.
+        :type discover_user_id: boolean
+        :param role_graph: snapshot of the role hierarchy to keep up
+            to date on changes of roles and relations made by the
+            client. See aaaGetRoleGraph().
+        :type role_graph: instance of VscApiClient.rbac.RoleGraph
+            or None
+        :param json_codec: codec to encode requests and decode
+            responses with. The fastest codec installed is used
+            when not defined. See VscApiClient.codec.getCodec().
+        :type json_codec: instance of VscApiClient.codec.JsonCodec
+            or None
+        :param lazy_lists: return JSON arrays got in responses
+            as VscApiClient.codec.LazyList instances decoding their
+            elements on demand, instead of plain lists.
+        :type lazy_lists: boolean
+        """
+        self.__auth_cond = threading.Condition()
         self.__secure = secure
         if timeout is not None:
             self.__timeout = timeout
+        if pool is None:
+            pool = ConnectionPool()
+        self.__pool = pool
+        self.__cache = cache
+        self.__validators = validator_cache
+        self.__instrument = instrument
+        self.__retry = retry_policy
+        self.__hedge = hedge_policy
+        self.__throttle = throttle
+        self.__sessions = session_store
+        self.__role_graph = role_graph
+        if json_codec is None:
+            json_codec = codec.getCodec()
+        self.__codec = json_codec
+        self.__lazy_lists = lazy_lists
+        self.__tracker = EndpointTracker()
         self.setEndPoint(hostname, port)
         self.setAuth(username, password)
+        if user_id is not None:
+            checkIdOrRaise(user_id)
+            self.__user_id = user_id
+        elif discover_user_id and self.__user_id is None and \
+                username is not None and password is not None:
+            self.__discoverUserId(username)
 
     def setEndPoint(self, hostname = None, port = None):
         """
@@ -98,8 +248,20 @@ class VscApiClient():
                 self.__addrs = [(hostname, port)]
             else:
                 self.__addrs = [(hostname, DEFAULT_TCP_PORT)]
+            self.__hostname = None
+            self.__endpoint = '{0}:{1}'.format(*self.__addrs[0])
         except Exception:
-            self.__addrs = _resolve(hostname, port)
+            # resolve it right now to report DNS problems early.
+            # Addresses will be taken from the resolver cache on
+            # each request to follow DNS changes.
+            self.__addrs = [(srv_host, srv_port)
+                            for _prio, _weight, srv_host, srv_port
+                            in _resolve(hostname, port)]
+            self.__hostname = hostname
+            self.__port = port
+            self.__endpoint = hostname
+            if port is not None:
+                self.__endpoint += ':{0}'.format(port)
 
     def setAuth(self, username, password):
         """
@@ -110,20 +272,32 @@ class VscApiClient():
         :param password: Caller user password.
         :type password: string
         """
-        if username != self.__username:
-            self.__user_id = None
-        self.__username = username
-        self.__password = password
-        self.__stale_cookie_auth = True
+        with self.__auth_cond:
+            if username != self.__username:
+                self.__user_id = None
+            self.__username = username
+            self.__password = password
+            self.__stale_cookie_auth = True
+        self.__loadSession(username, password)
 
     def dropAuth(self):
         """
         Drop all authentication requisites for the Client.
         """
-        self.__username = None
-        self.__password = None
-        self.__user_id = None
-        self.__stale_cookie_auth = True
+        with self.__auth_cond:
+            self.__username = None
+            self.__password = None
+            self.__user_id = None
+            self.__stale_cookie_auth = True
+
+    def getEndPoint(self):
+        """
+        Return VSC API endpoint address as it was set: an IP address
+        with the port or a DNS name with the port, if any.
+
+        :rtype: string
+        """
+        return self.__endpoint
 
     def getCookieKey(self):
         """
@@ -132,6 +306,51 @@ class VscApiClient():
         """
         return self.__cookie_key
 
+    def getUserId(self):
+        """
+        Return UUID of the user or None if it is not known yet.
+        Waits for the user ID discovery started by the constructor,
+        if any.
+
+        :rtype: string or None
+        """
+        discovery = self.__discovery
+        if self.__user_id is None and discovery is not None:
+            # failed discovery is not an error: the user ID will be
+            # learned from the server responses later
+            discovery.exception()
+        return self.__user_id
+
+    def __discoverUserId(self, username):
+        """
+        Start learning the user ID in background.
+
+        :param username: user login name.
+        :type username: string
+        """
+
+        def discover():
+            user_id = self.whoami()
+            with self.__auth_cond:
+                if self.__user_id is None and \
+                        self.__username == username:
+                    self.__user_id = user_id
+
+        self.__discovery = Future()
+        thread = threading.Thread(target = self.__discovery._run,
+                                  args = (discover, (), {}))
+        thread.daemon = True
+        thread.start()
+
+    def getPoolStats(self):
+        """
+        Return usage counters of the connection pool, including
+        count of requests sent over reused connections.
+
+        :rtype: dict
+        """
+        return self.__pool.stats()
+
     # -----------------------------------------------------------------
     # VSC API bindings
     # -----------------------------------------------------------------
@@ -151,7 +370,11 @@ class VscApiClient():
         A server shall drop authentication connected to the cookie,
         if any is sent.
         """
-        return self._request('POST', '/logout')
+        cookie = self.__cookie_key
+        result = self._request('POST', '/logout')
+        if self.__sessions is not None and self.__username is not None:
+            self.__sessions.drop(self.__endpoint, self.__username, cookie)
+        return result
 
     def whoami(self):
         """
@@ -160,7 +383,7 @@ class VscApiClient():
 
         :rtype: string
         """
-        reply = self._request('GET', '/whoami')
+        reply = self._request('GET', '/whoami', hedge = True)
         return reply['id']
 
     # -----------------------------------------------------------------
@@ -209,7 +432,7 @@ class VscApiClient():
         """
         self._request('POST', 'aaa/passwd', None, password)
 
-    def aaaListUsers(self, format = 'ids_only'):
+    def aaaListUsers(self, format = 'ids_only', result_type = 'dict'):
         """
         Return a list of UUIDs of all users.
 
@@ -219,20 +442,62 @@ class VscApiClient():
             [user_id, user_data] lists, where each user_id is string and
             user_data is dict.
         :type format: string, one of ('ids_only', 'full').
-        :rtype: list of strings
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            Records and rows of the 'full' format have the user ID
+            as the 'id' key. See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list or instance of VscApiClient.records.RecordTable
         """
-        return self._request('GET', 'aaa/user', {'format': format})
+        return self._listAs('user', result_type, 'aaa/user',
+                            {'format': format})
 
-    def aaaGetUserData(self, user_id):
+    def iterUsers(self, format = 'ids_only'):
+        """
+        Iterate over all users.
+        The same as aaaListUsers() but the response is decoded
+        incrementally while it is read from the network and users
+        are yielded one by one, so memory consumption does not
+        depend on the count of users.
+
+        :param format: result format. See aaaListUsers() for details.
+        :type format: string, one of ('ids_only', 'full').
+        :rtype: generator of strings or [user_id, user_data] lists
+        """
+        return self._iterRequest('GET', 'aaa/user', {'format': format})
+
+    def aaaListUsersPaged(self, format = 'ids_only',
+                          page_size = DEFAULT_PAGE_SIZE, offset = 0):
+        """
+        Iterate over all users requesting them page by page.
+        The next page is requested in background while the current
+        one is processed. Iteration can be stopped at any time.
+
+        :param format: result format. See aaaListUsers() for details.
+        :type format: string, one of ('ids_only', 'full').
+        :param page_size: count of users requested at once.
+        :type page_size: positive integer
+        :param offset: count of users to skip.
+        :type offset: integer
+        :rtype: generator of strings or [user_id, user_data] lists
+        """
+        return self._iterPages('aaa/user', {'format': format},
+                               page_size, offset)
+
+    def aaaGetUserData(self, user_id, result_type = 'dict'):
         """
         Return user data dictionary.
 
         :param user_id: UUID of the user.
         :type user_id: string
-        :rtype: dict
+        :param result_type: 'dict' (default) or 'record' for
+            a compact record. See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: dict or instance of VscApiClient.records.Record
         """
         checkIdOrRaise(user_id)
-        return self._request('GET', 'aaa/user/{0}'.format(user_id))
+        return self._getAs('user', result_type,
+                           'aaa/user/{0}'.format(user_id))
 
     def aaaAddRole(self, data, role_id = None):
         """
@@ -251,6 +516,8 @@ class VscApiClient():
             checkIdOrRaise(role_id)
         url_path = 'aaa/role/{0}'.format(role_id)
         self._request('PUT', url_path, {'create': 1}, data)
+        if self.__role_graph is not None:
+            self.__role_graph.addRole(role_id, data)
         return role_id
 
     def aaaUpdateRole(self, role_id, data):
@@ -264,6 +531,8 @@ class VscApiClient():
         """
         checkIdOrRaise(role_id)
         self._request('PUT', 'aaa/role/{0}'.format(role_id), None, data)
+        if self.__role_graph is not None:
+            self.__role_graph.addRole(role_id, data)
 
     def aaaDelRole(self, role_id):
         """
@@ -274,8 +543,10 @@ class VscApiClient():
         """
         checkIdOrRaise(role_id)
         self._request('DELETE', 'aaa/role/{0}'.format(role_id))
+        if self.__role_graph is not None:
+            self.__role_graph.delRole(role_id)
 
-    def aaaListRoles(self, format = 'ids_only'):
+    def aaaListRoles(self, format = 'ids_only', result_type = 'dict'):
         """
         Return a list of UUIDs of all roles.
 
@@ -285,20 +556,48 @@ class VscApiClient():
             [role_id, role_data] lists, where each role_id is string and
             role_data is dict.
         :type format: string, one of ('ids_only', 'full').
-        :rtype: list of strings
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            Records and rows of the 'full' format have the role ID
+            as the 'id' key. See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list or instance of VscApiClient.records.RecordTable
         """
-        return self._request('GET', 'aaa/role', {'format': format})
+        return self._listAs('role', result_type, 'aaa/role',
+                            {'format': format})
 
-    def aaaGetRoleData(self, role_id):
+    def aaaListRolesPaged(self, format = 'ids_only',
+                          page_size = DEFAULT_PAGE_SIZE, offset = 0):
+        """
+        Iterate over all roles requesting them page by page.
+        The next page is requested in background while the current
+        one is processed. Iteration can be stopped at any time.
+
+        :param format: result format. See aaaListRoles() for details.
+        :type format: string, one of ('ids_only', 'full').
+        :param page_size: count of roles requested at once.
+        :type page_size: positive integer
+        :param offset: count of roles to skip.
+        :type offset: integer
+        :rtype: generator of strings or [role_id, role_data] lists
+        """
+        return self._iterPages('aaa/role', {'format': format},
+                               page_size, offset)
+
+    def aaaGetRoleData(self, role_id, result_type = 'dict'):
         """
         Return role data dictionary.
 
         :param role_id: UUID of the role.
         :type role_id: string
-        :rtype: dict
+        :param result_type: 'dict' (default) or 'record' for
+            a compact record. See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: dict or instance of VscApiClient.records.Record
         """
         checkIdOrRaise(role_id)
-        return self._request('GET', 'aaa/role/{0}'.format(role_id))
+        return self._getAs('role', result_type,
+                           'aaa/role/{0}'.format(role_id))
 
     def aaaAddRoleRoleRelation(self, major_id, minor_id):
         """
@@ -315,6 +614,8 @@ class VscApiClient():
         checkIdOrRaise(minor_id)
         url_path = 'aaa/role/{0}/minors/{1}'.format(major_id, minor_id)
         self._request('PUT', url_path)
+        if self.__role_graph is not None:
+            self.__role_graph.addRelation(major_id, minor_id)
 
     def aaaDelRoleRoleRelation(self, major_id, minor_id):
         """
@@ -331,6 +632,8 @@ class VscApiClient():
         checkIdOrRaise(minor_id)
         url_path = 'aaa/role/{0}/minors/{1}'.format(major_id, minor_id)
         self._request('DELETE', url_path)
+        if self.__role_graph is not None:
+            self.__role_graph.delRelation(major_id, minor_id)
 
     def aaaSetRoleMinors(self, major_id, minor_ids):
         """
@@ -350,6 +653,8 @@ class VscApiClient():
         checkIdOrRaise(major_id)
         url_path = 'aaa/role/{0}/minors'.format(major_id)
         self._request('PUT', url_path, None, minor_ids)
+        if self.__role_graph is not None:
+            self.__role_graph.setMinors(major_id, minor_ids)
 
     def aaaListRoleMinors(self, major_id):
         """
@@ -390,6 +695,8 @@ class VscApiClient():
         checkIdOrRaise(role_id)
         url_path = 'aaa/user/{0}/roles/{1}'.format(user_id, role_id)
         self._request('PUT', url_path)
+        if self.__role_graph is not None:
+            self.__role_graph.addUserRole(user_id, role_id)
 
     def aaaDelUserRoleRelation(self, user_id, role_id):
         """
@@ -405,6 +712,8 @@ class VscApiClient():
         checkIdOrRaise(role_id)
         url_path = 'aaa/user/{0}/roles/{1}'.format(user_id, role_id)
         self._request('DELETE', url_path)
+        if self.__role_graph is not None:
+            self.__role_graph.delUserRole(user_id, role_id)
 
     def aaaSetUserRoles(self, user_id, role_ids):
         """
@@ -424,6 +733,8 @@ class VscApiClient():
         checkIdOrRaise(user_id)
         url_path = 'aaa/user/{0}/roles'.format(user_id)
         self._request('PUT', url_path, None, role_ids)
+        if self.__role_graph is not None:
+            self.__role_graph.setUserRoles(user_id, role_ids)
 
     def aaaListUserRoles(self, user_id):
         """
@@ -449,6 +760,77 @@ class VscApiClient():
         url_path = 'aaa/role/{0}/users'.format(role_id)
         return self._request('GET', url_path)
 
+    def aaaGetRoleGraph(self, with_users = False,
+                        concurrency = DEFAULT_CONCURRENCY):
+        """
+        Load the role hierarchy (and roles assigned to users, when
+        requested) in bulk and return it as a snapshot answering
+        transitive questions, like effective roles of a user, in
+        memory. The snapshot is attached to the client, so further
+        changes of roles and relations made by the client are applied
+        to it incrementally. Calling the method again reloads it.
+
+        :param with_users: load roles assigned to users too.
+        :type with_users: boolean
+        :param concurrency: maximum count of requests sent at once.
+        :type concurrency: positive integer
+        :rtype: instance of VscApiClient.rbac.RoleGraph
+        """
+        graph = self.__role_graph
+        if graph is None:
+            graph = rbac.RoleGraph()
+        graph.load(self, with_users, concurrency)
+        self.__role_graph = graph
+        return graph
+
+    def aaaSync(self, desired, concurrency = DEFAULT_CONCURRENCY,
+                dry_run = False):
+        """
+        Bring role-to-role and user-to-role relations to the desired
+        state, adding and removing only the relations which differ.
+        See VscApiClient.rbac.sync() for the desired state format
+        and the result details.
+
+        :param desired: dict with 'role_minors' and 'user_roles' keys.
+        :type desired: dict
+        :param concurrency: maximum count of requests sent at once.
+        :type concurrency: positive integer
+        :param dry_run: only compute the changes, do not make them.
+        :type dry_run: boolean
+        :rtype: dict of change: (None or instance of Exception)
+        """
+        for key in ('role_minors', 'user_roles'):
+            for entity_id, role_ids in (desired.get(key) or {}).items():
+                checkIdOrRaise(entity_id)
+                for role_id in role_ids:
+                    checkIdOrRaise(role_id)
+        return rbac.sync(self, desired, concurrency, dry_run)
+
+    def bulkProvision(self, spec, concurrency = DEFAULT_CONCURRENCY):
+        """
+        Create users and roles and relations between them in bulk.
+        Operations are done concurrently, in order of their
+        dependencies: users and roles first, relations then.
+        A failed operation does not abort the others, only the
+        operations depending on it are skipped.
+        See VscApiClient.provision.provision() for the spec format
+        and the result details.
+
+        :param spec: dict with 'users', 'roles', 'role_minors' and
+            'user_roles' keys.
+        :type spec: dict
+        :param concurrency: maximum count of requests sent at once.
+        :type concurrency: positive integer
+        :rtype: dict of operation: (None or instance of Exception)
+        """
+        for key in ('users', 'roles', 'role_minors', 'user_roles'):
+            for entity_id, value in (spec.get(key) or {}).items():
+                checkIdOrRaise(entity_id)
+                if key in ('role_minors', 'user_roles'):
+                    for role_id in value:
+                        checkIdOrRaise(role_id)
+        return provision.provision(self, spec, concurrency)
+
     def jobAdd(self, data, job_id = None):
         """
         Create a new job and enqueue it.
@@ -469,7 +851,8 @@ class VscApiClient():
         self._request('PUT', url_path, {'create': 1}, data)
         return job_id
 
-    def jobGetData(self, job_id, format = 'basic'):
+    def jobGetData(self, job_id, format = 'basic',
+                   result_type = 'dict'):
         """
         Return Job info.
         Format can be 'basic' which is the default and 'full' which
@@ -480,13 +863,55 @@ class VscApiClient():
         :type job_id: string
         :param format: result format.
         :type format: 'basic' or 'full'
-        :rtype: dict
+        :param result_type: 'dict' (default) or 'record' for
+            a compact record. See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: dict or instance of VscApiClient.records.Record
         """
         checkIdOrRaise(job_id)
         if format not in ('basic', 'full'):
             raise BadArgError('Bad format value')
         url_path = 'job/{0}'.format(job_id)
-        return self._request('GET', url_path, {'format': format})
+        return self._getAs('job', result_type, url_path,
+                           {'format': format}, True)
+
+    def jobGetDataMany(self, job_ids, format = 'basic',
+                       concurrency = DEFAULT_CONCURRENCY):
+        """
+        Return info for many jobs at once.
+        Requests are sent concurrently over pooled connections.
+        A failure to get info for a job does not abort the others:
+        the exception is returned in place of the job info.
+
+        :param job_ids: UUIDs of the jobs.
+        :type job_ids: iterable of strings
+        :param format: result format.
+        :type format: 'basic' or 'full'
+        :param concurrency: maximum count of requests sent
+            at the same time.
+        :type concurrency: positive integer
+        :rtype: dict of job_id: (dict or instance of Exception)
+        """
+        job_ids = list(job_ids)
+        for job_id in job_ids:
+            checkIdOrRaise(job_id)
+        if format not in ('basic', 'full'):
+            raise BadArgError('Bad format value')
+        job_ids = acl._unique(job_ids)
+        if not job_ids:
+            return {}
+        with Executor(min(concurrency, len(job_ids))) as executor:
+            futures = [(job_id,
+                        executor.submit(self.jobGetData, job_id, format))
+                       for job_id in job_ids]
+        result = {}
+        for job_id, future in futures:
+            exception = future.exception()
+            if exception is not None:
+                result[job_id] = exception
+            else:
+                result[job_id] = future.result()
+        return result
 
     def jobStop(self, job_id, save = False,
                 saved_name = None, saved_description = None,
@@ -521,7 +946,8 @@ class VscApiClient():
         url = 'job/{0}/stop'.format(job_id)
         self._request('POST', url, params, entity)
 
-    def jobList(self, format = 'basic', historic = False):
+    def jobList(self, format = 'basic', historic = False,
+                result_type = 'dict'):
         """
         Return list of user's jobs.
         Format of the list is defined by the 'format' argument
@@ -538,21 +964,27 @@ class VscApiClient():
         :type format: 'basic', 'full' or 'ids_only'.
         :param historic: which jobs will be returned.
         :type historic: boolean
-        :rtype: list
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list or instance of VscApiClient.records.RecordTable
         """
         if format not in ('basic', 'full', 'ids_only'):
             raise BadArgError('Bad format value')
         if not isinstance(historic, bool):
             raise BadArgError('Bad value for "historic"')
-        if self.__user_id is not None:
+        user_id = self.getUserId()
+        if user_id is not None:
             # user ID already known. requesting directly
-            return self.jobListAll(format, historic, self.__user_id)
+            return self.jobListAll(format, historic, user_id,
+                                   result_type)
         # user ID is not known yet. requesting redirection
         params = {'format': format, 'historic': int(historic)}
-        return self._request('GET', 'list_jobs', params)
+        return self._listAs('job', result_type, 'list_jobs', params)
 
     def jobListAll(self, format = 'basic', historic = False,
-                   user_id = None):
+                   user_id = None, result_type = 'dict'):
         """
         Return list of jobs.
         Format of the list is defined by the 'format' argument
@@ -573,7 +1005,37 @@ class VscApiClient():
         :type historic: boolean
         :param user_id: UUID of the job's owner.
         :type user_id: string or None
-        :rtype: list
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list or instance of VscApiClient.records.RecordTable
+        """
+        if format not in ('basic', 'full', 'ids_only'):
+            raise BadArgError('Bad format value')
+        if not isinstance(historic, bool):
+            raise BadArgError('Bad value for "historic"')
+        params = {'format': format, 'historic': int(historic)}
+        if user_id is not None:
+            params['user'] = user_id
+        return self._listAs('job', result_type, 'job', params)
+
+    def iterJobListAll(self, format = 'basic', historic = False,
+                       user_id = None):
+        """
+        Iterate over jobs.
+        The same as jobListAll() but the response is decoded
+        incrementally while it is read from the network and jobs
+        are yielded one by one, so memory consumption does not
+        depend on the count of jobs.
+
+        :param format: result format type.
+        :type format: 'basic', 'full' or 'ids_only'.
+        :param historic: which jobs will be returned.
+        :type historic: boolean
+        :param user_id: UUID of the job's owner.
+        :type user_id: string or None
+        :rtype: generator of dicts or strings
         """
         if format not in ('basic', 'full', 'ids_only'):
             raise BadArgError('Bad format value')
@@ -582,7 +1044,89 @@ class VscApiClient():
         params = {'format': format, 'historic': int(historic)}
         if user_id is not None:
             params['user'] = user_id
-        return self._request('GET', 'job', params)
+        return self._iterRequest('GET', 'job', params)
+
+    def jobListAllPaged(self, format = 'basic', historic = False,
+                        user_id = None, page_size = DEFAULT_PAGE_SIZE,
+                        offset = 0):
+        """
+        Iterate over jobs requesting them page by page.
+        The next page is requested in background while the current
+        one is processed. Iteration can be stopped at any time.
+
+        :param format: result format type.
+        :type format: 'basic', 'full' or 'ids_only'.
+        :param historic: which jobs will be returned.
+        :type historic: boolean
+        :param user_id: UUID of the job's owner.
+        :type user_id: string or None
+        :param page_size: count of jobs requested at once.
+        :type page_size: positive integer
+        :param offset: count of jobs to skip.
+        :type offset: integer
+        :rtype: generator of dicts or strings
+        """
+        if format not in ('basic', 'full', 'ids_only'):
+            raise BadArgError('Bad format value')
+        if not isinstance(historic, bool):
+            raise BadArgError('Bad value for "historic"')
+        params = {'format': format, 'historic': int(historic)}
+        if user_id is not None:
+            params['user'] = user_id
+        return self._iterPages('job', params, page_size, offset)
+
+    def jobWatch(self, job_ids, until_states = None, timeout = None,
+                 all_users = False):
+        """
+        Watch the jobs and yield their state transitions as
+        (job_id, old_state, new_state, job_data) tuples.
+        A single jobList() request (jobListAll() for all_users)
+        is sent per poll whatever the count of the jobs is, and
+        the poll interval grows while nothing changes.
+        A job is not watched anymore as soon as it reaches one of
+        until_states or leaves the list of active jobs.
+
+        :param job_ids: UUIDs of the jobs.
+        :type job_ids: iterable of strings
+        :param until_states: states to stop watching at.
+        :type until_states: iterable of strings or None
+        :param timeout: maximum time to watch, in seconds.
+        :type timeout: number or None
+        :param all_users: watch jobs of other users too.
+            Requires extra privileges.
+        :type all_users: boolean
+        :rtype: generator of tuples
+        """
+        job_ids = list(job_ids)
+        for job_id in job_ids:
+            checkIdOrRaise(job_id)
+        return jobwatch.watchJobs(self, job_ids, until_states, timeout,
+                                  all_users)
+
+    def jobWait(self, job_ids, until_states = None, timeout = None,
+                all_users = False):
+        """
+        Wait until each job reaches one of until_states or leaves
+        the list of active jobs.
+        Return the last known state of each job (None for jobs
+        which cannot be found).
+
+        :param job_ids: UUIDs of the jobs.
+        :type job_ids: iterable of strings
+        :param until_states: states to wait for.
+        :type until_states: iterable of strings or None
+        :param timeout: maximum time to wait, in seconds.
+        :type timeout: number or None
+        :param all_users: wait for jobs of other users too.
+            Requires extra privileges.
+        :type all_users: boolean
+        :rtype: dict of job_id: state
+        """
+        job_ids = list(job_ids)
+        for job_id in job_ids:
+            checkIdOrRaise(job_id)
+        return jobwatch.waitJobs(self, job_ids, until_states, timeout,
+                                 all_users)
 
     def jobForward(self, job_id, tcp_ports):
         """
@@ -610,18 +1154,22 @@ class VscApiClient():
         """
         checkIdOrRaise(job_id)
         url_path = '/job/{0}/fwd'.format(job_id)
-        return self._request('GET', url_path)
+        return self._request('GET', url_path, hedge = True)
 
-    def packageGetData(self, package_id):
+    def packageGetData(self, package_id, result_type = 'dict'):
         """
         Return package info.
 
         :param package_id: UUID of the package.
         :type package_id: string
-        :rtype: dict
+        :param result_type: 'dict' (default) or 'record' for
+            a compact record. See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: dict or instance of VscApiClient.records.Record
         """
         checkIdOrRaise(package_id)
-        return self._request('GET', 'package/{0}'.format(package_id))
+        return self._getAs('package', result_type,
+                           'package/{0}'.format(package_id))
 
     def packageGetAcl(self, package_id):
         """
@@ -697,7 +1245,53 @@ class VscApiClient():
         checkIdOrRaise(package_id)
         self._request('DELETE', 'package/{0}/acl'.format(package_id))
 
-    def packageList(self, format = 'full'):
+    def packageGetAclMany(self, package_ids,
+                          concurrency = DEFAULT_CONCURRENCY):
+        """
+        Return ACLs of many packages at once.
+        Requests are sent concurrently over pooled connections.
+        A failure to get an ACL does not abort the others: the
+        exception is returned in place of the ACL.
+
+        :param package_ids: UUIDs of the packages.
+        :type package_ids: iterable of strings
+        :param concurrency: maximum count of requests sent at once.
+        :type concurrency: positive integer
+        :rtype: dict of package_id: (list or instance of Exception)
+        """
+        package_ids = list(package_ids)
+        for package_id in package_ids:
+            checkIdOrRaise(package_id)
+        return acl.getAcls(self, 'package', package_ids, concurrency)
+
+    def packageTransformAcls(self, package_ids, transform,
+                             concurrency = DEFAULT_CONCURRENCY,
+                             dry_run = False):
+        """
+        Read ACLs of many packages, pass each through the transform
+        function and write back only the ACLs which have changed.
+        Requests are sent concurrently. Return a report of changes
+        for each package; see VscApiClient.acl.transformAcls() for
+        details.
+
+        :param package_ids: UUIDs of the packages.
+        :type package_ids: iterable of strings
+        :param transform: function called with the package ID and its
+            ACL, returning the new ACL.
+        :type transform: callable
+        :param concurrency: maximum count of requests sent at once.
+        :type concurrency: positive integer
+        :param dry_run: only report the changes, do not write them.
+        :type dry_run: boolean
+        :rtype: dict of package_id: dict
+        """
+        package_ids = list(package_ids)
+        for package_id in package_ids:
+            checkIdOrRaise(package_id)
+        return acl.transformAcls(self, 'package', package_ids, transform,
+                                 concurrency, dry_run)
+
+    def packageList(self, format = 'full', result_type = 'dict'):
         """
         List packages owned by the caller.
 
@@ -707,17 +1301,25 @@ class VscApiClient():
             found), and the latter case the method will return a plain
             list of UUID of packages found.
         :type format: string
-        :rtype: list of dicts or list of strings
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list of dicts or list of strings or
+            instance of VscApiClient.records.RecordTable
         """
         if format not in ('full', 'ids_only'):
             raise BadArgError('Bad format value')
-        if self.__user_id is not None:
+        user_id = self.getUserId()
+        if user_id is not None:
             # user ID already known. requesting directly
-            return self.packageListAll(format, self.__user_id)
+            return self.packageListAll(format, user_id, result_type)
         # user ID is not known yet. requesting redirection
-        return self._request('GET', 'list_packages', {'format': format})
+        return self._listAs('package', result_type, 'list_packages',
+                            {'format': format})
 
-    def packageListAll(self, format = 'full', user_id = None):
+    def packageListAll(self, format = 'full', user_id = None,
+                        result_type = 'dict'):
         """
         List all packages.
 
@@ -730,25 +1332,78 @@ class VscApiClient():
         :param user_id: UUID of the package's owner. If defined,
             only packages owned by the user will be searched.
         :type user_id: string or None
-        :rtype: list of dicts or list of strings
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list of dicts or list of strings or
+            instance of VscApiClient.records.RecordTable
+        """
+        if format not in ('full', 'ids_only'):
+            raise BadArgError('Bad format value')
+        params = {'format': format}
+        if user_id is not None:
+            params['user'] = user_id
+        return self._listAs('package', result_type, 'package', params)
+
+    def iterPackages(self, format = 'full', user_id = None):
+        """
+        Iterate over packages.
+        The same as packageListAll() but the response is decoded
+        incrementally while it is read from the network and packages
+        are yielded one by one.
+
+        :param format: result format. See packageListAll() for details.
+        :type format: string
+        :param user_id: UUID of the package's owner.
+        :type user_id: string or None
+        :rtype: generator of dicts or strings
+        """
+        if format not in ('full', 'ids_only'):
+            raise BadArgError('Bad format value')
+        params = {'format': format}
+        if user_id is not None:
+            params['user'] = user_id
+        return self._iterRequest('GET', 'package', params)
+
+    def packageListAllPaged(self, format = 'full', user_id = None,
+                            page_size = DEFAULT_PAGE_SIZE, offset = 0):
+        """
+        Iterate over packages requesting them page by page.
+        The next page is requested in background while the current
+        one is processed. Iteration can be stopped at any time.
+
+        :param format: result format. See packageListAll() for details.
+        :type format: string
+        :param user_id: UUID of the package's owner.
+        :type user_id: string or None
+        :param page_size: count of packages requested at once.
+        :type page_size: positive integer
+        :param offset: count of packages to skip.
+        :type offset: integer
+        :rtype: generator of dicts or strings
         """
         if format not in ('full', 'ids_only'):
             raise BadArgError('Bad format value')
         params = {'format': format}
         if user_id is not None:
             params['user'] = user_id
-        return self._request('GET', 'package', params)
+        return self._iterPages('package', params, page_size, offset)
 
-    def imageGetData(self, image_id):
+    def imageGetData(self, image_id, result_type = 'dict'):
         """
         Return image info.
 
         :param image_id: UUID of the image.
         :type image_id: string
-        :rtype: dict
+        :param result_type: 'dict' (default) or 'record' for
+            a compact record. See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: dict or instance of VscApiClient.records.Record
         """
         checkIdOrRaise(image_id)
-        return self._request('GET', 'image/{0}'.format(image_id))
+        return self._getAs('image', result_type,
+                           'image/{0}'.format(image_id))
 
     def imageGetAcl(self, image_id):
         """
@@ -773,6 +1428,57 @@ class VscApiClient():
         checkIdOrRaise(image_id)
         return self._request('GET', 'image/{0}/genurl'.format(image_id))
 
+    def imageDownload(self, image_id, dest,
+                      chunk_size = transfer.DEFAULT_CHUNK_SIZE,
+                      concurrency = transfer.DEFAULT_CONCURRENCY):
+        """
+        Download the image archive to the file.
+        Chunks of the archive are fetched concurrently with HTTP Range
+        requests. An interrupted download is resumed by the next call
+        and an expired download URL is regenerated automatically.
+        Return download statistics; see
+        VscApiClient.transfer.download() for details.
+
+        :param image_id: UUID of the image.
+        :type image_id: string
+        :param dest: path to the destination file.
+        :type dest: string
+        :param chunk_size: size of a chunk, in bytes.
+        :type chunk_size: positive integer
+        :param concurrency: maximum count of chunks fetched at once.
+        :type concurrency: positive integer
+        :rtype: dict
+        """
+        checkIdOrRaise(image_id)
+        return transfer.download(self, image_id, dest, chunk_size,
+                                 concurrency)
+
+    def imageUpload(self, image_id, path,
+                    chunk_size = transfer.DEFAULT_CHUNK_SIZE,
+                    concurrency = transfer.DEFAULT_CONCURRENCY):
+        """
+        Upload the image archive from the file to VSC Image Receivers.
+        The image must be created with imageCreate() beforehand.
+        The file is streamed in chunks sent concurrently to all
+        receivers returned by getImageReceiverBaseURLs(). An
+        interrupted upload is resumed by the next call.
+        Return upload statistics including the throughput; see
+        VscApiClient.transfer.upload() for details.
+
+        :param image_id: UUID of the image.
+        :type image_id: string
+        :param path: path to the image archive.
+        :type path: string
+        :param chunk_size: size of a chunk, in bytes.
+        :type chunk_size: positive integer
+        :param concurrency: maximum count of chunks sent at once.
+        :type concurrency: positive integer
+        :rtype: dict
+        """
+        checkIdOrRaise(image_id)
+        return transfer.upload(self, image_id, path, chunk_size,
+                               concurrency)
+
     def imageCreate(self, data, image_id = None):
         """
         Create a new image.
@@ -836,7 +1542,53 @@ class VscApiClient():
         checkIdOrRaise(image_id)
         self._request('DELETE', 'image/{0}/acl'.format(image_id))
 
-    def imageList(self, format = 'full'):
+    def imageGetAclMany(self, image_ids,
+                        concurrency = DEFAULT_CONCURRENCY):
+        """
+        Return ACLs of many images at once.
+        Requests are sent concurrently over pooled connections.
+        A failure to get an ACL does not abort the others: the
+        exception is returned in place of the ACL.
+
+        :param image_ids: UUIDs of the images.
+        :type image_ids: iterable of strings
+        :param concurrency: maximum count of requests sent at once.
+        :type concurrency: positive integer
+        :rtype: dict of image_id: (list or instance of Exception)
+        """
+        image_ids = list(image_ids)
+        for image_id in image_ids:
+            checkIdOrRaise(image_id)
+        return acl.getAcls(self, 'image', image_ids, concurrency)
+
+    def imageTransformAcls(self, image_ids, transform,
+                           concurrency = DEFAULT_CONCURRENCY,
+                           dry_run = False):
+        """
+        Read ACLs of many images, pass each through the transform
+        function and write back only the ACLs which have changed.
+        Requests are sent concurrently. Return a report of changes
+        for each image; see VscApiClient.acl.transformAcls() for
+        details.
+
+        :param image_ids: UUIDs of the images.
+        :type image_ids: iterable of strings
+        :param transform: function called with the image ID and its
+            ACL, returning the new ACL.
+        :type transform: callable
+        :param concurrency: maximum count of requests sent at once.
+        :type concurrency: positive integer
+        :param dry_run: only report the changes, do not write them.
+        :type dry_run: boolean
+        :rtype: dict of image_id: dict
+        """
+        image_ids = list(image_ids)
+        for image_id in image_ids:
+            checkIdOrRaise(image_id)
+        return acl.transformAcls(self, 'image', image_ids, transform,
+                                 concurrency, dry_run)
+
+    def imageList(self, format = 'full', result_type = 'dict'):
         """
         List images owned by the caller.
 
@@ -846,17 +1598,25 @@ class VscApiClient():
             found), and the latter case the method will return a plain
             list of UUID of images found.
         :type format: string
-        :rtype: list of dicts or list of strings
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list of dicts or list of strings or
+            instance of VscApiClient.records.RecordTable
         """
         if format not in ('full', 'ids_only'):
             raise BadArgError('Bad format value')
-        if self.__user_id is not None:
+        user_id = self.getUserId()
+        if user_id is not None:
             # user ID already known. requesting directly
-            return self.imageListAll(format, self.__user_id)
+            return self.imageListAll(format, user_id, result_type)
         # user ID is not known yet. requesting redirection
-        return self._request('GET', 'list_images', {'format': format})
+        return self._listAs('image', result_type, 'list_images',
+                            {'format': format})
 
-    def imageListAll(self, format = 'full', user_id = None):
+    def imageListAll(self, format = 'full', user_id = None,
+                      result_type = 'dict'):
         """
         List all images.
 
@@ -869,14 +1629,63 @@ class VscApiClient():
         :param user_id: UUID of the image's owner. If defined,
             only images owned by the user will be searched.
         :type user_id: string or None
-        :rtype: list of dicts or list of strings
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list of dicts or list of strings or
+            instance of VscApiClient.records.RecordTable
         """
         if format not in ('full', 'ids_only'):
             raise BadArgError('Bad format value')
         params = {'format': format}
         if user_id is not None:
             params['user'] = user_id
-        return self._request('GET', 'image', params)
+        return self._listAs('image', result_type, 'image', params)
+
+    def iterImages(self, format = 'full', user_id = None):
+        """
+        Iterate over images.
+        The same as imageListAll() but the response is decoded
+        incrementally while it is read from the network and images
+        are yielded one by one.
+
+        :param format: result format. See imageListAll() for details.
+        :type format: string
+        :param user_id: UUID of the image's owner.
+        :type user_id: string or None
+        :rtype: generator of dicts or strings
+        """
+        if format not in ('full', 'ids_only'):
+            raise BadArgError('Bad format value')
+        params = {'format': format}
+        if user_id is not None:
+            params['user'] = user_id
+        return self._iterRequest('GET', 'image', params)
+
+    def imageListAllPaged(self, format = 'full', user_id = None,
+                          page_size = DEFAULT_PAGE_SIZE, offset = 0):
+        """
+        Iterate over images requesting them page by page.
+        The next page is requested in background while the current
+        one is processed. Iteration can be stopped at any time.
+
+        :param format: result format. See imageListAll() for details.
+        :type format: string
+        :param user_id: UUID of the image's owner.
+        :type user_id: string or None
+        :param page_size: count of images requested at once.
+        :type page_size: positive integer
+        :param offset: count of images to skip.
+        :type offset: integer
+        :rtype: generator of dicts or strings
+        """
+        if format not in ('full', 'ids_only'):
+            raise BadArgError('Bad format value')
+        params = {'format': format}
+        if user_id is not None:
+            params['user'] = user_id
+        return self._iterPages('image', params, page_size, offset)
 
     def getImageReceiverBaseURLs(self):
         """
@@ -938,7 +1747,7 @@ class VscApiClient():
         checkIdOrRaise(job_profile_id)
         self._request('DELETE', 'job_profile/' + job_profile_id)
 
-    def jobProfileList(self, format = 'full'):
+    def jobProfileList(self, format = 'full', result_type = 'dict'):
         """
         List job profiles owned by the current user.
 
@@ -947,18 +1756,25 @@ class VscApiClient():
             of (id, dict) pairs for each job profile, and the latter case
             the method will return a plain list of UUID of job profiles found.
         :type format: string
-        :rtype: list of (id, dict) pairs or list of strings
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            Records and rows of the 'full' format have the job profile
+            ID as the 'id' key. See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list of (id, dict) pairs or list of strings or
+            instance of VscApiClient.records.RecordTable
         """
         if format not in ('full', 'ids_only'):
             raise BadArgError('Bad format value')
-        if self.__user_id is not None:
+        user_id = self.getUserId()
+        if user_id is not None:
             # user ID already known. requesting directly
-            return self.jobProfileListAll(format, self.__user_id)
+            return self.jobProfileListAll(format, user_id, result_type)
         # user ID is not known yet. requesting redirection
-        return self._request('GET', 'list_job_profiles',
-            {'format': format})
+        return self._listAs('job_profile', result_type,
+                            'list_job_profiles', {'format': format})
 
-    def jobProfileListPublic(self, format = 'full'):
+    def jobProfileListPublic(self, format = 'full', result_type = 'dict'):
         """
         List all public job profiles.
 
@@ -967,14 +1783,21 @@ class VscApiClient():
             of (id, dict) pairs for each job profile, and the latter case
             the method will return a plain list of UUID of job profiles found.
         :type format: string
-        :rtype: list of (id, dict) pairs or list of strings
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            Records and rows of the 'full' format have the job profile
+            ID as the 'id' key. See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list of (id, dict) pairs or list of strings or
+            instance of VscApiClient.records.RecordTable
         """
         if format not in ('full', 'ids_only'):
             raise BadArgError('Bad format value')
-        return self._request('GET', 'list_public_job_profiles',
-            {'format': format})
+        return self._listAs('job_profile', result_type,
+                            'list_public_job_profiles', {'format': format})
 
-    def jobProfileListAll(self, format = 'full', user_id = None):
+    def jobProfileListAll(self, format = 'full', user_id = None,
+                          result_type = 'dict'):
         """
         List all job profiles. If the user_id is defined,
         the method will list all job profiles owned by the user.
@@ -987,21 +1810,97 @@ class VscApiClient():
         :param user_id: UUID of the job profile's owner. If defined,
             only job profiles owned by the user will be searched.
         :type user_id: string or None
-        :rtype: list of (id, dict) pairs or list of strings
+        :param result_type: 'dict' (default), 'record' for a list
+            of compact records or 'table' for a column oriented table.
+            Records and rows of the 'full' format have the job profile
+            ID as the 'id' key. See VscApiClient.records for details.
+        :type result_type: string
+        :rtype: list of (id, dict) pairs or list of strings or
+            instance of VscApiClient.records.RecordTable
+        """
+        if format not in ('full', 'ids_only'):
+            raise BadArgError('Bad format value')
+        params = {'format': format}
+        if user_id is not None:
+            params['user'] = user_id
+        return self._listAs('job_profile', result_type,
+                            'list_job_profiles', params)
+
+    def jobProfileListAllPaged(self, format = 'full', user_id = None,
+                               page_size = DEFAULT_PAGE_SIZE, offset = 0):
+        """
+        Iterate over job profiles requesting them page by page.
+        The next page is requested in background while the current
+        one is processed. Iteration can be stopped at any time.
+
+        :param format: result format. See jobProfileListAll() for details.
+        :type format: string
+        :param user_id: UUID of the job profile's owner.
+        :type user_id: string or None
+        :param page_size: count of job profiles requested at once.
+        :type page_size: positive integer
+        :param offset: count of job profiles to skip.
+        :type offset: integer
+        :rtype: generator of (id, dict) pairs or strings
         """
         if format not in ('full', 'ids_only'):
             raise BadArgError('Bad format value')
         params = {'format': format}
         if user_id is not None:
             params['user'] = user_id
-        return self._request('GET', 'list_job_profiles', params)
+        return self._iterPages('list_job_profiles', params, page_size,
+                               offset)
 
     # -----------------------------------------------------------------
     # Internal methods
     # -----------------------------------------------------------------
 
+    def _getAs(self, kind, result_type, path, params = None,
+               hedge = False):
+        """
+        Get the object and return it as the result type.
+
+        :param kind: kind of the object. See VscApiClient.records.
+        :type kind: string
+        :param result_type: 'dict' or 'record'.
+        :type result_type: string
+        :param path: URL path of the object.
+        :type path: string
+        :param params: extra URL parameters.
+        :type params: dict or None
+        :param hedge: hedge the request. See _request().
+        :type hedge: boolean
+        :rtype: dict or instance of VscApiClient.records.Record
+        """
+        records.checkResultType(result_type, ('dict', 'record'))
+        result = self._request('GET', path, params, hedge = hedge)
+        return records.convert(kind, result, result_type)
+
+    def _listAs(self, kind, result_type, path, params = None):
+        """
+        Get the listing and return it as the result type.
+        Listings requested as records or tables are decoded while
+        the response is read, so the dicts decoded are dropped as
+        soon as they are converted, bypassing the response caches.
+
+        :param kind: kind of the objects. See VscApiClient.records.
+        :type kind: string
+        :param result_type: 'dict', 'record' or 'table'.
+        :type result_type: string
+        :param path: URL path of the listing.
+        :type path: string
+        :param params: extra URL parameters.
+        :type params: dict or None
+        :rtype: list or instance of VscApiClient.records.RecordTable
+        """
+        records.checkResultType(result_type)
+        if result_type == 'dict':
+            return self._request('GET', path, params)
+        return records.convert(kind, self._iterRequest('GET', path, params),
+                               result_type)
+
     def _request(self, method, path, params = None, data = None,
-            reauth = False):
+            reauth = False, binding = None, hedge = False):
         """
         Do the request to a VSC API Server.
         Returns response body decoded from JSON (normally, this is dict
@@ -1018,48 +1917,633 @@ class VscApiClient():
         :type data: dict or None
         :param reauth: request to redo authentication
         :type reauth: bool
+        :param binding: name of the client method made the request,
+            for instrumentation. Found on the call stack when not
+            defined.
+        :type binding: string or None
+        :param hedge: hedge the request according to the hedging
+            policy of the client.
+        :type hedge: boolean
         :rtype: any
         """
-        host, port = random.choice(self.__addrs)
-        if self.__secure:
-            url = 'https://{0}:{1}/{2}'.format(host, port, path.strip('/'))
-        else:
-            url = 'http://{0}:{1}/{2}'.format(host, port, path.strip('/'))
+        resource = path.strip('/')
+        cache_key = None
+        if method == 'GET' and (self.__cache is not None or
+                                self.__validators is not None):
+            if params:
+                cache_key = (self.__username or self.__user_id, resource,
+                             tuple(sorted(params.items())))
+            else:
+                cache_key = (self.__username or self.__user_id, resource,
+                             None)
+        if cache_key is not None and self.__cache is not None:
+            found, reply_data = self.__cache.get(cache_key)
+            if found:
+                if reply_data:
+                    return self.__decode(reply_data)
+                return None
+        headers = {}
+        validators = None
+        if cache_key is not None and self.__validators is not None:
+            validators = self.__validators.get(cache_key)
+            if validators is not None:
+                if validators[0] is not None:
+                    headers['If-None-Match'] = validators[0]
+                if validators[1] is not None:
+                    headers['If-Modified-Since'] = validators[1]
+        info = None
+        if self.__instrument is not None:
+            info = metrics.RequestInfo(binding or _bindingName(), method,
+                                       resource)
+            started = time.time()
+        try:
+            def attempt():
+                reply = self._send(method, path, params, data, reauth,
+                                   headers, info, hedge)
+                if info is not None:
+                    read_started = time.time()
+                reply_data = reply.read()
+                if info is not None:
+                    info.read_time += time.time() - read_started
+                return reply, reply_data
+
+            try:
+                reply, reply_data = self._retrying(
+                    method, params, info, self._throttled, method, attempt)
+            finally:
+                if self.__cache is not None and method != 'GET':
+                    self.__cache.invalidate(resource)
+            if reply.status == 304:
+                self.__validators.notModified()
+                return validators[2]
+            if cache_key is not None and self.__cache is not None:
+                self.__cache.put(cache_key, reply_data)
+            result = None
+            if reply_data:
+                if info is not None:
+                    decode_started = time.time()
+                result = self.__decode(reply_data)
+                if info is not None:
+                    info.decode_time = time.time() - decode_started
+            if cache_key is not None and self.__validators is not None:
+                self.__validators.put(cache_key, reply.getheader('ETag'),
+                                      reply.getheader('Last-Modified'),
+                                      result)
+            return result
+        except Exception as exc:
+            if info is not None:
+                info.error = exc.__class__.__name__
+            raise
+        finally:
+            if info is not None:
+                info.total_time = time.time() - started
+                self.__instrument.requestDone(info)
+
+    def __decode(self, reply_data):
+        """
+        Decode the response body.
+
+        :param reply_data: JSON document.
+        :type reply_data: string
+        :rtype: any
+        """
+        if self.__lazy_lists and JSON_ARRAY_START.match(reply_data):
+            return self.__codec.lazyList(reply_data)
+        return self.__codec.loads(reply_data)
+
+    def _iterRequest(self, method, path, params = None, data = None):
+        """
+        Do the request to a VSC API Server and iterate over elements
+        of the JSON array got in response, decoding them while the
+        response body is read.
+        The request is sent on the first iteration. When the iteration
+        is abandoned, the connection is closed.
+
+        See _request() for the arguments description.
+
+        :rtype: generator
+        """
+        binding = None
+        if self.__instrument is not None:
+            binding = _bindingName()
+        return self.__iterReply(method, path, params, data, binding)
+
+    def __iterReply(self, method, path, params, data, binding):
+        """
+        Generator doing the work for _iterRequest().
+        Reading and decoding of the body are interleaved, so the time
+        spent for both is reported as the read time.
+
+        See _request() for the arguments description.
+
+        :rtype: generator
+        """
+        info = None
+        if binding is not None:
+            info = metrics.RequestInfo(binding, method, path.strip('/'))
+            started = time.time()
+        try:
+            # the consumer decides how long the body is read, so the
+            # throttle slot is held only until the response headers
+            # are got. Otherwise a slow consumer could starve all
+            # other requests.
+            reply = self._retrying(method, params, info, self._throttled,
+                                   method, self._send, method, path,
+                                   params, data, False, None, info)
+            try:
+                if info is not None:
+                    read_started = time.time()
+                for item in jsonstream.iterArray(reply.read):
+                    yield item
+                if info is not None:
+                    info.read_time += time.time() - read_started
+            finally:
+                reply.close()
+        except Exception as exc:
+            if info is not None:
+                info.error = exc.__class__.__name__
+            raise
+        finally:
+            if info is not None:
+                info.total_time = time.time() - started
+                self.__instrument.requestDone(info)
+
+    def _iterPages(self, path, params, page_size, offset):
+        """
+        Iterate over a list resource requesting it page by page with
+        'limit' and 'offset' query parameters. The next page is
+        requested in background while the current one is processed.
+        When the server ignores the paging and returns more elements
+        than requested, the whole list is iterated over and no more
+        pages are requested. When a page repeats the previous one
+        (the server ignores the offset), the iteration is stopped.
+
+        :param path: resource path.
+        :type path: string
+        :param params: dictionary with URL "query" parameters.
+        :type params: dict
+        :param page_size: count of elements requested at once.
+        :type page_size: positive integer
+        :param offset: count of elements to skip.
+        :type offset: integer
+        :rtype: generator
+        """
+        if page_size < 1:
+            raise BadArgError('Bad page size')
+        binding = None
+        if self.__instrument is not None:
+            binding = _bindingName()
+        return self.__iterPages(path, params, page_size, offset, binding)
+
+    def __iterPages(self, path, params, page_size, offset, binding):
+        """
+        Generator doing the work for _iterPages().
+
+        See _iterPages() for the arguments description.
+
+        :rtype: generator
+        """
+
+        def fetch(page_offset):
+            page_params = dict(params, limit = page_size,
+                               offset = page_offset)
+            return self._request('GET', path, page_params,
+                                 binding = binding)
+
+        executor = Executor(1)
+        future = executor.submit(fetch, offset)
+        previous = None
+        try:
+            while future is not None:
+                page = future.result() or []
+                future = None
+                if page and previous and page[0] == previous[0] and \
+                        page[-1] == previous[-1]:
+                    # the server ignores the offset and returns
+                    # the same page again
+                    break
+                previous = page
+                if len(page) == page_size:
+                    offset += page_size
+                    future = executor.submit(fetch, offset)
+                for item in page:
+                    yield item
+        finally:
+            if future is not None:
+                future.cancel()
+            executor.shutdown(False)
+
+    def _retrying(self, method, params, info, function, *args):
+        """
+        Call the function making the request, repeating the call
+        when allowed by the retry policy. Return the function result.
+
+        :param method: HTTP method of the request.
+        :type method: string
+        :param params: URL query parameters of the request.
+        :type params: dict or None
+        :param info: request statistics to count retries in.
+        :type info: instance of VscApiClient.metrics.RequestInfo or None
+        :param function: function making the request.
+        :type function: callable
+        :rtype: any
+        """
+        if self.__retry is None:
+            return function(*args)
+        self.__retry.requestStarted()
+        attempt = 1
+        while True:
+            try:
+                return function(*args)
+            except Exception as exc:
+                if not self.__retry.shouldRetry(method, exc, attempt,
+                                                params):
+                    raise
+                delay = self.__retry.backoff(attempt, exc)
+            time.sleep(delay)
+            attempt += 1
+            if info is not None:
+                info.retries += 1
+
+    def _throttled(self, method, function, *args):
+        """
+        Call the function making the request within the limits
+        of the client throttle. Return the function result.
+
+        :param method: HTTP method of the request.
+        :type method: string
+        :param function: function making the request.
+        :type function: callable
+        :rtype: any
+        """
+        if self.__throttle is None:
+            return function(*args)
+        self.__throttle.acquire(method)
+        try:
+            return function(*args)
+        except TooManyRequestsError as exc:
+            self.__throttle.backOff(exc.retry_after)
+            raise
+        finally:
+            self.__throttle.release()
+
+    def _send(self, method, path, params = None, data = None,
+              reauth = False, headers = None, info = None,
+              hedge = False):
+        """
+        Send the request to a VSC API Server following redirects.
+        Returns the successful response with the body not read yet.
+        Error responses are raised as exceptions. '304 Not Modified'
+        responses are returned only for conditional requests.
+
+        See _request() for the arguments description.
+
+        :param headers: extra request headers.
+        :type headers: dict or None
+        :param info: request statistics to fill.
+        :type info: instance of VscApiClient.metrics.RequestInfo or None
+        :param hedge: hedge the request.
+        :type hedge: boolean
+        :rtype: instance of VscApiClient.pool.PooledReply
+        """
+        url_path = '/' + path.strip('/')
         if params is not None:
-            url += '?' + urllib.urlencode(params)
-        request = urllib2.Request(url)
-        request.get_method = lambda: method
-        request.add_header('User-Agent', 'VscApiPythonClient')
-        if self.__username is not None and self.__password is not None and \
-                (reauth or self.__cookie_key is None or \
-                 self.__stale_cookie_auth):
-            plain_ident = '{0}:{1}'.format(self.__username, self.__password)
-            encoded_ident = base64.b64encode(plain_ident)
-            request.add_header('Authorization', 'Basic ' + encoded_ident)
-        if self.__cookie_key:
-            request.add_header('Cookie', 'auth=%s' % (self.__cookie_key,))
+            url_path += '?' + urllib.urlencode(params)
+        conditional = headers is not None and \
+            ('If-None-Match' in headers or 'If-Modified-Since' in headers)
+        headers = dict(headers or {})
+        headers['User-Agent'] = 'VscApiPythonClient'
+        body = None
         if data is not None:
-            request.add_header('Content-Type', 'application/json')
-            body = json.dumps(data)
-            request.add_header('Content-Length', len(body))
-            request.add_data(body)
+            headers['Content-Type'] = 'application/json'
+            body = self.__codec.dumps(data)
+        # a request creating a resource must not be resent when its
+        # response is lost: the resource may have been created already
+        idempotent = method in IDEMPOTENT_METHODS and \
+            not isCreate(method, params)
+        for attempt in (1, 2):
+            auth_headers, cookie, leader = self.__beginAuth(reauth)
+            try:
+                return self.__sendAuthenticated(
+                    method, url_path, body, dict(headers, **auth_headers),
+                    conditional, info, hedge, idempotent)
+            except NotAuthenticatedError:
+                # the cookie has expired on the server side. Repeat the
+                # request once, authenticating with the credentials.
+                if attempt > 1 or cookie is None or \
+                        'Authorization' in auth_headers or \
+                        not self.__expireCookie(cookie):
+                    raise
+            finally:
+                if leader:
+                    self.__endAuth()
+
+    def __sendAuthenticated(self, method, url_path, body, headers,
+                            conditional, info, hedge, idempotent):
+        """
+        Send the request with authentication headers already set,
+        following redirects. Does the work for _send().
+
+        See _send() for the arguments description.
+
+        :param conditional: the request is conditional, so
+            '304 Not Modified' response is expected.
+        :type conditional: boolean
+        :param idempotent: the request can be resent when its
+            response is lost.
+        :type idempotent: boolean
+        :rtype: instance of VscApiClient.pool.PooledReply
+        """
+        secure = self.__secure
+        host, port, reply = self._open(method, url_path, body, headers,
+                                       info, hedge, idempotent)
+        for _i in range(MAX_REDIRECTS):
+            if reply.status not in REDIRECT_CODES:
+                break
+            self._learnReply(reply)
+            location = reply.getheader('Location')
+            reply.read()
+            if location is None:
+                break
+            base = '{0}://{1}:{2}{3}'.format(
+                'https' if secure else 'http', host, port, url_path)
+            location = urlparse.urlsplit(urlparse.urljoin(base, location))
+            secure = location.scheme == 'https'
+            host = location.hostname
+            port = location.port or (443 if secure else 80)
+            url_path = location.path or '/'
+            if location.query:
+                url_path += '?' + location.query
+            if reply.status not in (307, 308):
+                # the same as urllib2 does: the redirected request
+                # is always GET without any body
+                method = 'GET'
+                body = None
+                headers.pop('Content-Type', None)
+                idempotent = True
+            reply = self.__pool.request(host, port, secure, method,
+                                        url_path, body, headers,
+                                        self.__timeout, idempotent)
+            if info is not None:
+                info.connect_time += reply.connect_time
+                info.ttfb += reply.ttfb
+        if info is not None:
+            info.endpoint = '{0}:{1}'.format(host, port)
+            info.status = reply.status
+        if not 200 <= reply.status < 300 and \
+                not (conditional and reply.status == 304):
+            _decodeErrorResponse(_makeHttpError(host, port, secure,
+                                                url_path, reply))
+        self._learnReply(reply)
+        return reply
+
+    def __beginAuth(self, reauth):
+        """
+        Choose authentication headers for a request.
+        The credentials are sent when there is no valid cookie yet,
+        but only by one thread at a time: while one request
+        authenticates, the other threads wait for it and reuse the
+        cookie it got. Each call returning True as the leader flag
+        must be paired with a call to __endAuth().
+
+        :param reauth: send the credentials anyway.
+        :type reauth: boolean
+        :rtype: (headers, cookie, leader) tuple
+        """
+        with self.__auth_cond:
+            while True:
+                cookie = self.__cookie_key
+                basic = self.__username is not None and \
+                    self.__password is not None and \
+                    (reauth or cookie is None or self.__stale_cookie_auth)
+                if not basic or reauth or not self.__authenticating:
+                    break
+                self.__auth_cond.wait(WAIT_SLICE)
+            headers = {}
+            if basic:
+                plain_ident = '{0}:{1}'.format(self.__username,
+                                               self.__password)
+                encoded_ident = base64.b64encode(plain_ident)
+                headers['Authorization'] = 'Basic ' + encoded_ident
+            if cookie:
+                headers['Cookie'] = 'auth=%s' % (cookie,)
+            leader = basic and not self.__authenticating
+            if leader:
+                self.__authenticating = True
+        return headers, cookie, leader
+
+    def __endAuth(self):
+        """
+        Let other threads waiting for authentication go.
+        """
+        with self.__auth_cond:
+            self.__authenticating = False
+            self.__auth_cond.notify_all()
+
+    def __expireCookie(self, cookie):
+        """
+        Mark the cookie rejected by the server as stale.
+        Return True if the request can be repeated with the
+        credentials.
+
+        :param cookie: the cookie rejected.
+        :type cookie: string
+        :rtype: boolean
+        """
+        with self.__auth_cond:
+            username = self.__username
+            if username is None or self.__password is None:
+                return False
+            if self.__cookie_key == cookie:
+                self.__stale_cookie_auth = True
+        if self.__sessions is not None:
+            self.__sessions.drop(self.__endpoint, username, cookie)
+        return True
+
+    def __loadSession(self, username, password):
+        """
+        Take the cookie and the user ID from the session store.
+
+        :param username: user login name.
+        :type username: string or None
+        :param password: user password.
+        :type password: string or None
+        """
+        if self.__sessions is None or username is None or \
+                password is None:
+            return
+        session = self.__sessions.load(self.__endpoint, username,
+                                       password)
+        if session is None:
+            return
+        with self.__auth_cond:
+            if self.__username == username and \
+                    self.__password == password:
+                self.__cookie_key, self.__user_id = session
+                self.__stale_cookie_auth = False
+
+    def _open(self, method, url_path, body, headers, info = None,
+              hedge = False, idempotent = None):
+        """
+        Send the request to one of VSC API Servers.
+        Servers which cannot be connected to are marked as dead and
+        the request is repeated with the next server. Hedged requests
+        are also repeated with the next server when the first one
+        is slow to respond.
+        Return the server address used and the response got.
+
+        :param method: HTTP method to use.
+        :type method: string
+        :param url_path: request path with query string.
+        :type url_path: string
+        :param body: request body.
+        :type body: string or None
+        :param headers: request headers.
+        :type headers: dict
+        :param info: request statistics to fill.
+        :type info: instance of VscApiClient.metrics.RequestInfo or None
+        :param hedge: hedge the request.
+        :type hedge: boolean
+        :param idempotent: the request can be resent when its response
+            is lost. Defined by the method when not set.
+        :type idempotent: boolean or None
+        :rtype: (host, port, reply) tuple
+        :raises NoAliveServersError: when no server can be connected.
+        """
+        if info is not None:
+            started = time.time()
+        addrs = self.__tracker.order(self._getAddrs())
+        if info is not None:
+            info.dns_time += time.time() - started
+        if hedge and self.__hedge is not None and len(addrs) > 1:
+            calls = [functools.partial(self._openAddr, addr, method,
+                                       url_path, body, headers,
+                                       idempotent)
+                     for addr in addrs]
+            (host, port, reply), count = hedging.race(
+                self.__hedge, calls, lambda result: result[2].close())
+            if info is not None:
+                info.retries += count - 1
+        else:
+            failed = []
+            for addr in addrs:
+                if failed and info is not None:
+                    info.retries += 1
+                try:
+                    host, port, reply = self._openAddr(
+                        addr, method, url_path, body, headers, idempotent)
+                    break
+                except ConnectError as exc:
+                    failed.append(str(exc))
+            else:
+                raise NoAliveServersError('; '.join(failed))
+        if info is not None:
+            info.connect_time += reply.connect_time
+            info.ttfb += reply.ttfb
+        return host, port, reply
+
+    def _openAddr(self, addr, method, url_path, body, headers,
+                  idempotent = None):
+        """
+        Send the request to the VSC API Server.
+        Return the server address and the response got.
+
+        See _open() for the arguments description.
+
+        :param addr: server address.
+        :type addr: (host, port) tuple
+        :rtype: (host, port, reply) tuple
+        :raises ConnectError: when the server cannot be connected.
+        """
+        host, port = addr
         try:
-            reply = urllib2.urlopen(request, timeout = self.__timeout)
-        except urllib2.HTTPError as exc:
-            _decodeErrorResponse(exc)
-        user_id = reply.headers.get('X-VSC-User-ID')
-        if user_id is not None:
-            self.__user_id = user_id
-        rclist = reply.headers.get('Set-Cookie', '').split(';')
+            reply = self.__pool.request(host, port, self.__secure,
+                                        method, url_path, body,
+                                        headers, self.__timeout,
+                                        idempotent)
+        except ConnectError as exc:
+            self.__tracker.markDead(addr)
+            raise ConnectError('{0}:{1}: {2}'.format(host, port, exc))
+        self.__tracker.markAlive(addr)
+        return host, port, reply
+
+    def _getAddrs(self):
+        """
+        Return VSC API endpoint addresses in order of preference.
+
+        :rtype: list of (host, port) tuples
+        """
+        if self.__hostname is None:
+            return list(self.__addrs)
+        return _orderSrv(_resolve(self.__hostname, self.__port))
+
+    def _learnReply(self, reply):
+        """
+        Learn user ID and authentication cookie from the response
+        received from a VSC API Server.
+
+        :param reply: the response.
+        :type reply: instance of VscApiClient.pool.PooledReply
+        """
+        user_id = reply.getheader('X-VSC-User-ID')
+        rclist = reply.getheader('Set-Cookie', '').split(';')
         rc_auth_keys = [x[1] for x in [y.split('=', 1) for y in rclist] if
             x[0].lower() == 'auth']
-        if rc_auth_keys:
-            self.__cookie_key = rc_auth_keys[0]
-            self.__stale_cookie_auth = False
-        reply_data = reply.read()
-        if reply_data:
-            return json.loads(reply_data)
+        with self.__auth_cond:
+            # the session is saved only when it has changed: the store
+            # rewrites a file under an exclusive lock
+            changed = False
+            if user_id is not None:
+                changed = user_id != self.__user_id
+                self.__user_id = user_id
+            if rc_auth_keys:
+                changed = changed or rc_auth_keys[0] != self.__cookie_key
+                self.__cookie_key = rc_auth_keys[0]
+                self.__stale_cookie_auth = False
+            session = (self.__username, self.__password,
+                       self.__cookie_key, self.__user_id)
+        if changed and self.__sessions is not None and \
+                None not in session[:3]:
+            self.__sessions.save(self.__endpoint, *session)
+
+
+def _bindingName():
+    """
+    Return name of the public client method which is the nearest
+    caller of the function calling this one.
+
+    :rtype: string or None
+    """
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_name.startswith('_'):
+        frame = frame.f_back
+    if frame is None:
         return None
+    return frame.f_code.co_name
+
+
+def _makeHttpError(host, port, secure, url_path, reply):
+    """
+    Wrap the error HTTP response into urllib2.HTTPError exception
+    instance suitable for _decodeErrorResponse().
+
+    :param host: server hostname or IP address.
+    :type host: string
+    :param port: server TCP port number.
+    :type port: integer
+    :param secure: HTTPS was used or not.
+    :type secure: boolean
+    :param url_path: request path with query string.
+    :type url_path: string
+    :param reply: the error response.
+    :type reply: instance of VscApiClient.pool.PooledReply
+    :rtype: urllib2.HTTPError
+    """
+    url = '{0}://{1}:{2}{3}'.format(
+        'https' if secure else 'http', host, port, url_path)
+    body = StringIO.StringIO(reply.read())
+    return urllib2.HTTPError(url, reply.status, reply.reason,
+                             reply.headers, body)
 
 
 def _decodeErrorResponse(http_exception):
@@ -1081,6 +2565,9 @@ def _decodeErrorResponse(http_exception):
         raise NotImplementedError
     elif http_exception.code == 404:
         raise NotFoundError
+    elif http_exception.code == 429:
+        raise TooManyRequestsError(_parseRetryAfter(
+            http_exception.headers.get('Retry-After')))
     # ...or try to find more error details in the message body
     error_classes_map = {403: {'access_denied': NotAuthorizedError,
                                'bad_argument': BadArgError}}
@@ -1114,27 +2601,105 @@ def _decodeErrorResponse(http_exception):
     raise class_name(error_message)
 
 
+def _parseRetryAfter(value):
+    """
+    Decode value of the Retry-After HTTP header.
+    Return time to wait in seconds or None if the value is not valid.
+
+    :param value: header value: count of seconds or HTTP-date.
+    :type value: string or None
+    :rtype: number or None
+    """
+    if value is None:
+        return None
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0, email.utils.mktime_tz(parsed) - time.time())
+
+
+_resolve_cache = {}
+_resolve_lock = threading.Lock()
+
+
 def _resolve(hostname, port):
     """
     Resolve DNS name to VSC API endpoint addresses.
+    Results are cached for the TTL of the DNS answer and shared by
+    all clients. When the DNS server fails to answer, the expired
+    result is used, if any, and cached again for SRV_STALE_TTL
+    seconds, so the failing server is not asked on every request.
 
     :param hostname: DNS name to resolve.
     :type hostname: string
     :param port: TCP port number to use.
     :type port: integer between 1 and 65535
-    :rtype: list of (host, port) tuples
+    :rtype: list of (priority, weight, host, port) tuples
     """
+    now = time.time()
+    with _resolve_lock:
+        expires, records = _resolve_cache.get((hostname, port), (0, None))
+    if expires > now:
+        return records
     if hostname.startswith(SRV_PREFIX):
         srvname = hostname
     else:
         srvname = SRV_PREFIX + hostname
     try:
-        # TODO: obey SRV-record priorities
-        return [(item.target.to_text().strip('.'), item.port)
-                for item in dns.resolver.query(srvname, 'srv')]
+        answer = dns.resolver.query(srvname, 'srv')
+        records = [(item.priority, item.weight,
+                    item.target.to_text().strip('.'), item.port)
+                   for item in answer]
+        expires = answer.expiration
     except dns.resolver.NXDOMAIN:
         # no SRV record found. We'll try to use plain DNS name
         if port is not None:
-            return [(hostname, port)]
+            records = [(0, 0, hostname, port)]
         else:
-            return [(hostname, DEFAULT_TCP_PORT)]
+            records = [(0, 0, hostname, DEFAULT_TCP_PORT)]
+        expires = now + SRV_NEGATIVE_TTL
+    except dns.exception.DNSException:
+        if records is None:
+            raise
+        expires = now + SRV_STALE_TTL
+    with _resolve_lock:
+        _resolve_cache[(hostname, port)] = (expires, records)
+    return records
+
+
+def _orderSrv(records):
+    """
+    Order SRV records as described in RFC 2782: records with lower
+    priority go first; records with the same priority are ordered
+    randomly, proportionally to their weights.
+
+    :param records: resolved SRV records.
+    :type records: list of (priority, weight, host, port) tuples
+    :rtype: list of (host, port) tuples
+    """
+    groups = {}
+    for priority, weight, host, port in records:
+        groups.setdefault(priority, []).append((weight, host, port))
+    result = []
+    for priority in sorted(groups):
+        # zero weight records are placed first to give them
+        # a little chance to be selected; the group is shuffled
+        # beforehand, so records with equal (zero) weights are not
+        # always tried in the order they were resolved
+        group = groups[priority]
+        random.shuffle(group)
+        group.sort(key = lambda item: item[0] != 0)
+        while group:
+            point = random.randint(0, sum(item[0] for item in group))
+            running = 0
+            for index, (weight, host, port) in enumerate(group):
+                running += weight
+                if running >= point:
+                    break
+            result.append((host, port))
+            del group[index]
+    return result
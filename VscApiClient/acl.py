@@ -0,0 +1,146 @@
+"""
+Bulk management of package and image ACLs.
+"""
+
+from .concurrency import Executor, asCompleted
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_CONCURRENCY = 8
+
+# names of the client methods to get and set ACL of each object kind
+ACL_METHODS = {'package': ('packageGetAcl', 'packageSetAcl'),
+               'image': ('imageGetAcl', 'imageSetAcl')}
+
+
+def getAcls(client, kind, object_ids, concurrency = DEFAULT_CONCURRENCY):
+    """
+    Return ACLs of many objects at once, requested concurrently.
+    A failure to get an ACL does not abort the others: the exception
+    is returned in place of the ACL.
+
+    :param client: client to use.
+    :type client: instance of VscApiClient
+    :param kind: object kind, 'package' or 'image'.
+    :type kind: string
+    :param object_ids: UUIDs of the objects.
+    :type object_ids: iterable of strings
+    :param concurrency: maximum count of requests sent at once.
+    :type concurrency: positive integer
+    :rtype: dict of object_id: (list or instance of Exception)
+    """
+    get_acl = getattr(client, ACL_METHODS[kind][0])
+    object_ids = _unique(object_ids)
+    result = {}
+    if not object_ids:
+        return result
+    with Executor(min(concurrency, len(object_ids))) as executor:
+        futures = [(object_id, executor.submit(get_acl, object_id))
+                   for object_id in object_ids]
+    for object_id, future in futures:
+        result[object_id] = _outcome(future)
+    return result
+
+
+def transformAcls(client, kind, object_ids, transform,
+                  concurrency = DEFAULT_CONCURRENCY, dry_run = False):
+    """
+    Read ACLs of many objects, pass each through the transform
+    function and write back only the ACLs which have changed.
+    Requests are sent concurrently; each changed ACL is written
+    as soon as it is read and transformed, while other ACLs are
+    still being read.
+
+    Return a report for each object: a dictionary with the keys
+    'old' (ACL read), 'new' (ACL returned by the transform),
+    'added' and 'removed' (entries of the new ACL not present in
+    the old one and vice versa), 'changed' (boolean) and 'error'
+    (None or the exception failed to read, transform or write
+    the ACL with).
+
+    :param client: client to use.
+    :type client: instance of VscApiClient
+    :param kind: object kind, 'package' or 'image'.
+    :type kind: string
+    :param object_ids: UUIDs of the objects.
+    :type object_ids: iterable of strings
+    :param transform: function called with the object ID and its
+        ACL, returning the new ACL. It must not modify the ACL
+        passed. Called from the calling thread only.
+    :type transform: callable
+    :param concurrency: maximum count of requests sent at once.
+    :type concurrency: positive integer
+    :param dry_run: only report the changes, do not write them.
+    :type dry_run: boolean
+    :rtype: dict of object_id: dict
+    """
+    get_acl, set_acl = [getattr(client, name) for name in ACL_METHODS[kind]]
+    object_ids = _unique(object_ids)
+    report = {}
+    if not object_ids:
+        return report
+    with Executor(min(concurrency, len(object_ids))) as executor:
+        reads = dict((executor.submit(get_acl, object_id), object_id)
+                     for object_id in object_ids)
+        writes = []
+        for future in asCompleted(reads):
+            object_id = reads[future]
+            entry = {'old': None, 'new': None, 'added': [], 'removed': [],
+                     'changed': False, 'error': None}
+            report[object_id] = entry
+            old = _outcome(future)
+            if isinstance(old, Exception):
+                entry['error'] = old
+                continue
+            entry['old'] = old
+            try:
+                new = transform(object_id, old)
+                entry['new'] = new
+                # fails when the transform returned not an ACL
+                added = [item for item in new if item not in old]
+                removed = [item for item in old if item not in new]
+            except Exception as exc:
+                entry['error'] = exc
+                continue
+            entry['added'] = added
+            entry['removed'] = removed
+            entry['changed'] = new != old
+            if entry['changed'] and not dry_run:
+                writes.append((object_id,
+                               executor.submit(set_acl, object_id, new)))
+    for object_id, future in writes:
+        report[object_id]['error'] = future.exception()
+    return report
+
+
+def _unique(object_ids):
+    """
+    Return the object IDs without duplicates, keeping the order.
+
+    :param object_ids: UUIDs of the objects.
+    :type object_ids: iterable of strings
+    :rtype: list of strings
+    """
+    seen = set()
+    result = []
+    for object_id in object_ids:
+        if object_id not in seen:
+            seen.add(object_id)
+            result.append(object_id)
+    return result
+
+
+def _outcome(future):
+    """
+    Return result of the finished future or the exception it
+    failed with.
+
+    :param future: finished future.
+    :type future: instance of VscApiClient.concurrency.Future
+    :rtype: any
+    """
+    exception = future.exception()
+    if exception is not None:
+        return exception
+    return future.result()
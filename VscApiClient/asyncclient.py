@@ -0,0 +1,164 @@
+"""
+Asynchronous client for VSC API.
+"""
+
+import inspect
+import threading
+
+from . import VscApiClient
+from .concurrency import Executor
+from .pool import ConnectionPool
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_MAX_CONCURRENCY = 16
+
+# VscApiClient methods which do no network requests or return
+# generators and so are called synchronously
+_SYNC_METHODS = ('setEndPoint', 'getEndPoint', 'setAuth', 'dropAuth',
+                 'getCookieKey', 'getUserId', 'getPoolStats', 'jobWatch',
+                 'iterUsers', 'iterJobListAll', 'iterPackages', 'iterImages',
+                 'aaaListUsersPaged', 'aaaListRolesPaged', 'jobListAllPaged',
+                 'packageListAllPaged', 'imageListAllPaged',
+                 'jobProfileListAllPaged')
+
+
+class AsyncVscApiClient(object):
+    """
+    Asynchronous VSC API Client.
+    Provides all the VscApiClient bindings with the same names and
+    arguments, but each binding returns a Future immediately instead
+    of the result. Requests are executed by a bounded pool of worker
+    threads on top of a single VscApiClient, so authentication cookie,
+    learned user ID, error mapping and persistent connections are
+    shared by all the requests. When the synchronous client is not
+    marked as safe to share between threads (its 'thread_safe'
+    attribute is not true), the calls are serialized with a lock.
+    """
+
+    def __init__(self, username = None, password = None,
+                 hostname = None, port = None, secure = True,
+                 timeout = None, max_concurrency = DEFAULT_MAX_CONCURRENCY,
+                 client = None):
+        """
+        Class constructor.
+
+        :param username: Caller user login name.
+        :type username: string
+        :param password: Caller user password.
+        :type password: string
+        :param hostname: VSC API endpoint address.
+        :type hostname: string
+        :param port: TCP port number to use.
+        :type port: integer between 1 and 65535
+        :param secure: use HTTPS or not. Default is True.
+        :type secure: boolean
+        :param timeout: maximum timeout
+        :type timeout: integer
+        :param max_concurrency: maximum count of requests
+            executed at the same time.
+        :type max_concurrency: positive integer
+        :param client: synchronous client to use. When defined,
+            all other connection arguments are ignored.
+        :type client: instance of VscApiClient or None
+        """
+        if client is None:
+            client = VscApiClient(
+                username, password, hostname, port, secure, timeout,
+                pool = ConnectionPool(max_idle = max_concurrency))
+        self.__client = client
+        self.__lock = None
+        if not getattr(client, 'thread_safe', False):
+            self.__lock = threading.Lock()
+        self.__executor = Executor(max_concurrency)
+
+    def getClient(self):
+        """
+        Return synchronous client used to make requests.
+
+        :rtype: instance of VscApiClient
+        """
+        return self.__client
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Schedule the function to be called with the synchronous
+        client as the first argument followed by the arguments.
+        Useful to run a sequence of dependent requests as a single
+        asynchronous operation.
+
+        :param function: function to call.
+        :type function: callable
+        :rtype: instance of VscApiClient.concurrency.Future
+        """
+        if self.__lock is None:
+            return self.__executor.submit(function, self.__client,
+                                          *args, **kwargs)
+        return self.__executor.submit(self.__locked, function,
+                                      *args, **kwargs)
+
+    def __locked(self, function, *args, **kwargs):
+        """
+        Call the function with the synchronous client holding the lock.
+
+        :rtype: any
+        """
+        with self.__lock:
+            return function(self.__client, *args, **kwargs)
+
+    def shutdown(self, wait = True):
+        """
+        Stop worker threads as soon as the queued requests are done.
+
+        :param wait: wait for the worker threads to stop.
+        :type wait: boolean
+        """
+        self.__executor.shutdown(wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+
+def _makeSyncMethod(name):
+    """
+    Make a method delegating the call to the synchronous client.
+
+    :param name: VscApiClient method name.
+    :type name: string
+    :rtype: function
+    """
+    def method(self, *args, **kwargs):
+        return getattr(self.getClient(), name)(*args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = getattr(VscApiClient, name).__doc__
+    return method
+
+
+def _makeAsyncMethod(name):
+    """
+    Make a method scheduling the call of the synchronous client
+    method and returning a Future.
+
+    :param name: VscApiClient method name.
+    :type name: string
+    :rtype: function
+    """
+    def method(self, *args, **kwargs):
+        return self.submit(
+            lambda client: getattr(client, name)(*args, **kwargs))
+    method.__name__ = name
+    method.__doc__ = getattr(VscApiClient, name).__doc__
+    return method
+
+
+for _name, _method in inspect.getmembers(VscApiClient, inspect.ismethod):
+    if _name.startswith('_'):
+        continue
+    if _name in _SYNC_METHODS:
+        setattr(AsyncVscApiClient, _name, _makeSyncMethod(_name))
+    else:
+        setattr(AsyncVscApiClient, _name, _makeAsyncMethod(_name))
@@ -0,0 +1,266 @@
+"""
+Client side cache for VSC API responses.
+"""
+
+import collections
+import fnmatch
+import threading
+import time
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_MAX_SIZE = 1024
+
+# default cache TTLs (in seconds) for resource paths. Patterns are
+# matched with fnmatch segment by segment, so a wildcard never
+# matches '/': 'package/*' matches a package, but not its ACL.
+# The longest matching pattern wins.
+DEFAULT_TTLS = {
+    'aaa/role/*': 60,
+    'package/*': 60,
+    'image/*': 60,
+    'image_receiver': 300,
+    'list_public_job_profiles': 300}
+
+# collection paths and paths of list_* redirectors serving the same
+# resources
+_LIST_ALIASES = {
+    'job': ('job', 'list_jobs'),
+    'package': ('package', 'list_packages'),
+    'image': ('image', 'list_images'),
+    'job_profile': ('job_profile', 'list_job_profiles',
+                    'list_public_job_profiles')}
+
+
+class ResponseCache(object):
+    """
+    LRU cache of VSC API responses with per path TTLs.
+    Entries are keyed by (identity, path, params) triples, where
+    identity distinguishes users sharing the same cache.
+    """
+
+    def __init__(self, ttls = None, default_ttl = 0,
+                 max_size = DEFAULT_MAX_SIZE):
+        """
+        Class constructor.
+
+        :param ttls: mapping of path patterns to TTLs in seconds.
+            DEFAULT_TTLS is used when not defined.
+        :type ttls: dict or None
+        :param default_ttl: TTL for paths not matching any pattern.
+            Zero TTL means the path is not cached.
+        :type default_ttl: number
+        :param max_size: maximum count of entries kept.
+        :type max_size: integer
+        """
+        if ttls is None:
+            ttls = DEFAULT_TTLS
+        self.__ttls = sorted(ttls.items(), key = lambda item: -len(item[0]))
+        self.__default_ttl = default_ttl
+        self.__max_size = max_size
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.__stats = {'hits': 0, 'misses': 0, 'evictions': 0,
+                        'invalidations': 0}
+
+    def ttl(self, path):
+        """
+        Return cache TTL for the resource path.
+
+        :param path: resource path.
+        :type path: string
+        :rtype: number
+        """
+        segments = path.split('/')
+        for pattern, ttl in self.__ttls:
+            if _match(segments, pattern):
+                return ttl
+        return self.__default_ttl
+
+    def get(self, key):
+        """
+        Lookup the cache.
+        Return (True, value) tuple on hit and (False, None) on miss.
+
+        :param key: (identity, path, params) triple.
+        :type key: tuple
+        :rtype: tuple
+        """
+        with self.__lock:
+            entry = self.__entries.pop(key, None)
+            if entry is None or entry[0] < time.time():
+                self.__stats['misses'] += 1
+                return False, None
+            # move the entry to the end as the most recently used
+            self.__entries[key] = entry
+            self.__stats['hits'] += 1
+            return True, entry[1]
+
+    def put(self, key, value):
+        """
+        Store the value in the cache.
+        Does nothing when the path is not cacheable.
+
+        :param key: (identity, path, params) triple.
+        :type key: tuple
+        :param value: value to store.
+        :type value: any
+        """
+        ttl = self.ttl(key[1])
+        if ttl <= 0:
+            return
+        with self.__lock:
+            self.__entries.pop(key, None)
+            self.__entries[key] = (time.time() + ttl, value)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last = False)
+                self.__stats['evictions'] += 1
+
+    def invalidate(self, path):
+        """
+        Drop entries affected by a modification of the resource:
+        the resource itself, its parents and children, and lists
+        of the resources of the same type. Any modification in
+        AAA drops all AAA entries as users and roles reference
+        each other.
+
+        :param path: path of the modified resource.
+        :type path: string
+        """
+        aliases = _LIST_ALIASES.get(path.split('/', 1)[0], ())
+        aaa = path.startswith('aaa/')
+        with self.__lock:
+            for key in list(self.__entries):
+                cached = key[1]
+                if cached == path or cached in aliases or \
+                        cached.startswith(path + '/') or \
+                        path.startswith(cached + '/') or \
+                        (aaa and cached.startswith('aaa/')):
+                    del self.__entries[key]
+                    self.__stats['invalidations'] += 1
+
+    def clear(self):
+        """
+        Drop all entries.
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        """
+        Return cache counters: count of hits, misses, entries evicted
+        due to the size limit and entries invalidated, as well as the
+        current count of entries.
+
+        :rtype: dict
+        """
+        with self.__lock:
+            result = dict(self.__stats)
+            result['size'] = len(self.__entries)
+        return result
+
+
+class ValidatorCache(object):
+    """
+    LRU store of response validators (ETag and Last-Modified header
+    values) along with decoded response bodies, used to revalidate
+    GET responses with conditional requests. When the server replies
+    with '304 Not Modified', the stored decoded body is reused, so
+    neither transfer nor decoding of the body is needed.
+    Entries are keyed by (identity, path, params) triples.
+    """
+
+    def __init__(self, max_size = DEFAULT_MAX_SIZE):
+        """
+        Class constructor.
+
+        :param max_size: maximum count of entries kept.
+        :type max_size: integer
+        """
+        self.__max_size = max_size
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.__stats = {'not_modified': 0, 'modified': 0}
+
+    def get(self, key):
+        """
+        Return (etag, last_modified, value) triple stored for the key
+        or None.
+
+        :param key: (identity, path, params) triple.
+        :type key: tuple
+        :rtype: tuple or None
+        """
+        with self.__lock:
+            entry = self.__entries.pop(key, None)
+            if entry is not None:
+                self.__entries[key] = entry
+            return entry
+
+    def put(self, key, etag, last_modified, value):
+        """
+        Store validators and the decoded body of the response.
+        Forget the key when the response has no validators.
+
+        :param key: (identity, path, params) triple.
+        :type key: tuple
+        :param etag: ETag header value.
+        :type etag: string or None
+        :param last_modified: Last-Modified header value.
+        :type last_modified: string or None
+        :param value: decoded response body.
+        :type value: any
+        """
+        with self.__lock:
+            if self.__entries.pop(key, None) is not None:
+                self.__stats['modified'] += 1
+            if etag is None and last_modified is None:
+                return
+            self.__entries[key] = (etag, last_modified, value)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last = False)
+
+    def notModified(self):
+        """
+        Count a response revalidated as not modified.
+        """
+        with self.__lock:
+            self.__stats['not_modified'] += 1
+
+    def clear(self):
+        """
+        Drop all entries.
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        """
+        Return counters of responses revalidated as not modified and
+        of stored responses found modified, as well as the current
+        count of entries.
+
+        :rtype: dict
+        """
+        with self.__lock:
+            result = dict(self.__stats)
+            result['size'] = len(self.__entries)
+        return result
+
+
+def _match(segments, pattern):
+    """
+    Check if the path matches the pattern. Each segment of the path
+    is matched with fnmatch against the segment of the pattern.
+
+    :param segments: segments of the resource path.
+    :type segments: list of strings
+    :param pattern: path pattern.
+    :type pattern: string
+    :rtype: boolean
+    """
+    parts = pattern.split('/')
+    return len(parts) == len(segments) and \
+        all(fnmatch.fnmatchcase(segment, part)
+            for segment, part in zip(segments, parts))
@@ -0,0 +1,287 @@
+"""
+JSON codecs for VSC API Client.
+
+The stdlib json module is always available. Faster third party
+backends (ujson, simplejson) are used when installed.
+"""
+
+import collections
+import json
+import threading
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+# ----------------------------------------------------------------------
+# local definitions
+
+# codec names in order of preference, fastest first
+PREFERENCE = ('ujson', 'simplejson', 'json')
+
+_WHITESPACE = ' \t\n\r'
+
+
+class JsonCodec(object):
+    """
+    Codec based on the stdlib json module.
+    """
+
+    name = 'json'
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self._raw_decode = json.JSONDecoder().raw_decode
+
+    def dumps(self, value):
+        """
+        Encode the value to JSON. Lazy lists decoded before are
+        encoded as JSON arrays.
+
+        :param value: value to encode.
+        :type value: any
+        :rtype: string
+        """
+        return json.dumps(value, default = _default)
+
+    def loads(self, data):
+        """
+        Decode the JSON document.
+
+        :param data: encoded document.
+        :type data: string
+        :rtype: any
+        :raises ValueError: when the document is not a valid JSON.
+        """
+        return json.loads(data)
+
+    def lazyList(self, data):
+        """
+        Return a sequence decoding elements of the encoded JSON
+        array on demand. See LazyList for details.
+
+        :param data: encoded JSON array.
+        :type data: string
+        :rtype: instance of LazyList
+        """
+        return LazyList(data, self._raw_decode)
+
+
+class SimplejsonCodec(JsonCodec):
+    """
+    Codec based on the simplejson module with C speedups.
+    """
+
+    name = 'simplejson'
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self._raw_decode = simplejson.JSONDecoder().raw_decode
+
+    def dumps(self, value):
+        return simplejson.dumps(value, default = _default)
+
+    def loads(self, data):
+        return simplejson.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    """
+    Codec based on the ujson module.
+    Only decoding is done with ujson, floats are decoded precisely.
+    Encoding is left to the stdlib, because ujson rounds floats
+    and request bodies are small anyway. ujson cannot decode a
+    part of a document, so lazy lists use the stdlib decoder.
+    """
+
+    name = 'ujson'
+
+    def loads(self, data):
+        return ujson.loads(data, precise_float = True)
+
+
+_CODECS = {'json': (JsonCodec, json),
+           'simplejson': (SimplejsonCodec, simplejson),
+           'ujson': (UjsonCodec, ujson)}
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def available():
+    """
+    Return names of the codecs which can be used, fastest first.
+
+    :rtype: list of strings
+    """
+    return [name for name in PREFERENCE if _CODECS[name][1] is not None]
+
+
+def getCodec(name = None):
+    """
+    Return the codec by the name or the fastest codec available
+    when the name is not defined.
+
+    :param name: codec name: 'json', 'simplejson' or 'ujson'.
+    :type name: string or None
+    :rtype: instance of JsonCodec
+    :raises ValueError: when the codec is unknown or its module
+        is not installed.
+    """
+    if name is None:
+        name = available()[0]
+    if name not in _CODECS:
+        raise ValueError('Unknown JSON codec: {0!r}'.format(name))
+    codec_class, module = _CODECS[name]
+    if module is None:
+        raise ValueError('JSON codec {0!r} is not installed'.format(name))
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = codec_class()
+        return _instances[name]
+
+
+def _default(value):
+    """
+    Convert the value the JSON encoder cannot encode by itself.
+
+    :param value: value to encode.
+    :type value: any
+    :rtype: list
+    :raises TypeError: when the value cannot be encoded.
+    """
+    if isinstance(value, LazyList):
+        return list(value)
+    raise TypeError('{0!r} is not JSON serializable'.format(value))
+
+
+class LazyList(collections.Sequence):
+    """
+    Read-only sequence of elements of an encoded JSON array,
+    decoded on demand.
+
+    Elements are decoded in order and only as far as needed:
+    taking the first elements, iterating with an early break or
+    searching for an element does not pay for decoding the rest
+    of the array. Each element is decoded once and kept. Taking
+    the length or negative indices decodes the whole array.
+    The list is safe to share between threads. Use list() to get
+    a plain list.
+    """
+
+    def __init__(self, data, raw_decode):
+        """
+        Class constructor.
+
+        :param data: encoded JSON array.
+        :type data: string
+        :param raw_decode: function decoding a JSON value from the
+            string at the position and returning the value and
+            the position of the end of the value.
+        :type raw_decode: callable
+        :raises ValueError: when the data is not a JSON array.
+        """
+        self.__data = data
+        self.__raw_decode = raw_decode
+        self.__items = []
+        self.__lock = threading.Lock()
+        pos = self.__skip(0)
+        if data[pos:pos + 1] != '[':
+            raise ValueError('JSON array expected')
+        pos = self.__skip(pos + 1)
+        self.__done = data[pos:pos + 1] == ']'
+        self.__pos = pos
+        if self.__done:
+            self.__data = None
+
+    def __len__(self):
+        self.__decodeUpTo(None)
+        return len(self.__items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.step is not None and index.step < 0 or \
+                    index.start is not None and index.start < 0 or \
+                    index.stop is None or index.stop < 0:
+                self.__decodeUpTo(None)
+            else:
+                self.__decodeUpTo(index.stop - 1)
+            return self.__items[index]
+        if index < 0:
+            self.__decodeUpTo(None)
+        else:
+            self.__decodeUpTo(index)
+        return self.__items[index]
+
+    def __iter__(self):
+        index = 0
+        while True:
+            self.__decodeUpTo(index)
+            if index >= len(self.__items):
+                return
+            yield self.__items[index]
+            index += 1
+
+    def __eq__(self, other):
+        if not isinstance(other, collections.Sequence) or \
+                isinstance(other, basestring):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'LazyList({0!r})'.format(list(self))
+
+    def __decodeUpTo(self, index):
+        """
+        Decode elements up to the index (inclusive) or all of them
+        when the index is None.
+
+        :param index: index of the element.
+        :type index: integer or None
+        """
+        with self.__lock:
+            data = self.__data
+            while not self.__done and \
+                    (index is None or len(self.__items) <= index):
+                value, pos = self.__raw_decode(data, self.__pos)
+                self.__items.append(value)
+                pos = self.__skip(pos)
+                if data[pos:pos + 1] == ',':
+                    self.__pos = self.__skip(pos + 1)
+                elif data[pos:pos + 1] == ']':
+                    self.__done = True
+                    # the encoded data is not needed anymore
+                    self.__data = None
+                else:
+                    raise ValueError(
+                        'Expecting , delimiter at {0!r}'.format(
+                            data[pos:pos + 20]))
+
+    def __skip(self, pos):
+        """
+        Return position of the first non-whitespace character
+        starting from the position.
+
+        :rtype: integer
+        """
+        data = self.__data
+        while pos < len(data) and data[pos] in _WHITESPACE:
+            pos += 1
+        return pos
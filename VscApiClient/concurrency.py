@@ -0,0 +1,368 @@
+"""
+Minimal futures and thread pool executor used by VSC API Client
+to run API requests concurrently.
+"""
+
+import Queue
+import sys
+import threading
+import time
+
+from .errors import CancelledError, TimeoutError
+
+# ----------------------------------------------------------------------
+# local definitions
+
+_PENDING = 'pending'
+_RUNNING = 'running'
+_CANCELLED = 'cancelled'
+_FINISHED = 'finished'
+
+# waits for an unlimited time are done in slices of this length
+# (in seconds): in Python 2 a wait without a timeout cannot be
+# interrupted with KeyboardInterrupt
+WAIT_SLICE = 60
+
+
+class Future(object):
+    """
+    Result of an asynchronous operation.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self.__cond = threading.Condition()
+        self.__state = _PENDING
+        self.__result = None
+        self.__exc_info = None
+        self.__callbacks = []
+
+    def done(self):
+        """
+        Return True if the operation is finished or cancelled.
+
+        :rtype: boolean
+        """
+        return self.__state in (_FINISHED, _CANCELLED)
+
+    def cancelled(self):
+        """
+        Return True if the operation was cancelled.
+
+        :rtype: boolean
+        """
+        return self.__state == _CANCELLED
+
+    def cancel(self):
+        """
+        Cancel the operation if it is not started yet.
+        Return True on success.
+
+        :rtype: boolean
+        """
+        with self.__cond:
+            if self.__state == _CANCELLED:
+                return True
+            if self.__state != _PENDING:
+                return False
+            self.__state = _CANCELLED
+            self.__cond.notify_all()
+        self.__runCallbacks()
+        return True
+
+    def result(self, timeout = None):
+        """
+        Wait for the operation to finish and return its result.
+        The exception raised by the operation is re-raised.
+
+        :param timeout: maximum time to wait, in seconds.
+            Wait forever if not defined.
+        :type timeout: number or None
+        :rtype: any
+        :raises TimeoutError: when the operation is not finished
+            in time.
+        :raises CancelledError: when the operation was cancelled.
+        """
+        self.__wait(timeout)
+        if self.__exc_info is not None:
+            raise self.__exc_info[0], self.__exc_info[1], self.__exc_info[2]
+        return self.__result
+
+    def exception(self, timeout = None):
+        """
+        Wait for the operation to finish and return the exception
+        raised by the operation or None if it succeeded.
+
+        :param timeout: maximum time to wait, in seconds.
+            Wait forever if not defined.
+        :type timeout: number or None
+        :rtype: instance of Exception or None
+        :raises TimeoutError: when the operation is not finished
+            in time.
+        :raises CancelledError: when the operation was cancelled.
+        """
+        self.__wait(timeout)
+        if self.__exc_info is not None:
+            return self.__exc_info[1]
+        return None
+
+    def addDoneCallback(self, callback):
+        """
+        Register a function to call with the future as the only
+        argument when the operation is finished or cancelled.
+        When the operation is already finished, the function
+        is called immediately.
+
+        :param callback: function to call.
+        :type callback: callable
+        """
+        with self.__cond:
+            if not self.done():
+                self.__callbacks.append(callback)
+                return
+        callback(self)
+
+    def _run(self, function, args, kwargs):
+        """
+        Run the operation and store its outcome in the future.
+        Does nothing if the future was cancelled.
+
+        :param function: function to call.
+        :type function: callable
+        :param args: positional arguments for the function.
+        :type args: tuple
+        :param kwargs: keyword arguments for the function.
+        :type kwargs: dict
+        """
+        with self.__cond:
+            if self.__state != _PENDING:
+                return
+            self.__state = _RUNNING
+        try:
+            result = function(*args, **kwargs)
+        except BaseException:
+            self._setExcInfo(sys.exc_info())
+        else:
+            self._setResult(result)
+
+    def _setResult(self, result):
+        """
+        Finish the operation with the result.
+
+        :param result: operation result.
+        :type result: any
+        """
+        with self.__cond:
+            self.__result = result
+            self.__state = _FINISHED
+            self.__cond.notify_all()
+        self.__runCallbacks()
+
+    def _setExcInfo(self, exc_info):
+        """
+        Finish the operation with the exception.
+
+        :param exc_info: exception info as returned by sys.exc_info().
+        :type exc_info: tuple
+        """
+        with self.__cond:
+            self.__exc_info = exc_info
+            self.__state = _FINISHED
+            self.__cond.notify_all()
+        self.__runCallbacks()
+
+    def __wait(self, timeout):
+        """
+        Wait for the operation to finish.
+
+        :param timeout: maximum time to wait, in seconds.
+        :type timeout: number or None
+        """
+        with self.__cond:
+            if timeout is None:
+                while not self.done():
+                    self.__cond.wait(WAIT_SLICE)
+            else:
+                deadline = time.time() + timeout
+                while not self.done():
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError
+                    self.__cond.wait(remaining)
+            if self.__state == _CANCELLED:
+                raise CancelledError
+
+    def __runCallbacks(self):
+        """
+        Call all the registered callbacks.
+        """
+        with self.__cond:
+            callbacks = self.__callbacks
+            self.__callbacks = []
+        for callback in callbacks:
+            callback(self)
+
+
+class Executor(object):
+    """
+    Pool of worker threads executing submitted functions.
+    The count of functions running at the same time is limited
+    by the count of workers; the rest waits in the queue.
+    Worker threads are started on demand.
+    """
+
+    def __init__(self, max_workers):
+        """
+        Class constructor.
+
+        :param max_workers: maximum count of worker threads.
+        :type max_workers: positive integer
+        """
+        if max_workers < 1:
+            raise ValueError('max_workers must be positive')
+        self.__max_workers = max_workers
+        self.__queue = Queue.Queue()
+        self.__workers = []
+        # count of workers waiting for a function to call
+        self.__idle = 0
+        # count of queued functions no worker is reserved for
+        self.__unclaimed = 0
+        self.__lock = threading.Lock()
+        self.__shutdown = False
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Schedule the function to be called with the arguments.
+
+        :param function: function to call.
+        :type function: callable
+        :rtype: instance of Future
+        """
+        future = Future()
+        with self.__lock:
+            if self.__shutdown:
+                raise RuntimeError('Executor is shut down')
+            self.__queue.put((future, function, args, kwargs))
+            if self.__idle:
+                # reserve an idle worker for the function
+                self.__idle -= 1
+                return future
+            self.__unclaimed += 1
+            if len(self.__workers) < self.__max_workers:
+                worker = threading.Thread(target = self.__work)
+                worker.daemon = True
+                self.__workers.append(worker)
+                worker.start()
+        return future
+
+    def map(self, function, iterable):
+        """
+        Schedule the function to be called for each item of the
+        iterable. Return futures in the same order as the items.
+
+        :param function: function to call.
+        :type function: callable
+        :param iterable: function arguments.
+        :type iterable: iterable
+        :rtype: list of Future instances
+        """
+        return [self.submit(function, item) for item in iterable]
+
+    def shutdown(self, wait = True):
+        """
+        Stop accepting new functions and stop the worker threads
+        as soon as the queued functions are done.
+
+        :param wait: wait for the worker threads to stop.
+        :type wait: boolean
+        """
+        with self.__lock:
+            if self.__shutdown:
+                return
+            self.__shutdown = True
+            workers = list(self.__workers)
+        for _worker in workers:
+            self.__queue.put(None)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def __work(self):
+        """
+        Worker thread main loop.
+        Before taking the next item of the queue, the worker claims
+        a function queued while all workers were busy or reports
+        itself as idle, so submit() knows if it has to start a new
+        worker. Both counters are changed under the executor lock.
+        """
+        while True:
+            with self.__lock:
+                if self.__unclaimed:
+                    self.__unclaimed -= 1
+                else:
+                    self.__idle += 1
+            item = self.__queue.get()
+            if item is None:
+                return
+            future, function, args, kwargs = item
+            future._run(function, args, kwargs)
+
+
+def asCompleted(futures, timeout = None):
+    """
+    Iterate over the futures as they finish.
+
+    :param futures: futures to wait for.
+    :type futures: iterable of Future instances
+    :param timeout: maximum time to wait for all the futures,
+        in seconds. Wait forever if not defined.
+    :type timeout: number or None
+    :rtype: generator of Future instances
+    :raises TimeoutError: when not all the futures are finished
+        in time.
+    """
+    futures = list(futures)
+    finished = Queue.Queue()
+    for future in futures:
+        future.addDoneCallback(finished.put)
+    deadline = None
+    if timeout is not None:
+        deadline = time.time() + timeout
+    for _i in range(len(futures)):
+        if deadline is None:
+            while True:
+                try:
+                    yield finished.get(timeout = WAIT_SLICE)
+                    break
+                except Queue.Empty:
+                    pass
+        else:
+            try:
+                yield finished.get(
+                    timeout = max(0, deadline - time.time()))
+            except Queue.Empty:
+                raise TimeoutError
+
+
+def waitAll(futures, timeout = None):
+    """
+    Wait for all the futures to finish.
+
+    :param futures: futures to wait for.
+    :type futures: iterable of Future instances
+    :param timeout: maximum time to wait, in seconds.
+        Wait forever if not defined.
+    :type timeout: number or None
+    :raises TimeoutError: when not all the futures are finished
+        in time.
+    """
+    for _future in asCompleted(futures, timeout):
+        pass
@@ -0,0 +1,109 @@
+"""
+VSC API endpoint health tracking.
+"""
+
+import threading
+import time
+
+from .retry import jittered
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_BACKOFF_BASE = 1
+DEFAULT_BACKOFF_MAX = 60
+
+
+class EndpointTracker(object):
+    """
+    Keeps track of VSC API endpoint addresses health.
+    An address is considered dead after a connection failure and
+    is excluded from the selection until its backoff period expires.
+    After that the address is probed with a regular request: success
+    brings it back, failure doubles the backoff period.
+    """
+
+    def __init__(self, backoff_base = DEFAULT_BACKOFF_BASE,
+                 backoff_max = DEFAULT_BACKOFF_MAX):
+        """
+        Class constructor.
+
+        :param backoff_base: backoff period (in seconds) after the
+            first failure.
+        :type backoff_base: number
+        :param backoff_max: maximum backoff period (in seconds).
+        :type backoff_max: number
+        """
+        self.__backoff_base = backoff_base
+        self.__backoff_max = backoff_max
+        self.__dead = {}
+        self.__lock = threading.Lock()
+
+    def markDead(self, addr):
+        """
+        Mark the address as dead.
+
+        :param addr: endpoint address.
+        :type addr: (host, port) tuple
+        """
+        with self.__lock:
+            failures = self.__dead.get(addr, (0, None))[0] + 1
+            backoff = jittered(min(self.__backoff_max,
+                                   self.__backoff_base *
+                                   2 ** (failures - 1)), 0.5)
+            self.__dead[addr] = (failures, time.time() + backoff)
+
+    def markAlive(self, addr):
+        """
+        Mark the address as alive.
+
+        :param addr: endpoint address.
+        :type addr: (host, port) tuple
+        """
+        if addr in self.__dead:
+            with self.__lock:
+                self.__dead.pop(addr, None)
+
+    def isAlive(self, addr):
+        """
+        Check if the address is not marked as dead.
+
+        :param addr: endpoint address.
+        :type addr: (host, port) tuple
+        :rtype: boolean
+        """
+        return addr not in self.__dead
+
+    def order(self, addrs):
+        """
+        Return addresses to try, in order of preference.
+        Alive addresses go first in their original order, followed
+        by dead addresses which are due to be probed. When all the
+        addresses are dead and none is due, the one which is closest
+        to its probe time is returned, as there is nothing else
+        left to try.
+
+        :param addrs: endpoint addresses in order of preference.
+        :type addrs: list of (host, port) tuples
+        :rtype: list of (host, port) tuples
+        """
+        with self.__lock:
+            if not self.__dead:
+                return list(addrs)
+            now = time.time()
+            alive = []
+            due = []
+            waiting = []
+            for addr in addrs:
+                state = self.__dead.get(addr)
+                if state is None:
+                    alive.append(addr)
+                elif state[1] <= now:
+                    due.append((state[1], addr))
+                else:
+                    waiting.append((state[1], addr))
+        due.sort()
+        result = alive + [addr for _ts, addr in due]
+        if not result and waiting:
+            result.append(min(waiting)[1])
+        return result
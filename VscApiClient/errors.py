@@ -48,3 +48,43 @@ class InternalServerError(Error):
     Internal server exception.
     """
     pass
+
+
+class CancelledError(Error):
+    """
+    Asynchronous operation was cancelled.
+    """
+    pass
+
+
+class TimeoutError(Error):
+    """
+    Operation was not finished in time.
+    """
+    pass
+
+
+class TooManyRequestsError(Error):
+    """
+    Request rate limit exceeded.
+    The retry_after attribute holds time in seconds the server asked
+    to wait before the next request or None if it did not tell.
+    """
+
+    def __init__(self, retry_after = None):
+        Error.__init__(self, 'Too many requests')
+        self.retry_after = retry_after
+
+
+class DependencyError(Error):
+    """
+    Operation was not done because an operation it depends on failed.
+    """
+    pass
+
+
+class TransferError(Error):
+    """
+    Image archive transfer failed.
+    """
+    pass
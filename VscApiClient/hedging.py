@@ -0,0 +1,216 @@
+"""
+Hedged requests for VSC API Client.
+
+A hedged request is sent to one server first. If the server does not
+answer within a delay derived from the observed latency, the same
+request is sent to another server too, and the first response wins.
+This cuts off the latency tail caused by a single slow server at the
+cost of a few percent of extra requests.
+"""
+
+import Queue
+import threading
+import time
+
+from .concurrency import WAIT_SLICE, Future
+from .errors import NoAliveServersError
+from .metrics import Histogram
+from .pool import ConnectError
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_PERCENTILE = 95
+DEFAULT_INITIAL_DELAY = 0.1
+DEFAULT_MIN_DELAY = 0.005
+DEFAULT_MAX_DELAY = 2
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_MAX_HEDGES = 1
+
+
+class HedgePolicy(object):
+    """
+    Defines when hedged requests are sent.
+    The hedge delay is the given percentile of response times seen
+    so far, so only the slowest requests (5% of them by default)
+    are hedged. Until enough response times are collected, the
+    initial delay is used.
+    A policy can be shared by several clients talking to the same
+    servers.
+    """
+
+    def __init__(self, percentile = DEFAULT_PERCENTILE,
+                 initial_delay = DEFAULT_INITIAL_DELAY,
+                 min_delay = DEFAULT_MIN_DELAY,
+                 max_delay = DEFAULT_MAX_DELAY,
+                 min_samples = DEFAULT_MIN_SAMPLES,
+                 max_hedges = DEFAULT_MAX_HEDGES):
+        """
+        Class constructor.
+
+        :param percentile: percentile of response times used
+            as the hedge delay, from 0 to 100.
+        :type percentile: number
+        :param initial_delay: hedge delay used until enough response
+            times are collected, in seconds.
+        :type initial_delay: number
+        :param min_delay: lower limit of the hedge delay, in seconds.
+        :type min_delay: number
+        :param max_delay: upper limit of the hedge delay, in seconds.
+        :type max_delay: number
+        :param min_samples: count of response times to collect
+            before the percentile is used.
+        :type min_samples: integer
+        :param max_hedges: maximum count of extra requests sent
+            for a single request.
+        :type max_hedges: integer
+        """
+        self.__percentile = percentile
+        self.__initial_delay = initial_delay
+        self.__min_delay = min_delay
+        self.__max_delay = max_delay
+        self.__min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.__histogram = Histogram()
+        self.__lock = threading.Lock()
+        self.__stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0}
+
+    def delay(self):
+        """
+        Return time to wait for a response before sending
+        a hedged request, in seconds.
+
+        :rtype: float
+        """
+        with self.__lock:
+            if self.__histogram.count < self.__min_samples:
+                delay = self.__initial_delay
+            else:
+                delay = self.__histogram.percentile(self.__percentile)
+        return min(self.__max_delay, max(self.__min_delay, delay))
+
+    def record(self, seconds):
+        """
+        Account the response time of a server.
+
+        :param seconds: time to the response headers, in seconds.
+        :type seconds: number
+        """
+        with self.__lock:
+            self.__histogram.add(seconds)
+
+    def stats(self):
+        """
+        Return usage counters: count of requests raced, count of
+        requests a hedge was sent for and count of requests won
+        by a hedge.
+
+        :rtype: dict
+        """
+        with self.__lock:
+            return dict(self.__stats)
+
+    def _count(self, name):
+        """
+        Increment the usage counter.
+
+        :param name: counter name.
+        :type name: string
+        """
+        with self.__lock:
+            self.__stats[name] += 1
+
+
+def race(policy, calls, discard):
+    """
+    Make the same request to several servers and return the first
+    response got. Each function of the list sends the request to the
+    next server. The first function is called at once; the next one
+    is called when the hedge delay passes without a response or when
+    the server cannot be connected to. Responses of the losers are
+    passed to the discard function as soon as they arrive.
+    Return the response and the count of functions called.
+
+    :param policy: hedging policy.
+    :type policy: instance of HedgePolicy
+    :param calls: functions sending the request, in order of
+        preference. A function must raise ConnectError when the
+        server cannot be connected to.
+    :type calls: list of callables
+    :param discard: function to call with each response lost.
+    :type discard: callable
+    :rtype: (response, count) tuple
+    :raises NoAliveServersError: when no server can be connected.
+    """
+    pending = list(calls)
+    running = []
+    finished = Queue.Queue()
+    errors = []
+    hedges = []
+
+    def start(hedge = False):
+        future = Future()
+        started = time.time()
+
+        def done(future):
+            if future.exception() is None:
+                policy.record(time.time() - started)
+            finished.put(future)
+        future.addDoneCallback(done)
+        thread = threading.Thread(target = future._run,
+                                  args = (pending.pop(0), (), {}))
+        thread.daemon = True
+        thread.start()
+        running.append(future)
+        if hedge:
+            hedges.append(future)
+
+    def drop(future):
+        if future.exception() is None:
+            discard(future.result())
+
+    policy._count('requests')
+    start()
+    hedge_at = time.time() + policy.delay()
+    try:
+        while True:
+            can_hedge = pending and len(hedges) < policy.max_hedges
+            if can_hedge:
+                timeout = max(0, hedge_at - time.time())
+            else:
+                timeout = WAIT_SLICE
+            try:
+                future = finished.get(timeout = timeout)
+            except Queue.Empty:
+                if can_hedge:
+                    if not hedges:
+                        policy._count('hedged')
+                    start(True)
+                    hedge_at = time.time() + policy.delay()
+                continue
+            running.remove(future)
+            exc = future.exception()
+            if exc is None:
+                if future in hedges:
+                    policy._count('hedge_wins')
+                return future.result(), len(calls) - len(pending)
+            if not isinstance(exc, ConnectError):
+                if not running:
+                    # re-raise with the original traceback
+                    future.result()
+                errors.append(future)
+                continue
+            errors.append(future)
+            if pending:
+                start()
+                hedge_at = time.time() + policy.delay()
+            elif not running:
+                break
+    finally:
+        for future in running:
+            future.addDoneCallback(drop)
+    for future in errors:
+        if not isinstance(future.exception(), ConnectError):
+            future.result()
+    raise NoAliveServersError('; '.join(str(future.exception())
+                                        for future in errors))
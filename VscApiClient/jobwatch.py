@@ -0,0 +1,124 @@
+"""
+Watching VSC jobs state with a single list request per poll.
+"""
+
+import time
+
+from .errors import NotFoundError, TimeoutError
+from .retry import jittered
+
+# ----------------------------------------------------------------------
+# local definitions
+
+JOB_ID_KEY = 'id'
+JOB_STATE_KEY = 'state'
+DEFAULT_MIN_INTERVAL = 1
+DEFAULT_MAX_INTERVAL = 30
+
+
+def watchJobs(client, job_ids, until_states = None, timeout = None,
+              all_users = False, min_interval = DEFAULT_MIN_INTERVAL,
+              max_interval = DEFAULT_MAX_INTERVAL):
+    """
+    Watch the jobs and yield their state transitions.
+    Each poll costs a single jobList() request (or jobListAll() for
+    all_users) whatever the count of watched jobs is. Only jobs which
+    have left the list of active jobs are requested one by one.
+    The poll interval doubles while nothing changes, up to the
+    max_interval, and drops back to min_interval on any transition.
+    A job is not watched anymore as soon as it reaches one of
+    until_states or leaves the list of active jobs. A job which
+    cannot be found yields the None state.
+
+    :param client: client to use.
+    :type client: instance of VscApiClient
+    :param job_ids: UUIDs of the jobs to watch.
+    :type job_ids: iterable of strings
+    :param until_states: states to stop watching at.
+    :type until_states: iterable of strings or None
+    :param timeout: maximum time to watch, in seconds.
+        Watch until all the jobs are done if not defined.
+    :type timeout: number or None
+    :param all_users: list jobs of all users instead of the caller's
+        own jobs. Requires extra privileges.
+    :type all_users: boolean
+    :param min_interval: minimum time between polls, in seconds.
+    :type min_interval: number
+    :param max_interval: maximum time between polls, in seconds.
+    :type max_interval: number
+    :rtype: generator of (job_id, old_state, new_state, job_data) tuples
+    :raises TimeoutError: when the jobs are not done in time.
+    """
+    if until_states is not None:
+        until_states = frozenset(until_states)
+    states = dict((job_id, None) for job_id in job_ids)
+    pending = set(states)
+    deadline = None
+    if timeout is not None:
+        deadline = time.time() + timeout
+    interval = min_interval
+    while pending:
+        if all_users:
+            jobs = client.jobListAll()
+        else:
+            jobs = client.jobList()
+        active = dict((job[JOB_ID_KEY], job) for job in jobs
+                      if job.get(JOB_ID_KEY) in pending)
+        finished = pending.difference(active)
+        found = dict(active)
+        if finished:
+            for job_id, data in client.jobGetDataMany(finished).items():
+                if isinstance(data, NotFoundError):
+                    found[job_id] = None
+                elif isinstance(data, Exception):
+                    raise data
+                else:
+                    found[job_id] = data
+        changed = False
+        for job_id, data in found.items():
+            if data is None:
+                state = None
+            else:
+                state = data.get(JOB_STATE_KEY)
+            if state != states[job_id] or job_id in finished:
+                changed = True
+                old_state = states[job_id]
+                states[job_id] = state
+                if job_id in finished or \
+                        (until_states is not None and state in until_states):
+                    pending.discard(job_id)
+                yield job_id, old_state, state, data
+        if not pending:
+            return
+        if changed:
+            interval = min_interval
+        else:
+            interval = min(max_interval, interval * 2)
+        delay = jittered(interval, 0.8, 1.2)
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise TimeoutError
+            delay = min(delay, remaining)
+        time.sleep(delay)
+
+
+def waitJobs(client, job_ids, until_states = None, timeout = None,
+             all_users = False, min_interval = DEFAULT_MIN_INTERVAL,
+             max_interval = DEFAULT_MAX_INTERVAL):
+    """
+    Wait until each job reaches one of the states or finishes.
+    Return the last known state of each job (None for jobs
+    which cannot be found).
+
+    See watchJobs() for the arguments description.
+
+    :rtype: dict of job_id: state
+    :raises TimeoutError: when the jobs are not done in time.
+    """
+    states = {}
+    for job_id, _old_state, state, _data in watchJobs(
+            client, job_ids, until_states, timeout, all_users,
+            min_interval, max_interval):
+        states[job_id] = state
+    return states
@@ -0,0 +1,83 @@
+"""
+Incremental decoding of JSON arrays read from a stream.
+"""
+
+import json
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+def iterArray(read, chunk_size = DEFAULT_CHUNK_SIZE):
+    """
+    Decode top level JSON array read from the stream and yield its
+    elements one by one. The stream is read in chunks so only the
+    element being decoded is kept in memory, whatever the length
+    of the array is. Empty stream is treated as an empty array.
+
+    :param read: function reading up to the given count of bytes
+        from the stream and returning an empty string at the end.
+    :type read: callable
+    :param chunk_size: count of bytes to read at once.
+    :type chunk_size: integer
+    :rtype: generator
+    :raises ValueError: when the stream contains no valid JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    expect_value = True
+    started = False
+    while True:
+        # skip whitespace, reading more data when needed
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf = read(chunk_size)
+            pos = 0
+            eof = not buf
+        if pos == len(buf):
+            if not started:
+                return
+            raise ValueError('Unexpected end of JSON array')
+        if not started:
+            if buf[pos] != '[':
+                raise ValueError('JSON array expected')
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == ']':
+            return
+        if not expect_value:
+            if buf[pos] != ',':
+                raise ValueError(
+                    'Expecting , delimiter at {0!r}'.format(buf[pos:pos + 20]))
+            pos += 1
+            expect_value = True
+            continue
+        # decode the next element. A number at the end of the buffer
+        # may be incomplete, so the element is accepted only when it
+        # is followed by a character which cannot continue a number.
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                if eof or (end < len(buf) and
+                           buf[end] not in _NUMBER_CHARS):
+                    break
+            except ValueError:
+                if eof:
+                    raise
+            chunk = read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+        pos = end
+        expect_value = False
+        yield value
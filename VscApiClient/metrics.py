@@ -0,0 +1,260 @@
+"""
+Request instrumentation for VSC API Client.
+"""
+
+import math
+import threading
+
+# ----------------------------------------------------------------------
+# local definitions
+
+# request phases timed by the client, in seconds
+PHASES = ('dns_time', 'connect_time', 'ttfb', 'read_time', 'decode_time',
+          'total_time')
+PERCENTILES = (50, 95, 99)
+
+HISTOGRAM_MIN_VALUE = 0.00001
+HISTOGRAM_FACTOR = 1.05
+
+
+class RequestInfo(object):
+    """
+    Statistics of a single API request.
+
+    Attributes:
+    binding - name of the client method issued the request;
+    method - HTTP method;
+    path - resource path;
+    endpoint - 'host:port' of the server answered the request;
+    status - HTTP status code of the final response;
+    dns_time - time spent to resolve server addresses;
+    connect_time - time spent to establish TCP connection and
+        TLS session (zero for reused connections);
+    ttfb - time from sending the request to receiving response
+        headers (time to first byte);
+    read_time - time spent to read the response body;
+    decode_time - time spent to decode the response body;
+    total_time - whole request time;
+    retries - count of repeated attempts (failovers, hedges and
+        retries);
+    error - name of the exception class raised, if any.
+    All times are in seconds and are summed over redirects
+    and retries.
+    """
+
+    __slots__ = ('binding', 'method', 'path', 'endpoint', 'status') + \
+        PHASES + ('retries', 'error')
+
+    def __init__(self, binding, method, path):
+        """
+        Class constructor.
+
+        :param binding: name of the client method.
+        :type binding: string
+        :param method: HTTP method.
+        :type method: string
+        :param path: resource path.
+        :type path: string
+        """
+        self.binding = binding
+        self.method = method
+        self.path = path
+        self.endpoint = None
+        self.status = None
+        for phase in PHASES:
+            setattr(self, phase, 0.0)
+        self.retries = 0
+        self.error = None
+
+    def asDict(self):
+        """
+        Return the statistics as a dictionary.
+
+        :rtype: dict
+        """
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+
+class Instrument(object):
+    """
+    Base class for request instrumentation hooks.
+    An instance passed to VscApiClient is notified about
+    every request made.
+    """
+
+    def requestDone(self, info):
+        """
+        Called when the request is finished, either successfully
+        or with an exception. Can be called from several threads
+        at the same time.
+
+        :param info: request statistics.
+        :type info: instance of RequestInfo
+        """
+        pass
+
+
+class Histogram(object):
+    """
+    Histogram of non-negative values with logarithmic buckets.
+    Takes constant memory whatever the count of values is;
+    percentiles are estimated with relative error not greater
+    than HISTOGRAM_FACTOR - 1.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self.__buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        """
+        Add the value to the histogram.
+
+        :param value: value to add.
+        :type value: number
+        """
+        if value <= HISTOGRAM_MIN_VALUE:
+            index = 0
+        else:
+            index = 1 + int(math.log(value / HISTOGRAM_MIN_VALUE) /
+                            math.log(HISTOGRAM_FACTOR))
+        self.__buckets[index] = self.__buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """
+        Return estimated percentile of the values added.
+        Return None if no values were added.
+
+        :param percent: percentile to estimate, from 0 to 100.
+        :type percent: number
+        :rtype: float or None
+        """
+        if not self.count:
+            return None
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index in sorted(self.__buckets):
+            seen += self.__buckets[index]
+            if seen >= rank:
+                upper = HISTOGRAM_MIN_VALUE * HISTOGRAM_FACTOR ** index
+                return min(upper, self.max)
+        return self.max
+
+    def mean(self):
+        """
+        Return mean of the values added or None if no values were added.
+
+        :rtype: float or None
+        """
+        if not self.count:
+            return None
+        return self.total / self.count
+
+
+class HistogramCollector(Instrument):
+    """
+    Instrument collecting histograms of request phase timings
+    per client method (and optionally per server endpoint).
+    """
+
+    def __init__(self, by_endpoint = False):
+        """
+        Class constructor.
+
+        :param by_endpoint: collect statistics per client method and
+            server endpoint pair instead of per client method only.
+        :type by_endpoint: boolean
+        """
+        self.__by_endpoint = by_endpoint
+        self.__lock = threading.Lock()
+        self.__entries = {}
+
+    def requestDone(self, info):
+        """
+        Add request statistics to the histograms.
+
+        :param info: request statistics.
+        :type info: instance of RequestInfo
+        """
+        key = info.binding
+        if self.__by_endpoint:
+            key = '{0}@{1}'.format(info.binding, info.endpoint)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                entry = {'histograms': dict((phase, Histogram())
+                                            for phase in PHASES),
+                         'statuses': {}, 'errors': 0, 'retries': 0}
+                self.__entries[key] = entry
+            for phase in PHASES:
+                entry['histograms'][phase].add(getattr(info, phase))
+            statuses = entry['statuses']
+            statuses[info.status] = statuses.get(info.status, 0) + 1
+            if info.error is not None:
+                entry['errors'] += 1
+            entry['retries'] += info.retries
+
+    def percentile(self, key, percent, phase = 'total_time'):
+        """
+        Return estimated percentile of the phase timing for the client
+        method (or 'method@host:port' when collected per endpoint).
+        Return None when there is no statistics yet.
+
+        :param key: client method name.
+        :type key: string
+        :param percent: percentile to estimate, from 0 to 100.
+        :type percent: number
+        :param phase: request phase, one of PHASES.
+        :type phase: string
+        :rtype: float or None
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+            return entry['histograms'][phase].percentile(percent)
+
+    def dump(self):
+        """
+        Return collected statistics as a dictionary suitable for
+        JSON encoding: for each client method there are count of
+        requests, count of errors, total count of retries, counts
+        of HTTP status codes and the mean and PERCENTILES (p50, p95,
+        p99) of each of PHASES.
+
+        :rtype: dict
+        """
+        result = {}
+        with self.__lock:
+            for key, entry in self.__entries.items():
+                histograms = entry['histograms']
+                item = {
+                    'count': histograms['total_time'].count,
+                    'errors': entry['errors'],
+                    'retries': entry['retries'],
+                    'statuses': dict((str(status), count) for status, count
+                                     in entry['statuses'].items())}
+                for phase in PHASES:
+                    histogram = histograms[phase]
+                    stats = {'mean': histogram.mean()}
+                    for percent in PERCENTILES:
+                        stats['p{0}'.format(percent)] = \
+                            histogram.percentile(percent)
+                    item[phase] = stats
+                result[key] = item
+        return result
+
+    def reset(self):
+        """
+        Drop all collected statistics.
+        """
+        with self.__lock:
+            self.__entries = {}
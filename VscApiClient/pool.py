@@ -0,0 +1,357 @@
+"""
+Persistent HTTP connection pool for VSC API Client.
+"""
+
+import httplib
+import select
+import socket
+import threading
+import time
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_MAX_IDLE = 8
+DEFAULT_IDLE_TIMEOUT = 30
+
+# HTTP methods which can be repeated without changing the outcome.
+# PUT requests of VSC API always address a resource by the ID chosen
+# by the client, so they are idempotent too, except the ones creating
+# a resource (see VscApiClient.retry.isCreate()).
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE')
+
+
+class ConnectError(socket.error):
+    """
+    Failed to establish a connection to the server.
+    Nothing was sent to the server so the request can be safely
+    repeated with another server.
+    """
+    pass
+
+
+class ConnectionPool(object):
+    """
+    Pool of persistent (HTTP/1.1 keep-alive) connections.
+    Idle connections are kept separately for each (host, port, secure)
+    triple and reused by subsequent requests to the same endpoint,
+    so the TCP connection and TLS handshake costs are paid only once.
+    The pool is safe to share between threads and between several
+    VscApiClient instances.
+    """
+
+    def __init__(self, max_idle = DEFAULT_MAX_IDLE,
+                 idle_timeout = DEFAULT_IDLE_TIMEOUT):
+        """
+        Class constructor.
+
+        :param max_idle: maximum count of idle connections kept
+            for each endpoint.
+        :type max_idle: integer
+        :param idle_timeout: idle connections older than the value
+            (in seconds) will be closed instead of reuse.
+        :type idle_timeout: number
+        """
+        self.__max_idle = max_idle
+        self.__idle_timeout = idle_timeout
+        self.__idle = {}
+        self.__lock = threading.Lock()
+        self.__stats = {'requests': 0, 'created': 0, 'reused': 0,
+                        'resets': 0, 'discarded': 0}
+
+    def request(self, host, port, secure, method, path, body = None,
+                headers = None, timeout = None, idempotent = None):
+        """
+        Send the HTTP request over a pooled connection.
+        When an idle connection turns out to be closed by the server,
+        it is dropped and the request is sent once more over a fresh
+        connection. The request is sent once more only when it could
+        not be written to the connection or when it is idempotent:
+        a non-idempotent request could have reached the server before
+        the connection broke, so the error is raised instead.
+
+        :param host: server hostname or IP address.
+        :type host: string
+        :param port: server TCP port number.
+        :type port: integer
+        :param secure: use HTTPS or not.
+        :type secure: boolean
+        :param method: HTTP method to use.
+        :type method: string
+        :param path: request path with query string.
+        :type path: string
+        :param body: request body.
+        :type body: string or None
+        :param headers: request headers.
+        :type headers: dict or None
+        :param timeout: socket timeout in seconds.
+        :type timeout: number or None
+        :param idempotent: can the request be repeated safely.
+            Decided by the method (see IDEMPOTENT_METHODS) when
+            not defined.
+        :type idempotent: boolean or None
+        :rtype: instance of PooledReply
+        :raises ConnectError: when a new connection cannot be
+            established.
+        """
+        key = (host, port, secure)
+        if headers is None:
+            headers = {}
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        self.__count('requests')
+        conn = self._take(key)
+        if conn is not None:
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            started = time.time()
+            try:
+                conn.request(method, path, body, headers)
+            except socket.timeout:
+                conn.close()
+                raise
+            except (socket.error, httplib.CannotSendRequest):
+                # the server has closed the connection while it was
+                # idle and the request was not written. Send it over
+                # a fresh connection.
+                conn.close()
+                self.__count('resets')
+            else:
+                try:
+                    return self.__receive(key, conn, True, started)
+                except socket.timeout:
+                    conn.close()
+                    raise
+                except (socket.error, httplib.BadStatusLine):
+                    # the connection was closed, but the request may
+                    # have reached the server. Only an idempotent one
+                    # can be sent once more.
+                    conn.close()
+                    if not idempotent:
+                        raise
+                    self.__count('resets')
+        if secure:
+            conn = httplib.HTTPSConnection(host, port, timeout = timeout)
+        else:
+            conn = httplib.HTTPConnection(host, port, timeout = timeout)
+        self.__count('created')
+        started = time.time()
+        try:
+            conn.connect()
+        except (socket.error, httplib.HTTPException) as exc:
+            conn.close()
+            raise ConnectError(str(exc))
+        connect_time = time.time() - started
+        try:
+            reply = self.__send(key, conn, False, method, path, body,
+                                headers)
+        except Exception:
+            conn.close()
+            raise
+        reply.connect_time = connect_time
+        return reply
+
+    def stats(self):
+        """
+        Return pool usage counters: total count of requests,
+        count of connections created, count of requests sent over
+        reused connections, count of transparently reset connections
+        and count of idle connections discarded as expired or broken.
+
+        :rtype: dict
+        """
+        with self.__lock:
+            return dict(self.__stats)
+
+    def clear(self):
+        """
+        Close all idle connections.
+        """
+        with self.__lock:
+            idle = self.__idle
+            self.__idle = {}
+        for conns in idle.values():
+            for conn, _ts in conns:
+                conn.close()
+
+    def _take(self, key):
+        """
+        Take an idle connection for the endpoint out of the pool.
+        Return None when no usable connection found.
+
+        :param key: (host, port, secure) triple.
+        :type key: tuple
+        :rtype: httplib.HTTPConnection or None
+        """
+        now = time.time()
+        while True:
+            with self.__lock:
+                conns = self.__idle.get(key)
+                if not conns:
+                    return None
+                conn, released_at = conns.pop()
+            if now - released_at <= self.__idle_timeout and \
+                    not _isBroken(conn):
+                self.__count('reused')
+                return conn
+            conn.close()
+            self.__count('discarded')
+
+    def _put(self, key, conn):
+        """
+        Return the connection to the pool.
+
+        :param key: (host, port, secure) triple.
+        :type key: tuple
+        :param conn: connection to keep.
+        :type conn: httplib.HTTPConnection
+        """
+        with self.__lock:
+            conns = self.__idle.setdefault(key, [])
+            if len(conns) < self.__max_idle:
+                conns.append((conn, time.time()))
+                return
+        conn.close()
+
+    def __send(self, key, conn, reused, method, path, body, headers):
+        """
+        Send the request over the connection and read response headers.
+
+        :rtype: instance of PooledReply
+        """
+        started = time.time()
+        conn.request(method, path, body, headers)
+        return self.__receive(key, conn, reused, started)
+
+    def __receive(self, key, conn, reused, started):
+        """
+        Read response headers of the request sent over the connection.
+
+        :param started: time the request was started to be sent at.
+        :type started: float
+        :rtype: instance of PooledReply
+        """
+        reply = PooledReply(self, key, conn, conn.getresponse(), reused)
+        reply.ttfb = time.time() - started
+        return reply
+
+    def __count(self, name):
+        """
+        Increment the usage counter.
+
+        :param name: counter name.
+        :type name: string
+        """
+        with self.__lock:
+            self.__stats[name] += 1
+
+
+class PooledReply(object):
+    """
+    HTTP response got over a pooled connection.
+    The connection is returned to the pool as soon as the response
+    body is read up to the end.
+    """
+
+    def __init__(self, pool, key, conn, response, reused):
+        """
+        Class constructor.
+
+        :param pool: the pool the connection belongs to.
+        :type pool: instance of ConnectionPool
+        :param key: (host, port, secure) triple.
+        :type key: tuple
+        :param conn: connection the response was got from.
+        :type conn: httplib.HTTPConnection
+        :param response: the response.
+        :type response: httplib.HTTPResponse
+        :param reused: was the connection reused or not.
+        :type reused: boolean
+        """
+        self.__pool = pool
+        self.__key = key
+        self.__conn = conn
+        self.__response = response
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.msg
+        self.reused = reused
+        # time spent to establish the connection (zero for reused
+        # ones) and time to first byte of the response
+        self.connect_time = 0.0
+        self.ttfb = 0.0
+
+    def getheader(self, name, default = None):
+        """
+        Return the response header value.
+
+        :param name: header name.
+        :type name: string
+        :param default: value to return if no header found.
+        :rtype: string or None
+        """
+        return self.__response.getheader(name, default)
+
+    def read(self, amt = None):
+        """
+        Read the response body.
+        Reading the body up to the end releases the connection.
+
+        :param amt: maximum number of bytes to read. The whole body
+            will be read when not defined.
+        :type amt: integer or None
+        :rtype: string
+        """
+        if self.__conn is None:
+            return ''
+        try:
+            if amt is None:
+                data = self.__response.read()
+            else:
+                data = self.__response.read(amt)
+        except Exception:
+            self.close()
+            raise
+        if self.__response.isclosed():
+            self.__release()
+        return data
+
+    def close(self):
+        """
+        Close the response without reading the rest of the body.
+        The connection is closed and not returned to the pool.
+        """
+        if self.__conn is not None:
+            self.__response.close()
+            self.__conn.close()
+            self.__conn = None
+
+    def __release(self):
+        """
+        Return the connection back to the pool.
+        """
+        conn = self.__conn
+        self.__conn = None
+        if self.__response.will_close:
+            conn.close()
+        else:
+            self.__pool._put(self.__key, conn)
+
+
+def _isBroken(conn):
+    """
+    Check if the idle connection was closed by the peer.
+    An idle keep-alive socket must not be readable: readability
+    means either EOF or unexpected garbage.
+
+    :param conn: idle connection.
+    :type conn: httplib.HTTPConnection
+    :rtype: boolean
+    """
+    if conn.sock is None:
+        return True
+    try:
+        readable = select.select([conn.sock], [], [], 0)[0]
+    except (select.error, socket.error, ValueError):
+        return True
+    return bool(readable)
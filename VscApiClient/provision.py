@@ -0,0 +1,139 @@
+"""
+Bulk provisioning of VSC users and roles.
+"""
+
+from .concurrency import Executor
+from .errors import BadArgError, DependencyError
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_CONCURRENCY = 8
+
+# keys of the provisioning spec
+SPEC_KEYS = ('users', 'roles', 'role_minors', 'user_roles')
+
+
+def provision(client, spec, concurrency = DEFAULT_CONCURRENCY):
+    """
+    Create users and roles and relations between them as described
+    by the spec. The spec is a dictionary with the keys:
+
+    users - dict of user_id: user_data for users to create;
+    roles - dict of role_id: role_data for roles to create;
+    role_minors - dict of major_id: list of minor role IDs to add
+        to the major role. Relations are added, existing ones are
+        kept;
+    user_roles - dict of user_id: list of role IDs to set for the
+        user. Roles assigned to the user before are removed.
+
+    Any key can be omitted. Relations can refer to users and roles
+    existing on the server as well.
+    Operations are ordered by their dependencies: users and roles
+    are created first, then relations are made. Operations of the
+    same level are done concurrently. A failed operation does not
+    abort the others, but operations depending on it are skipped.
+
+    Return a dictionary with a result for each operation: None on
+    success or the exception it failed with (DependencyError for
+    the skipped ones). Operations are identified with tuples:
+    ('user', user_id), ('role', role_id),
+    ('role_minor', major_id, minor_id) and ('user_roles', user_id).
+
+    :param client: client to use.
+    :type client: instance of VscApiClient
+    :param spec: what to provision.
+    :type spec: dict
+    :param concurrency: maximum count of requests sent at once.
+    :type concurrency: positive integer
+    :rtype: dict of tuple: (None or instance of Exception)
+    """
+    levels = _levels(_plan(client, spec))
+    results = {}
+    if not levels:
+        return results
+    with Executor(concurrency) as executor:
+        for level in levels:
+            futures = []
+            for key, function, args, deps in level:
+                failed = [dep for dep in deps
+                          if results.get(dep) is not None]
+                if failed:
+                    results[key] = DependencyError(
+                        'Depends on failed {0}'.format(
+                            ', '.join('/'.join(dep) for dep in failed)))
+                    continue
+                futures.append((key, executor.submit(function, *args)))
+            for key, future in futures:
+                results[key] = future.exception()
+    return results
+
+
+def _plan(client, spec):
+    """
+    Turn the spec into a list of operations.
+
+    :param client: client to use.
+    :type client: instance of VscApiClient
+    :param spec: what to provision.
+    :type spec: dict
+    :rtype: list of (key, function, args, dependencies) tuples
+    """
+    unknown = set(spec).difference(SPEC_KEYS)
+    if unknown:
+        raise BadArgError('Unknown spec keys: {0}'.format(
+            ', '.join(sorted(unknown))))
+    users = spec.get('users') or {}
+    roles = spec.get('roles') or {}
+    items = []
+    for user_id, data in sorted(users.items()):
+        items.append((('user', user_id), client.aaaAddUser,
+                      (data, user_id), ()))
+    for role_id, data in sorted(roles.items()):
+        items.append((('role', role_id), client.aaaAddRole,
+                      (data, role_id), ()))
+    for major_id, minor_ids in sorted((spec.get('role_minors') or
+                                       {}).items()):
+        for minor_id in minor_ids:
+            deps = tuple(('role', role_id) for role_id in (major_id, minor_id)
+                         if role_id in roles)
+            items.append((('role_minor', major_id, minor_id),
+                          client.aaaAddRoleRoleRelation,
+                          (major_id, minor_id), deps))
+    for user_id, role_ids in sorted((spec.get('user_roles') or
+                                     {}).items()):
+        role_ids = list(role_ids)
+        deps = tuple(('role', role_id) for role_id in role_ids
+                     if role_id in roles)
+        if user_id in users:
+            deps = (('user', user_id),) + deps
+        items.append((('user_roles', user_id), client.aaaSetUserRoles,
+                      (user_id, role_ids), deps))
+    return items
+
+
+def _levels(items):
+    """
+    Group operations into levels: an operation goes to the level
+    next to the highest level of its dependencies.
+
+    :param items: operations.
+    :type items: list of (key, function, args, dependencies) tuples
+    :rtype: list of lists of operations
+    """
+    by_key = dict((item[0], item) for item in items)
+    depths = {}
+
+    def depth(key):
+        if key not in depths:
+            depths[key] = 1 + max([depth(dep) for dep in by_key[key][3]
+                                   if dep in by_key] or [-1])
+        return depths[key]
+
+    levels = []
+    for item in items:
+        level = depth(item[0])
+        while len(levels) <= level:
+            levels.append([])
+        levels[level].append(item)
+    return levels
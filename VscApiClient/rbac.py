@@ -0,0 +1,489 @@
+"""
+Role graph index and declarative synchronization of VSC roles.
+"""
+
+import threading
+
+from .concurrency import Executor
+from .errors import BadArgError, NotFoundError
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_CONCURRENCY = 8
+
+# keys of the desired state for sync()
+SYNC_KEYS = ('role_minors', 'user_roles')
+
+
+class RoleGraph(object):
+    """
+    Client side snapshot of the VSC role hierarchy and, optionally,
+    of roles assigned to users.
+    A major role includes all its minor roles, so the effective
+    roles of a user are the roles assigned to the user and all
+    their minor roles, transitively. The snapshot answers such
+    questions in memory, without a request per relation.
+    When the snapshot is attached to a client, the client keeps it
+    up to date on its own changes of roles and relations. Changes
+    made by other clients are seen only after the next load().
+    The snapshot is safe to share between threads.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self.__lock = threading.RLock()
+        self.__roles = {}
+        self.__minors = {}
+        self.__majors = {}
+        self.__user_roles = {}
+
+    def load(self, client, with_users = False,
+             concurrency = DEFAULT_CONCURRENCY):
+        """
+        Replace the snapshot with the current state got from the
+        server. Minor roles of all the roles (and roles of all the
+        users, if requested) are requested concurrently.
+
+        :param client: client to use.
+        :type client: instance of VscApiClient
+        :param with_users: load roles assigned to users too.
+        :type with_users: boolean
+        :param concurrency: maximum count of requests sent at once.
+        :type concurrency: positive integer
+        """
+        roles = dict((role_id, data) for role_id, data in
+                     client.aaaListRoles('full'))
+        user_ids = []
+        if with_users:
+            user_ids = client.aaaListUsers()
+        with Executor(concurrency) as executor:
+            minors = [(role_id,
+                       executor.submit(client.aaaListRoleMinors, role_id))
+                      for role_id in roles]
+            user_roles = [(user_id,
+                           executor.submit(client.aaaListUserRoles,
+                                           user_id))
+                          for user_id in user_ids]
+        graph_minors = dict((role_id, set()) for role_id in roles)
+        graph_majors = dict((role_id, set()) for role_id in roles)
+        for major_id, future in minors:
+            for minor_id in _result(future, ()):
+                graph_minors[major_id].add(minor_id)
+                graph_majors.setdefault(minor_id, set()).add(major_id)
+        graph_user_roles = {}
+        for user_id, future in user_roles:
+            role_ids = _result(future, None)
+            if role_ids is not None:
+                graph_user_roles[user_id] = set(role_ids)
+        with self.__lock:
+            self.__roles = roles
+            self.__minors = graph_minors
+            self.__majors = graph_majors
+            self.__user_roles = graph_user_roles
+
+    def roles(self):
+        """
+        Return IDs of all known roles.
+
+        :rtype: list of strings
+        """
+        with self.__lock:
+            return list(self.__roles)
+
+    def roleData(self, role_id):
+        """
+        Return the role data dictionary or None if the role
+        is not known.
+
+        :param role_id: UUID of the role.
+        :type role_id: string
+        :rtype: dict or None
+        """
+        with self.__lock:
+            return self.__roles.get(role_id)
+
+    def minors(self, role_id, transitive = False):
+        """
+        Return minor roles of the role.
+
+        :param role_id: UUID of the role.
+        :type role_id: string
+        :param transitive: return minor roles of the minor roles
+            too, and so on.
+        :type transitive: boolean
+        :rtype: set of strings
+        """
+        with self.__lock:
+            if transitive:
+                return _reach(self.__minors, [role_id])
+            return set(self.__minors.get(role_id, ()))
+
+    def majors(self, role_id, transitive = False):
+        """
+        Return major roles of the role.
+
+        :param role_id: UUID of the role.
+        :type role_id: string
+        :param transitive: return major roles of the major roles
+            too, and so on.
+        :type transitive: boolean
+        :rtype: set of strings
+        """
+        with self.__lock:
+            if transitive:
+                return _reach(self.__majors, [role_id])
+            return set(self.__majors.get(role_id, ()))
+
+    def userRoles(self, user_id):
+        """
+        Return roles assigned to the user or None if roles
+        of the user are not known.
+
+        :param user_id: UUID of the user.
+        :type user_id: string
+        :rtype: set of strings or None
+        """
+        with self.__lock:
+            role_ids = self.__user_roles.get(user_id)
+            if role_ids is None:
+                return None
+            return set(role_ids)
+
+    def effectiveRoles(self, role_ids):
+        """
+        Return the roles with all their minor roles, transitively.
+
+        :param role_ids: UUIDs of the roles.
+        :type role_ids: iterable of strings
+        :rtype: set of strings
+        """
+        role_ids = set(role_ids)
+        with self.__lock:
+            return role_ids.union(_reach(self.__minors, role_ids))
+
+    def effectiveUserRoles(self, user_id):
+        """
+        Return effective roles of the user or None if roles
+        of the user are not known.
+
+        :param user_id: UUID of the user.
+        :type user_id: string
+        :rtype: set of strings or None
+        """
+        with self.__lock:
+            role_ids = self.__user_roles.get(user_id)
+            if role_ids is None:
+                return None
+            return self.effectiveRoles(role_ids)
+
+    def findCycles(self):
+        """
+        Return groups of roles which are minor roles of themselves,
+        transitively (strongly connected components of the graph).
+
+        :rtype: list of lists of strings
+        """
+        with self.__lock:
+            return _cycles(self.__minors)
+
+    def addRole(self, role_id, data = None):
+        """
+        Account a role created.
+
+        :param role_id: UUID of the role.
+        :type role_id: string
+        :param data: role data dictionary.
+        :type data: dict or None
+        """
+        with self.__lock:
+            self.__roles[role_id] = data
+            self.__minors.setdefault(role_id, set())
+            self.__majors.setdefault(role_id, set())
+
+    def delRole(self, role_id):
+        """
+        Account a role removed with all its relations.
+
+        :param role_id: UUID of the role.
+        :type role_id: string
+        """
+        with self.__lock:
+            self.__roles.pop(role_id, None)
+            for minor_id in self.__minors.pop(role_id, ()):
+                self.__majors.get(minor_id, set()).discard(role_id)
+            for major_id in self.__majors.pop(role_id, ()):
+                self.__minors.get(major_id, set()).discard(role_id)
+            for role_ids in self.__user_roles.values():
+                role_ids.discard(role_id)
+
+    def addRelation(self, major_id, minor_id):
+        """
+        Account a role-to-role relation added.
+
+        :param major_id: UUID of the major role.
+        :type major_id: string
+        :param minor_id: UUID of the minor role.
+        :type minor_id: string
+        """
+        with self.__lock:
+            self.__minors.setdefault(major_id, set()).add(minor_id)
+            self.__majors.setdefault(minor_id, set()).add(major_id)
+
+    def delRelation(self, major_id, minor_id):
+        """
+        Account a role-to-role relation removed.
+
+        :param major_id: UUID of the major role.
+        :type major_id: string
+        :param minor_id: UUID of the minor role.
+        :type minor_id: string
+        """
+        with self.__lock:
+            self.__minors.get(major_id, set()).discard(minor_id)
+            self.__majors.get(minor_id, set()).discard(major_id)
+
+    def setMinors(self, major_id, minor_ids):
+        """
+        Account minor roles of the role replaced.
+
+        :param major_id: UUID of the major role.
+        :type major_id: string
+        :param minor_ids: UUIDs of the minor roles.
+        :type minor_ids: iterable of strings
+        """
+        with self.__lock:
+            for minor_id in list(self.__minors.get(major_id, ())):
+                self.delRelation(major_id, minor_id)
+            for minor_id in minor_ids:
+                self.addRelation(major_id, minor_id)
+
+    def addUserRole(self, user_id, role_id):
+        """
+        Account a user-to-role relation added.
+        Ignored for users with unknown roles.
+
+        :param user_id: UUID of the user.
+        :type user_id: string
+        :param role_id: UUID of the role.
+        :type role_id: string
+        """
+        with self.__lock:
+            role_ids = self.__user_roles.get(user_id)
+            if role_ids is not None:
+                role_ids.add(role_id)
+
+    def delUserRole(self, user_id, role_id):
+        """
+        Account a user-to-role relation removed.
+
+        :param user_id: UUID of the user.
+        :type user_id: string
+        :param role_id: UUID of the role.
+        :type role_id: string
+        """
+        with self.__lock:
+            self.__user_roles.get(user_id, set()).discard(role_id)
+
+    def setUserRoles(self, user_id, role_ids):
+        """
+        Account roles of the user replaced.
+        Ignored for users with unknown roles, the same as
+        addUserRole() does.
+
+        :param user_id: UUID of the user.
+        :type user_id: string
+        :param role_ids: UUIDs of the roles.
+        :type role_ids: iterable of strings
+        """
+        with self.__lock:
+            if user_id in self.__user_roles:
+                self.__user_roles[user_id] = set(role_ids)
+
+
+def sync(client, desired, concurrency = DEFAULT_CONCURRENCY,
+         dry_run = False):
+    """
+    Bring role relations on the server to the desired state,
+    making only the changes needed. The desired state is a
+    dictionary with the keys:
+
+    role_minors - dict of major_id: list of minor role IDs;
+    user_roles - dict of user_id: list of role IDs.
+
+    Relations of roles and users not mentioned are not touched.
+    Current relations and the list of roles are requested
+    concurrently, the difference is computed in memory and the
+    relations are added and removed concurrently, so the count
+    of writes depends on the amount of change only.
+
+    Return a dictionary with a result for each change: None on
+    success or the exception it failed with. Changes are
+    identified with tuples: ('add_role_minor', major_id, minor_id),
+    ('del_role_minor', major_id, minor_id),
+    ('add_user_role', user_id, role_id) and
+    ('del_user_role', user_id, role_id). Failures to get the current
+    relations are reported as ('role_minors', major_id) and
+    ('user_roles', user_id). Changes referring to roles which do not
+    exist fail with NotFoundError without a request.
+
+    :param client: client to use.
+    :type client: instance of VscApiClient
+    :param desired: desired state.
+    :type desired: dict
+    :param concurrency: maximum count of requests sent at once.
+    :type concurrency: positive integer
+    :param dry_run: only compute the changes, do not make them.
+        All changes get None as the result.
+    :type dry_run: boolean
+    :rtype: dict of tuple: (None or instance of Exception)
+    """
+    unknown = set(desired).difference(SYNC_KEYS)
+    if unknown:
+        raise BadArgError('Unknown keys: {0}'.format(
+            ', '.join(sorted(unknown))))
+    role_minors = desired.get('role_minors') or {}
+    user_roles = desired.get('user_roles') or {}
+    results = {}
+    if not role_minors and not user_roles:
+        return results
+    with Executor(concurrency) as executor:
+        roles = executor.submit(client.aaaListRoles)
+        current = [(('role_minors', major_id),
+                    executor.submit(client.aaaListRoleMinors, major_id))
+                   for major_id in role_minors]
+        current.extend((('user_roles', user_id),
+                        executor.submit(client.aaaListUserRoles, user_id))
+                       for user_id in user_roles)
+        existing = set(roles.result())
+        changes = []
+        for key, future in current:
+            exception = future.exception()
+            if exception is not None:
+                results[key] = exception
+                continue
+            kind, entity_id = key
+            if kind == 'role_minors':
+                wanted = role_minors[entity_id]
+                add = ('add_role_minor', client.aaaAddRoleRoleRelation)
+                delete = ('del_role_minor', client.aaaDelRoleRoleRelation)
+            else:
+                wanted = user_roles[entity_id]
+                add = ('add_user_role', client.aaaAddUserRoleRelation)
+                delete = ('del_user_role', client.aaaDelUserRoleRelation)
+            have = set(future.result())
+            wanted = set(wanted)
+            for role_id in sorted(wanted - have):
+                changes.append(((add[0], entity_id, role_id), add[1]))
+            for role_id in sorted(have - wanted):
+                changes.append(((delete[0], entity_id, role_id),
+                                delete[1]))
+        futures = []
+        for change, function in changes:
+            if change[0].startswith('add_') and change[2] not in existing:
+                results[change] = NotFoundError(
+                    'Role {0} does not exist'.format(change[2]))
+            elif dry_run:
+                results[change] = None
+            else:
+                futures.append((change, executor.submit(
+                    function, change[1], change[2])))
+        for change, future in futures:
+            results[change] = future.exception()
+    return results
+
+
+def _result(future, default):
+    """
+    Return result of the future or the default value if the
+    operation failed with NotFoundError (the object was removed
+    while the snapshot was loaded).
+
+    :param future: finished future.
+    :type future: instance of VscApiClient.concurrency.Future
+    :param default: value to return for objects not found.
+    :rtype: any
+    """
+    exception = future.exception()
+    if isinstance(exception, NotFoundError):
+        return default
+    return future.result()
+
+
+def _reach(edges, start):
+    """
+    Return all nodes reachable from the start nodes, not including
+    the start nodes unless they are reachable from each other.
+
+    :param edges: adjacency sets.
+    :type edges: dict of node: set of nodes
+    :param start: nodes to start with.
+    :type start: iterable
+    :rtype: set
+    """
+    seen = set()
+    stack = list(start)
+    while stack:
+        for node in edges.get(stack.pop(), ()):
+            if node not in seen:
+                seen.add(node)
+                stack.append(node)
+    return seen
+
+
+def _cycles(edges):
+    """
+    Find strongly connected components of the graph having cycles
+    (Tarjan's algorithm, iterative to not depend on the depth of
+    the graph).
+
+    :param edges: adjacency sets.
+    :type edges: dict of node: set of nodes
+    :rtype: list of lists of nodes
+    """
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    cycles = []
+    counter = 0
+    for root in sorted(edges):
+        if root in index:
+            continue
+        work = [(root, iter(sorted(edges.get(root, ()))))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(sorted(edges.get(child,
+                                                              ())))))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or \
+                            node in edges.get(node, ()):
+                        cycles.append(sorted(component))
+    return cycles
@@ -0,0 +1,666 @@
+"""
+Compact typed representations of VSC API results.
+
+Bindings return plain dicts by default. A dict costs several hundred
+bytes even for a handful of keys, which adds up when large listings
+are kept in memory. With result_type='record' the bindings return
+instances of slotted record classes instead: one class is made for
+each kind of object and each set of keys seen, and instances hold
+their values in slots, without a per-instance dict. Short strings
+repeated across a result (states, owner IDs and the like) are
+stored once.
+
+With result_type='table' list bindings return a RecordTable: the
+values are kept by columns, string columns with few distinct values
+are dictionary encoded, and rows can be filtered by such columns
+(by state or owner, for example) without making a record for each
+row.
+"""
+
+import array
+import keyword
+import re
+import threading
+
+from .errors import BadArgError
+
+# ----------------------------------------------------------------------
+# local definitions
+
+RESULT_TYPES = ('dict', 'record', 'table')
+
+# strings up to this length are stored once per result
+MAX_SHARED_LENGTH = 64
+
+# a table column is dictionary encoded while its count of distinct
+# values does not exceed the part of the rows count (but is at least
+# MIN_DICTIONARY_SIZE)
+DICTIONARY_RATIO = 0.1
+MIN_DICTIONARY_SIZE = 256
+
+_IDENTIFIER = re.compile(r'^[A-Za-z][A-Za-z0-9_]*$')
+
+
+class Record(object):
+    """
+    Base class of compact read-only records.
+
+    The values are available both as attributes and, like a dict,
+    by keys. Keys which cannot be attribute names are available
+    by keys only.
+    """
+
+    __slots__ = ()
+
+    # the kind of objects of the class
+    _kind = None
+    # keys stored in slots, in order
+    _fields = ()
+    # values of keys which are not stored in slots
+    _extra = None
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Record is read-only')
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._fields or \
+            (self._extra is not None and key in self._extra)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return self.toDict() == other.toDict()
+        if isinstance(other, dict):
+            return self.toDict() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{0}({1})'.format(
+            self.__class__.__name__,
+            ', '.join('{0}={1!r}'.format(key, self[key])
+                      for key in self.keys()))
+
+    def get(self, key, default = None):
+        """
+        Return the value by the key or the default when there is
+        no such key.
+
+        :param key: key.
+        :type key: string
+        :param default: value to return when there is no key.
+        :rtype: any
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """
+        Return keys of the record.
+
+        :rtype: list of strings
+        """
+        keys = list(self._fields)
+        if self._extra is not None:
+            keys.extend(self._extra)
+        return keys
+
+    def items(self):
+        """
+        Return (key, value) pairs of the record.
+
+        :rtype: list of tuples
+        """
+        return [(key, self[key]) for key in self.keys()]
+
+    def toDict(self):
+        """
+        Return the record as a plain dict, converting nested records
+        too.
+
+        :rtype: dict
+        """
+        return dict((key, _plain(value)) for key, value in self.items())
+
+
+class JobRecord(Record):
+    """
+    Job info.
+    """
+    __slots__ = ()
+    _kind = 'job'
+
+
+class UserRecord(Record):
+    """
+    User data.
+    """
+    __slots__ = ()
+    _kind = 'user'
+
+
+class RoleRecord(Record):
+    """
+    Role data.
+    """
+    __slots__ = ()
+    _kind = 'role'
+
+
+class PackageRecord(Record):
+    """
+    Package metainfo.
+    """
+    __slots__ = ()
+    _kind = 'package'
+
+
+class ImageRecord(Record):
+    """
+    Image metainfo.
+    """
+    __slots__ = ()
+    _kind = 'image'
+
+
+class JobProfileRecord(Record):
+    """
+    Job profile data.
+    """
+    __slots__ = ()
+    _kind = 'job_profile'
+
+
+RECORD_CLASSES = {
+    'job': JobRecord,
+    'user': UserRecord,
+    'role': RoleRecord,
+    'package': PackageRecord,
+    'image': ImageRecord,
+    'job_profile': JobProfileRecord}
+
+_classes = {}
+_classes_lock = threading.Lock()
+
+
+def recordClass(kind, keys):
+    """
+    Return the record class for the objects of the kind with
+    the keys. Classes are made once for each kind and set of keys.
+
+    :param kind: kind of objects: a key of RECORD_CLASSES or None
+        for nested objects.
+    :type kind: string or None
+    :param keys: keys of the objects.
+    :type keys: iterable of strings
+    :rtype: subclass of Record
+    """
+    keys = tuple(sorted(keys))
+    with _classes_lock:
+        cls = _classes.get((kind, keys))
+        if cls is None:
+            base = RECORD_CLASSES.get(kind, Record)
+            fields = tuple(key for key in keys if _isField(key))
+            slots = fields
+            if len(fields) != len(keys):
+                slots += ('_extra',)
+            attrs = {'__slots__': slots, '_fields': fields}
+            cls = type(base.__name__, (base,), attrs)
+            _classes[(kind, keys)] = cls
+        return cls
+
+
+def checkResultType(result_type, allowed = RESULT_TYPES):
+    """
+    Raise BadArgError when the result type is not allowed.
+
+    :param result_type: result type requested.
+    :type result_type: string
+    :param allowed: result types allowed.
+    :type allowed: tuple of strings
+    """
+    if result_type not in allowed:
+        raise BadArgError('Bad result type')
+
+
+def makeRecord(kind, value, shared = None):
+    """
+    Convert the decoded object to a record. Nested objects are
+    converted to records too. Values which are not objects are
+    returned as is.
+
+    :param kind: kind of the object. See recordClass().
+    :type kind: string or None
+    :param value: decoded JSON value.
+    :type value: any
+    :param shared: strings stored once, updated by the call.
+        Pass the same dict to share strings between calls.
+    :type shared: dict or None
+    :rtype: instance of Record or any
+    """
+    if shared is None:
+        shared = {}
+    if isinstance(value, dict):
+        cls = recordClass(kind, value.iterkeys())
+        record = cls.__new__(cls)
+        for key in cls._fields:
+            object.__setattr__(record, key,
+                               makeRecord(None, value[key], shared))
+        if '_extra' in cls.__slots__:
+            object.__setattr__(
+                record, '_extra',
+                dict((key, makeRecord(None, item, shared))
+                     for key, item in value.iteritems()
+                     if key not in cls._fields))
+        return record
+    if isinstance(value, list):
+        return [makeRecord(None, item, shared) for item in value]
+    if isinstance(value, basestring) and \
+            len(value) <= MAX_SHARED_LENGTH:
+        return shared.setdefault(value, value)
+    return value
+
+
+def convert(kind, result, result_type):
+    """
+    Convert the result of a binding to the result type.
+
+    Elements of lists can be objects, [id, object] pairs (as the
+    'full' format of user and role listings returns; the ID is
+    added to the object as the 'id' key) or IDs (converted to
+    objects with the 'id' key only for tables).
+
+    :param kind: kind of the objects. See recordClass().
+    :type kind: string
+    :param result: decoded result: an object or a list (or any
+        other iterable) of objects.
+    :type result: any
+    :param result_type: 'dict', 'record' or 'table'.
+    :type result_type: string
+    :rtype: any
+    """
+    checkResultType(result_type)
+    if result_type == 'dict' or result is None:
+        return result
+    if isinstance(result, dict):
+        if result_type == 'table':
+            raise BadArgError('Bad result type')
+        return makeRecord(kind, result)
+    if result_type == 'table':
+        return RecordTable.fromObjects(
+            kind, (_element(item, True) for item in result))
+    shared = {}
+    return [makeRecord(kind, _element(item, False), shared)
+            for item in result]
+
+
+class RecordTable(object):
+    """
+    Read-only column oriented collection of objects of one kind.
+
+    Each key of the objects is a column. A string column with few
+    distinct values is dictionary encoded: each distinct value is
+    stored once and rows hold array of small integer codes, with
+    the row numbers of each value indexed on demand. Filtering by
+    such columns with where() does not touch the rows at all.
+    Other columns are plain lists.
+
+    Every row has every column: a key missing in an object reads
+    as None in its row.
+
+    A filtered table is a view sharing the columns with the table
+    it was made from. Rows are materialized as records only when
+    accessed by index or iterated over.
+    """
+
+    def __init__(self, kind, columns, count, rows = None, lock = None):
+        """
+        Class constructor. Use fromObjects() to make a table.
+
+        :param kind: kind of the objects. See recordClass().
+        :type kind: string or None
+        :param columns: columns by names.
+        :type columns: dict
+        :param count: count of rows in the columns.
+        :type count: integer
+        :param rows: numbers of the rows of the columns the table
+            consists of. All rows when not defined.
+        :type rows: array.array or None
+        :param lock: lock guarding indices of the columns.
+        :type lock: threading.Lock or None
+        """
+        self.kind = kind
+        self.__columns = columns
+        self.__count = count
+        self.__rows = rows
+        if lock is None:
+            lock = threading.Lock()
+        self.__lock = lock
+
+    @classmethod
+    def fromObjects(cls, kind, objects):
+        """
+        Make a table of the objects.
+
+        :param kind: kind of the objects. See recordClass().
+        :type kind: string or None
+        :param objects: decoded objects.
+        :type objects: iterable of dicts
+        :rtype: instance of RecordTable
+        """
+        values = {}
+        count = 0
+        shared = {}
+        for obj in objects:
+            for key in obj:
+                if key not in values:
+                    values[key] = [None] * count
+            for key, column in values.iteritems():
+                column.append(makeRecord(None, obj.get(key), shared))
+            count += 1
+        limit = max(MIN_DICTIONARY_SIZE, int(count * DICTIONARY_RATIO))
+        columns = {}
+        for key in values.keys():
+            columns[key] = _encode(values.pop(key), limit)
+        return cls(kind, columns, count)
+
+    def _view(self, rows):
+        """
+        Make a view of the table with the rows.
+
+        :param rows: numbers of the rows in the underlying columns.
+        :type rows: array.array or None
+        :rtype: instance of RecordTable
+        """
+        return RecordTable(self.kind, self.__columns, self.__count, rows,
+                           self.__lock)
+
+    def __len__(self):
+        if self.__rows is None:
+            return self.__count
+        return len(self.__rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if self.__rows is None:
+                return self._view(_rowArray(
+                    xrange(*index.indices(self.__count))))
+            return self._view(self.__rows[index])
+        return self.__record(self.__rowNumbers()[index])
+
+    def __iter__(self):
+        for row in self.__rowNumbers():
+            yield self.__record(row)
+
+    def __repr__(self):
+        return '<RecordTable of {0} {1}: {2} rows>'.format(
+            self.kind, sorted(self.__columns), len(self))
+
+    def columns(self):
+        """
+        Return names of the columns.
+
+        :rtype: list of strings
+        """
+        return sorted(self.__columns)
+
+    def column(self, name):
+        """
+        Return values of the column for the rows of the table.
+
+        :param name: column name.
+        :type name: string
+        :rtype: list
+        """
+        column = self.__columns[name]
+        return [column.value(row) for row in self.__rowNumbers()]
+
+    def distinct(self, name):
+        """
+        Return counts of the rows for each distinct value of the
+        column.
+
+        :param name: column name.
+        :type name: string
+        :rtype: dict of value: integer
+        """
+        column = self.__columns[name]
+        result = {}
+        if isinstance(column, _DictionaryColumn):
+            codes = column.codes
+            counts = [0] * len(column.values)
+            for row in self.__rowNumbers():
+                counts[codes[row]] += 1
+            for code, count in enumerate(counts):
+                if count:
+                    result[column.values[code]] = count
+            return result
+        for value in self.column(name):
+            result[value] = result.get(value, 0) + 1
+        return result
+
+    def where(self, **conditions):
+        """
+        Return a view of the rows matching all the conditions.
+        Each condition is a column name and either a value or a list,
+        tuple or set of values, for example
+        where(state = ('running', 'stopped'), owner = user_id).
+        Rows without the column match the None value.
+
+        :rtype: instance of RecordTable
+        """
+        rows = self.__rows
+        for name, wanted in conditions.iteritems():
+            if isinstance(wanted, (list, tuple, set, frozenset)):
+                wanted = set(wanted)
+            else:
+                wanted = set([wanted])
+            column = self.__columns.get(name)
+            if column is None:
+                rows = array.array('l') if None not in wanted else rows
+            else:
+                rows = column.select(wanted, rows, self.__count,
+                                     self.__lock)
+        return self._view(rows)
+
+    def toList(self, result_type = 'record'):
+        """
+        Return the rows as a list of records or of plain dicts.
+
+        :param result_type: 'record' or 'dict'.
+        :type result_type: string
+        :rtype: list
+        """
+        checkResultType(result_type, ('dict', 'record'))
+        if result_type == 'dict':
+            return [record.toDict() for record in self]
+        return list(self)
+
+    def __rowNumbers(self):
+        """
+        Return numbers of the rows of the table in the underlying
+        columns.
+
+        :rtype: sequence of integers
+        """
+        if self.__rows is None:
+            return xrange(self.__count)
+        return self.__rows
+
+    def __record(self, row):
+        """
+        Make the record for the row.
+
+        :param row: row number in the underlying columns.
+        :type row: integer
+        :rtype: instance of Record
+        """
+        values = dict((name, column.value(row))
+                      for name, column in self.__columns.iteritems())
+        cls = recordClass(self.kind, values.iterkeys())
+        record = cls.__new__(cls)
+        for key in cls._fields:
+            object.__setattr__(record, key, values[key])
+        if '_extra' in cls.__slots__:
+            object.__setattr__(
+                record, '_extra',
+                dict((key, value) for key, value in values.iteritems()
+                     if key not in cls._fields))
+        return record
+
+
+class _ListColumn(object):
+    """
+    Column keeping a value for each row.
+    """
+
+    def __init__(self, values):
+        self.values = values
+
+    def value(self, row):
+        return self.values[row]
+
+    def select(self, wanted, rows, count, lock):
+        values = self.values
+        if rows is None:
+            rows = xrange(count)
+        return _rowArray(row for row in rows if values[row] in wanted)
+
+
+class _DictionaryColumn(object):
+    """
+    Dictionary encoded column: distinct values and a code of
+    the value for each row.
+    """
+
+    def __init__(self, values, codes):
+        self.values = values
+        self.codes = codes
+        self.__positions = None
+
+    def value(self, row):
+        return self.values[self.codes[row]]
+
+    def select(self, wanted, rows, count, lock):
+        positions = self.__index(lock)
+        matched = array.array('l')
+        for code, value in enumerate(self.values):
+            if value in wanted:
+                matched.extend(positions[code])
+        if len(wanted) > 1:
+            matched = _rowArray(sorted(matched))
+        if rows is None:
+            return matched
+        keep = set(rows)
+        return _rowArray(row for row in matched if row in keep)
+
+    def __index(self, lock):
+        """
+        Return row numbers of each value, building the index on
+        the first call.
+
+        :rtype: list of array.array
+        """
+        with lock:
+            if self.__positions is None:
+                positions = [array.array('l') for _value in self.values]
+                for row, code in enumerate(self.codes):
+                    positions[code].append(row)
+                self.__positions = positions
+            return self.__positions
+
+
+def _encode(values, limit):
+    """
+    Make a column of the values, dictionary encoded when they are
+    strings (or None) with no more than the limit distinct values.
+
+    :rtype: instance of _ListColumn or _DictionaryColumn
+    """
+    codes = {}
+    for value in values:
+        if value is not None and not isinstance(value, basestring):
+            return _ListColumn(values)
+        if value not in codes:
+            if len(codes) >= limit:
+                return _ListColumn(values)
+            codes[value] = len(codes)
+    typecode = 'B' if len(codes) <= 0x100 else 'H'
+    if len(codes) > 0x10000:
+        typecode = 'l'
+    encoded = array.array(typecode, (codes[value] for value in values))
+    dictionary = [None] * len(codes)
+    for value, code in codes.iteritems():
+        dictionary[code] = value
+    return _DictionaryColumn(dictionary, encoded)
+
+
+def _element(item, table):
+    """
+    Normalize the element of a listing to a dict.
+
+    :rtype: dict or any
+    """
+    if isinstance(item, list) and len(item) == 2 and \
+            isinstance(item[1], dict):
+        obj = dict(item[1])
+        obj.setdefault('id', item[0])
+        return obj
+    if table and not isinstance(item, dict):
+        return {'id': item}
+    return item
+
+
+def _rowArray(rows):
+    """
+    Return the row numbers as an array.
+
+    :rtype: array.array
+    """
+    return array.array('l', rows)
+
+
+def _isField(key):
+    """
+    Check if the key can be stored in a slot and read as attribute.
+
+    :rtype: boolean
+    """
+    return isinstance(key, basestring) and \
+        _IDENTIFIER.match(key) is not None and \
+        not keyword.iskeyword(key) and \
+        not hasattr(Record, key)
+
+
+def _plain(value):
+    """
+    Convert records in the value to plain dicts.
+
+    :rtype: any
+    """
+    if isinstance(value, Record):
+        return value.toDict()
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
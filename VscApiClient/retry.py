@@ -0,0 +1,234 @@
+"""
+Retry policy for VSC API requests.
+"""
+
+import httplib
+import random
+import socket
+import threading
+import time
+import urllib2
+
+from .errors import InternalServerError, NoAliveServersError, \
+    TooManyRequestsError
+from .pool import IDEMPOTENT_METHODS
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_BASE = 0.1
+DEFAULT_BACKOFF_MAX = 5
+DEFAULT_RETRY_AFTER_MAX = 60
+DEFAULT_BUDGET_RATIO = 0.1
+DEFAULT_BUDGET_MIN_PER_SEC = 1
+DEFAULT_BUDGET_MAX_TOKENS = 100
+
+# HTTP status codes of transient server failures
+RETRYABLE_STATUSES = (500, 502, 503, 504)
+
+
+class RetryBudget(object):
+    """
+    Limits retries to a fraction of requests, so retries cannot
+    multiply load on an already overloaded cluster.
+    Each request deposits a fraction of a token, each retry
+    withdraws a whole token. Besides that, a few tokens per second
+    are granted to allow retries when requests are rare.
+    A budget can be shared by any count of clients and threads.
+    """
+
+    def __init__(self, ratio = DEFAULT_BUDGET_RATIO,
+                 min_per_sec = DEFAULT_BUDGET_MIN_PER_SEC,
+                 max_tokens = DEFAULT_BUDGET_MAX_TOKENS):
+        """
+        Class constructor.
+
+        :param ratio: maximum count of retries per request.
+        :type ratio: number
+        :param min_per_sec: count of retries per second allowed
+            regardless of the count of requests.
+        :type min_per_sec: number
+        :param max_tokens: maximum count of retries saved up.
+        :type max_tokens: number
+        """
+        self.__ratio = ratio
+        self.__min_per_sec = min_per_sec
+        self.__max_tokens = max_tokens
+        self.__tokens = float(max_tokens)
+        self.__updated = time.time()
+        self.__lock = threading.Lock()
+
+    def deposit(self):
+        """
+        Account a request.
+        """
+        with self.__lock:
+            self.__tokens = min(self.__max_tokens,
+                                self.__tokens + self.__ratio)
+
+    def withdraw(self):
+        """
+        Try to take a token for a retry.
+        Return True if the retry is allowed.
+
+        :rtype: boolean
+        """
+        with self.__lock:
+            now = time.time()
+            self.__tokens = min(
+                self.__max_tokens,
+                self.__tokens + (now - self.__updated) * self.__min_per_sec)
+            self.__updated = now
+            if self.__tokens < 1:
+                return False
+            self.__tokens -= 1
+            return True
+
+
+# budget shared by all retry policies not given their own one
+_global_budget = RetryBudget()
+
+
+class RetryPolicy(object):
+    """
+    Defines which failed requests are repeated and when.
+    Only idempotent requests are repeated, after network errors
+    and transient server errors, with exponential backoff and
+    full jitter, while the retry budget allows. Requests rejected
+    with '429 Too Many Requests' were not processed by the server,
+    so they are repeated whatever the method is, not earlier than
+    the server asked, but not later than retry_after_max. PUT
+    requests creating a resource are not repeated after other
+    failures: the resource may have been created already and
+    the repeated request would fail.
+    """
+
+    def __init__(self, max_attempts = DEFAULT_MAX_ATTEMPTS,
+                 backoff_base = DEFAULT_BACKOFF_BASE,
+                 backoff_max = DEFAULT_BACKOFF_MAX,
+                 methods = IDEMPOTENT_METHODS, budget = None,
+                 retry_after_max = DEFAULT_RETRY_AFTER_MAX):
+        """
+        Class constructor.
+
+        :param max_attempts: maximum count of attempts for a request,
+            including the first one.
+        :type max_attempts: integer
+        :param backoff_base: maximum delay before the first retry,
+            in seconds. Doubles with each next retry.
+        :type backoff_base: number
+        :param backoff_max: maximum delay between attempts, in seconds.
+        :type backoff_max: number
+        :param methods: HTTP methods allowed to retry.
+        :type methods: tuple of strings
+        :param budget: retry budget. A budget shared by all policies
+            is used when not defined.
+        :type budget: instance of RetryBudget or None
+        :param retry_after_max: maximum delay asked by the server
+            with Retry-After header to wait for, in seconds.
+        :type retry_after_max: number
+        """
+        self.__max_attempts = max_attempts
+        self.__backoff_base = backoff_base
+        self.__backoff_max = backoff_max
+        self.__methods = methods
+        self.__retry_after_max = retry_after_max
+        if budget is None:
+            budget = _global_budget
+        self.__budget = budget
+
+    def requestStarted(self):
+        """
+        Account a new request in the retry budget.
+        """
+        self.__budget.deposit()
+
+    def shouldRetry(self, method, exception, attempt, params = None):
+        """
+        Decide if the failed request is to be repeated.
+        Takes a token from the retry budget when it is.
+
+        :param method: HTTP method of the request.
+        :type method: string
+        :param exception: exception the attempt failed with.
+        :type exception: instance of Exception
+        :param attempt: number of the failed attempt, starting from 1.
+        :type attempt: integer
+        :param params: URL query parameters of the request.
+        :type params: dict or None
+        :rtype: boolean
+        """
+        if attempt >= self.__max_attempts or \
+                not isRetryable(exception) or \
+                ((method not in self.__methods or
+                  isCreate(method, params)) and
+                 not isinstance(exception, TooManyRequestsError)):
+            return False
+        return self.__budget.withdraw()
+
+    def backoff(self, attempt, exception = None):
+        """
+        Return delay before the next attempt, in seconds.
+
+        :param attempt: number of the failed attempt, starting from 1.
+        :type attempt: integer
+        :param exception: exception the attempt failed with.
+        :type exception: instance of Exception or None
+        :rtype: float
+        """
+        delay = jittered(min(self.__backoff_max,
+                             self.__backoff_base * 2 ** (attempt - 1)))
+        if isinstance(exception, TooManyRequestsError) and \
+                exception.retry_after is not None:
+            delay = max(delay, min(exception.retry_after,
+                                   self.__retry_after_max))
+        return delay
+
+
+def jittered(delay, low = 0, high = 1):
+    """
+    Return the delay multiplied by a random factor between low and
+    high. Randomized delays spread retries, probes and polls of many
+    clients in time, so they do not hit the server all at once.
+
+    :param delay: delay, in seconds.
+    :type delay: number
+    :param low: minimum factor.
+    :type low: number
+    :param high: maximum factor.
+    :type high: number
+    :rtype: float
+    """
+    return delay * random.uniform(low, high)
+
+
+def isCreate(method, params):
+    """
+    Check if the request creates a resource. Such requests fail
+    when the resource exists already, so they are not idempotent
+    even though they are PUT requests.
+
+    :param method: HTTP method of the request.
+    :type method: string
+    :param params: URL query parameters of the request.
+    :type params: dict or None
+    :rtype: boolean
+    """
+    return method == 'PUT' and params is not None and \
+        bool(params.get('create'))
+
+
+def isRetryable(exception):
+    """
+    Check if the exception signals a transient failure.
+
+    :param exception: exception to check.
+    :type exception: instance of Exception
+    :rtype: boolean
+    """
+    if isinstance(exception, urllib2.HTTPError):
+        return exception.code in RETRYABLE_STATUSES
+    return isinstance(exception, (socket.error, httplib.HTTPException,
+                                  InternalServerError, NoAliveServersError,
+                                  TooManyRequestsError))
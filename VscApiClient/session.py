@@ -0,0 +1,230 @@
+"""
+Persistent storage of VSC API sessions shared between processes.
+"""
+
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'vscapi',
+                            'sessions.json')
+DEFAULT_MAX_AGE = 12 * 60 * 60
+
+
+class SessionStore(object):
+    """
+    On-disk store of authentication cookies and user IDs, keyed
+    by the API endpoint and the username. A new client process
+    finds the session saved by a previous one and skips
+    the authentication with the credentials.
+    The store is a JSON file readable by the owner only. Access
+    is serialized with an advisory lock on a separate lock file,
+    so the store can be shared by any count of processes.
+    A stored session is used only with the same password it was
+    got with. Errors of the store are ignored: the client just
+    authenticates with the credentials as if nothing was stored.
+    """
+
+    def __init__(self, path = DEFAULT_PATH, max_age = DEFAULT_MAX_AGE):
+        """
+        Class constructor.
+
+        :param path: path to the store file.
+        :type path: string
+        :param max_age: sessions saved earlier than the value
+            (in seconds) ago are not used.
+        :type max_age: number
+        """
+        self.__path = path
+        self.__max_age = max_age
+
+    def load(self, endpoint, username, password):
+        """
+        Return the session saved for the endpoint and the username
+        as (cookie, user_id) tuple or None if there is no valid one.
+
+        :param endpoint: VSC API endpoint address.
+        :type endpoint: string
+        :param username: user login name.
+        :type username: string
+        :param password: user password.
+        :type password: string
+        :rtype: (string, string or None) tuple or None
+        """
+        try:
+            with self.__locked(fcntl.LOCK_SH):
+                sessions = self.__read()
+        except (IOError, OSError):
+            return None
+        entry = sessions.get(endpoint, {}).get(username)
+        if not isinstance(entry, dict):
+            return None
+        try:
+            if time.time() - entry['saved'] > self.__max_age or \
+                    entry['digest'] != _digest(entry['salt'], username,
+                                               password):
+                return None
+            return entry['cookie'], entry.get('user_id')
+        except (KeyError, TypeError):
+            return None
+
+    def save(self, endpoint, username, password, cookie, user_id):
+        """
+        Save the session for the endpoint and the username.
+
+        :param endpoint: VSC API endpoint address.
+        :type endpoint: string
+        :param username: user login name.
+        :type username: string
+        :param password: user password.
+        :type password: string
+        :param cookie: authentication cookie.
+        :type cookie: string
+        :param user_id: UUID of the user.
+        :type user_id: string or None
+        """
+        salt = os.urandom(16).encode('hex')
+        entry = {'cookie': cookie, 'user_id': user_id, 'salt': salt,
+                 'digest': _digest(salt, username, password),
+                 'saved': time.time()}
+
+        def update(sessions):
+            sessions.setdefault(endpoint, {})[username] = entry
+        self.__update(update)
+
+    def drop(self, endpoint, username, cookie = None):
+        """
+        Forget the session saved for the endpoint and the username.
+
+        :param endpoint: VSC API endpoint address.
+        :type endpoint: string
+        :param username: user login name.
+        :type username: string
+        :param cookie: forget the session only if it has this cookie.
+            Useful to not forget a newer session saved by another
+            process.
+        :type cookie: string or None
+        """
+
+        def update(sessions):
+            users = sessions.get(endpoint, {})
+            entry = users.get(username)
+            if entry is None:
+                return
+            if cookie is not None and isinstance(entry, dict) and \
+                    entry.get('cookie') != cookie:
+                return
+            del users[username]
+            if not users:
+                sessions.pop(endpoint, None)
+        self.__update(update)
+
+    def __update(self, function):
+        """
+        Read the store, modify it with the function and write it
+        back, with the store locked exclusively.
+
+        :param function: function modifying the sessions dictionary
+            in place.
+        :type function: callable
+        """
+        try:
+            with self.__locked(fcntl.LOCK_EX):
+                sessions = self.__read()
+                function(sessions)
+                self.__write(sessions)
+        except (IOError, OSError):
+            pass
+
+    def __read(self):
+        """
+        Read the store file. Return an empty dictionary when there
+        is no file or it is corrupted.
+
+        :rtype: dict
+        """
+        try:
+            with open(self.__path) as fd:
+                sessions = json.load(fd)
+        except IOError as exc:
+            if exc.errno == errno.ENOENT:
+                return {}
+            raise
+        except ValueError:
+            return {}
+        if not isinstance(sessions, dict):
+            return {}
+        return sessions
+
+    def __write(self, sessions):
+        """
+        Replace the store file atomically.
+
+        :param sessions: sessions to store.
+        :type sessions: dict
+        """
+        directory = os.path.dirname(self.__path)
+        fd, tmp_path = tempfile.mkstemp(dir = directory)
+        try:
+            with os.fdopen(fd, 'w') as tmp:
+                json.dump(sessions, tmp)
+            os.rename(tmp_path, self.__path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    def __locked(self, operation):
+        """
+        Return context manager holding the store lock.
+
+        :param operation: fcntl.LOCK_SH or fcntl.LOCK_EX.
+        :type operation: integer
+        :rtype: context manager
+        """
+        directory = os.path.dirname(self.__path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0700)
+        return _FileLock(self.__path + '.lock', operation)
+
+
+class _FileLock(object):
+    """
+    Advisory lock on a file, held within a 'with' statement.
+    """
+
+    def __init__(self, path, operation):
+        self.__path = path
+        self.__operation = operation
+        self.__fd = None
+
+    def __enter__(self):
+        self.__fd = os.open(self.__path, os.O_RDWR | os.O_CREAT, 0600)
+        try:
+            fcntl.flock(self.__fd, self.__operation)
+        except Exception:
+            os.close(self.__fd)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        os.close(self.__fd)
+
+
+def _digest(salt, username, password):
+    """
+    Return salted digest of the credentials, to check if a stored
+    session was got with the same password.
+
+    :rtype: string
+    """
+    ident = ':'.join(
+        value.encode('utf-8') if isinstance(value, unicode) else value
+        for value in (salt, username, password))
+    return hashlib.sha256(ident).hexdigest()
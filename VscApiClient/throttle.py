@@ -0,0 +1,157 @@
+"""
+Client side rate limiting for VSC API Client.
+"""
+
+import threading
+import time
+
+# ----------------------------------------------------------------------
+# local definitions
+
+# HTTP methods limited by the read rate. All other methods are
+# limited by the write rate.
+READ_METHODS = ('GET', 'HEAD')
+
+# pause for requests when the server asked to slow down but did not
+# tell for how long, in seconds
+DEFAULT_RETRY_AFTER = 1
+
+
+class TokenBucket(object):
+    """
+    Token bucket rate limiter.
+    Tokens are added with the constant rate up to the bucket
+    capacity, each request takes one token. The capacity defines
+    how many requests can be sent at once after a quiet period.
+    """
+
+    def __init__(self, rate, burst = None):
+        """
+        Class constructor.
+
+        :param rate: count of requests allowed per second.
+        :type rate: positive number
+        :param burst: bucket capacity. Equals to the rate (but
+            at least 1) when not defined.
+        :type burst: positive number or None
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst is None:
+            burst = max(1, rate)
+        self.__rate = float(rate)
+        self.__burst = float(burst)
+        self.__tokens = self.__burst
+        self.__updated = time.time()
+        self.__lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token. Return time to wait before the request can be
+        sent, in seconds. The token is reserved immediately, so
+        concurrent callers are served in order of arrival.
+
+        :rtype: float
+        """
+        with self.__lock:
+            now = time.time()
+            self.__tokens = min(
+                self.__burst,
+                self.__tokens + (now - self.__updated) * self.__rate)
+            self.__updated = now
+            self.__tokens -= 1
+            if self.__tokens >= 0:
+                return 0.0
+            return -self.__tokens / self.__rate
+
+
+class Throttle(object):
+    """
+    Limits rate and concurrency of requests to VSC API Servers.
+    Reads and writes are limited by separate rates, so a flood
+    of writes does not delay reads and vice versa. The count
+    of requests in flight is limited for all of them together.
+    When the server responds with '429 Too Many Requests', all
+    requests are paused for the time the server asked for.
+    A throttle can be shared by any count of clients and threads.
+    """
+
+    def __init__(self, read_rate = None, write_rate = None,
+                 read_burst = None, write_burst = None,
+                 max_in_flight = None):
+        """
+        Class constructor.
+
+        :param read_rate: count of reads (GET and HEAD requests)
+            allowed per second. Not limited when not defined.
+        :type read_rate: positive number or None
+        :param write_rate: count of writes (all other requests)
+            allowed per second. Not limited when not defined.
+        :type write_rate: positive number or None
+        :param read_burst: count of reads which can be sent at once.
+        :type read_burst: positive number or None
+        :param write_burst: count of writes which can be sent at once.
+        :type write_burst: positive number or None
+        :param max_in_flight: maximum count of requests sent at the
+            same time. Not limited when not defined.
+        :type max_in_flight: positive integer or None
+        """
+        self.__read = None
+        if read_rate is not None:
+            self.__read = TokenBucket(read_rate, read_burst)
+        self.__write = None
+        if write_rate is not None:
+            self.__write = TokenBucket(write_rate, write_burst)
+        self.__slots = None
+        if max_in_flight is not None:
+            if max_in_flight < 1:
+                raise ValueError('max_in_flight must be positive')
+            self.__slots = threading.BoundedSemaphore(max_in_flight)
+        self.__paused_until = 0
+        self.__lock = threading.Lock()
+
+    def acquire(self, method):
+        """
+        Wait until the request is allowed to be sent.
+        Each call must be paired with a call to release().
+
+        :param method: HTTP method of the request.
+        :type method: string
+        """
+        while True:
+            with self.__lock:
+                delay = self.__paused_until - time.time()
+            if delay <= 0:
+                break
+            time.sleep(delay)
+        if method in READ_METHODS:
+            bucket = self.__read
+        else:
+            bucket = self.__write
+        if bucket is not None:
+            delay = bucket.reserve()
+            if delay > 0:
+                time.sleep(delay)
+        if self.__slots is not None:
+            self.__slots.acquire()
+
+    def release(self):
+        """
+        Account the request as finished.
+        """
+        if self.__slots is not None:
+            self.__slots.release()
+
+    def backOff(self, seconds = None):
+        """
+        Pause all new requests as the server asked.
+
+        :param seconds: pause duration, in seconds.
+            DEFAULT_RETRY_AFTER is used when not defined.
+        :type seconds: number or None
+        """
+        if seconds is None:
+            seconds = DEFAULT_RETRY_AFTER
+        with self.__lock:
+            self.__paused_until = max(self.__paused_until,
+                                      time.time() + seconds)
@@ -0,0 +1,660 @@
+"""
+Transfer of image archives for VSC API Client.
+"""
+
+import hashlib
+import httplib
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import urlparse
+
+from .concurrency import Executor, asCompleted
+from .errors import TransferError
+from .pool import ConnectionPool
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 60
+DEFAULT_ATTEMPTS = 5
+
+# size of blocks the chunks are read and written by
+BLOCK_SIZE = 64 * 1024
+
+# suffix of the sidecar file keeping state of an interrupted download
+STATE_SUFFIX = '.vscstate'
+
+# suffix of the sidecar file keeping state of an interrupted upload
+UPLOAD_STATE_SUFFIX = '.vscupload'
+
+# HTTP statuses telling the download URL has expired
+EXPIRED_STATUSES = (401, 403, 410)
+
+# minimum interval between saves of the state file, in seconds.
+# Chunks done since the last save are transferred again on resume.
+JOURNAL_SAVE_INTERVAL = 1
+
+
+def download(client, image_id, dest, chunk_size = DEFAULT_CHUNK_SIZE,
+             concurrency = DEFAULT_CONCURRENCY, timeout = DEFAULT_TIMEOUT,
+             attempts = DEFAULT_ATTEMPTS):
+    """
+    Download the image archive to the file.
+
+    The archive is split to chunks fetched concurrently with HTTP
+    Range requests and written straight to their places in the
+    destination file, preallocated to the archive size. A SHA-256
+    digest of each chunk written is saved to a sidecar state file
+    next to the destination. When the download is interrupted,
+    the next call with the same arguments verifies the chunks
+    already written against their digests and fetches only the
+    missing ones. The download starts over when the archive has
+    changed on the server. The state file is removed when the
+    download is complete.
+
+    When the download URL expires mid-transfer, a new one is
+    generated. Failed chunk requests are repeated up to the
+    attempts count.
+
+    Return download statistics: a dictionary with the keys 'size'
+    (archive size in bytes), 'chunks' (count of chunks), 'resumed'
+    (count of chunks found already downloaded), 'transferred' (bytes
+    downloaded by this call), 'seconds' (time spent) and
+    'throughput' (bytes downloaded per second).
+
+    :param client: client to use.
+    :type client: instance of VscApiClient
+    :param image_id: UUID of the image.
+    :type image_id: string
+    :param dest: path to the destination file.
+    :type dest: string
+    :param chunk_size: size of a chunk, in bytes.
+    :type chunk_size: positive integer
+    :param concurrency: maximum count of chunks fetched at once.
+    :type concurrency: positive integer
+    :param timeout: socket timeout, in seconds.
+    :type timeout: number
+    :param attempts: maximum count of attempts to fetch a chunk.
+    :type attempts: positive integer
+    :rtype: dict
+    :raises TransferError: when the archive cannot be downloaded.
+    :raises ValueError: when chunk_size, concurrency or attempts
+        is not positive.
+    """
+    _checkArgs(chunk_size, concurrency, attempts)
+    started = time.time()
+    pool = ConnectionPool(max_idle = concurrency)
+    source = _UrlSource(client, image_id)
+    size, validator, ranges = _probe(pool, source, timeout, attempts)
+    if not ranges:
+        # the server ignores ranges: fetch the archive as one chunk
+        chunk_size = max(1, size)
+    count = (size + chunk_size - 1) // chunk_size
+    state_path = dest + STATE_SUFFIX
+    state = _loadState(state_path)
+    if state is None or \
+            state.get('image_id') != image_id or \
+            state.get('size') != size or \
+            state.get('validator') != validator or \
+            state.get('chunk_size') != chunk_size or \
+            not os.path.isfile(dest):
+        state = {'image_id': image_id, 'size': size,
+                 'validator': validator, 'chunk_size': chunk_size,
+                 'chunks': {}}
+        with open(dest, 'wb') as fd:
+            fd.truncate(size)
+    else:
+        state['chunks'] = _verifyChunks(dest, state)
+    resumed = len(state['chunks'])
+    journal = _Journal(state_path, state)
+    journal.save()
+    transferred = _runChunks(
+        journal, count, chunk_size, size, concurrency, _fetchChunk,
+        pool, source, dest, chunk_size, size, validator, ranges, timeout,
+        attempts)
+    journal.remove()
+    pool.clear()
+    return _stats(started, size, count, resumed, transferred)
+
+
+def upload(client, image_id, path, chunk_size = DEFAULT_CHUNK_SIZE,
+           concurrency = DEFAULT_CONCURRENCY, timeout = DEFAULT_TIMEOUT,
+           attempts = DEFAULT_ATTEMPTS):
+    """
+    Upload the image archive from the file to VSC Image Receivers.
+
+    The file is read in chunks which are sent concurrently, each
+    with a PUT request carrying its byte range (Content-Range) and
+    its SHA-256 digest (X-Checksum-SHA256 header), to
+    '<receiver base URL>/<image_id>'. Chunks are spread over all
+    receivers returned by getImageReceiverBaseURLs(); a failed chunk
+    is repeated with the next receiver. Only the chunks being sent
+    are held in memory, so memory use is limited by concurrency
+    multiplied by the chunk size whatever the file size is.
+    When all chunks are accepted, the upload is finished with
+    a POST request to the same URL carrying the JSON manifest:
+    the archive size, the chunk size and the list of chunk digests.
+
+    Requests to the receivers carry no credentials: the session and
+    the password of the client are valid for VSC API Servers only
+    and are never sent to other hosts. So the receiver base URLs
+    returned by the server must authorize the upload by themselves,
+    e.g. be pre-signed, the same as download URLs are.
+
+    Chunks accepted are recorded in a sidecar state file next to the
+    source file. When the upload is interrupted, the next call with
+    the same arguments sends only the missing chunks, unless the
+    file has been modified since. The state file is removed when
+    the upload is complete.
+
+    Return upload statistics: a dictionary with the keys 'size'
+    (archive size in bytes), 'chunks' (count of chunks), 'resumed'
+    (count of chunks found already uploaded), 'transferred' (bytes
+    uploaded by this call), 'seconds' (time spent) and 'throughput'
+    (bytes uploaded per second).
+
+    :param client: client to use.
+    :type client: instance of VscApiClient
+    :param image_id: UUID of the image.
+    :type image_id: string
+    :param path: path to the image archive.
+    :type path: string
+    :param chunk_size: size of a chunk, in bytes.
+    :type chunk_size: positive integer
+    :param concurrency: maximum count of chunks sent at once.
+    :type concurrency: positive integer
+    :param timeout: socket timeout, in seconds.
+    :type timeout: number
+    :param attempts: maximum count of attempts to send a chunk.
+    :type attempts: positive integer
+    :rtype: dict
+    :raises TransferError: when the archive cannot be uploaded.
+    :raises ValueError: when chunk_size, concurrency or attempts
+        is not positive.
+    """
+    _checkArgs(chunk_size, concurrency, attempts)
+    started = time.time()
+    receivers = ['{0}/{1}'.format(url.rstrip('/'), image_id)
+                 for url in client.getImageReceiverBaseURLs()]
+    if not receivers:
+        raise TransferError('No image receivers available')
+    info = os.stat(path)
+    size = info.st_size
+    count = (size + chunk_size - 1) // chunk_size
+    state_path = path + UPLOAD_STATE_SUFFIX
+    state = _loadState(state_path)
+    if state is None or \
+            state.get('image_id') != image_id or \
+            state.get('size') != size or \
+            state.get('mtime') != info.st_mtime or \
+            state.get('chunk_size') != chunk_size:
+        state = {'image_id': image_id, 'size': size,
+                 'mtime': info.st_mtime, 'chunk_size': chunk_size,
+                 'chunks': {}}
+    resumed = len(state['chunks'])
+    journal = _Journal(state_path, state)
+    journal.save()
+    pool = ConnectionPool(max_idle = concurrency)
+    transferred = _runChunks(
+        journal, count, chunk_size, size, concurrency, _sendChunk,
+        pool, receivers, path, chunk_size, size, timeout, attempts)
+    manifest = json.dumps(
+        {'size': size, 'chunk_size': chunk_size,
+         'digests': [state['chunks'][str(index)]
+                     for index in range(count)]})
+    _commit(pool, receivers, manifest, timeout, attempts)
+    journal.remove()
+    pool.clear()
+    return _stats(started, size, count, resumed, transferred)
+
+
+def _checkArgs(chunk_size, concurrency, attempts):
+    """
+    Check the transfer arguments.
+
+    :raises ValueError: when an argument is not positive.
+    """
+    for name, value in (('chunk_size', chunk_size),
+                        ('concurrency', concurrency),
+                        ('attempts', attempts)):
+        if value < 1:
+            raise ValueError('{0} must be positive'.format(name))
+
+
+class _UrlSource(object):
+    """
+    Download URL of the image archive, generated anew when
+    the previous one expires.
+    """
+
+    def __init__(self, client, image_id):
+        self.__client = client
+        self.__image_id = image_id
+        self.__lock = threading.Lock()
+        self.__url = client.imageGenerateUrl(image_id)
+        self.__generation = 0
+
+    def get(self):
+        """
+        Return the current URL and its generation number.
+
+        :rtype: (string, integer) tuple
+        """
+        with self.__lock:
+            return self.__url, self.__generation
+
+    def expired(self, generation):
+        """
+        Report the URL of the generation has expired.
+        A new URL is generated only once for all threads which
+        have found the same URL expired.
+
+        :param generation: generation number of the expired URL.
+        :type generation: integer
+        """
+        with self.__lock:
+            if generation == self.__generation:
+                self.__url = self.__client.imageGenerateUrl(
+                    self.__image_id)
+                self.__generation += 1
+
+
+class _Journal(object):
+    """
+    Sidecar state file of a download or an upload.
+    """
+
+    def __init__(self, path, state):
+        self.__path = path
+        self.__state = state
+        self.__lock = threading.Lock()
+        self.__saved = 0
+        self.__dirty = False
+
+    def chunks(self):
+        """
+        Return chunks recorded: a dictionary of chunk numbers
+        (as strings) and digests.
+
+        :rtype: dict of string: string
+        """
+        with self.__lock:
+            return dict(self.__state['chunks'])
+
+    def chunkDone(self, index, digest):
+        """
+        Record the chunk as written. The state is saved not more
+        often than once per JOURNAL_SAVE_INTERVAL; use flush() to
+        save the chunks recorded since the last save.
+
+        :param index: chunk number.
+        :type index: integer
+        :param digest: SHA-256 digest of the chunk.
+        :type digest: string
+        """
+        with self.__lock:
+            self.__state['chunks'][str(index)] = digest
+            self.__dirty = True
+            if time.time() - self.__saved >= JOURNAL_SAVE_INTERVAL:
+                self.__save()
+
+    def save(self):
+        """
+        Save the state.
+        """
+        with self.__lock:
+            self.__save()
+
+    def flush(self):
+        """
+        Save the state if there are chunks recorded not saved yet.
+        """
+        with self.__lock:
+            if self.__dirty:
+                self.__save()
+
+    def remove(self):
+        """
+        Remove the state file.
+        """
+        with self.__lock:
+            try:
+                os.unlink(self.__path)
+            except OSError:
+                pass
+
+    def __save(self):
+        """
+        Replace the state file atomically. The new file is synced
+        to the disk before the rename, so a crash cannot leave
+        an empty or partially written state file in place.
+        """
+        directory = os.path.dirname(os.path.abspath(self.__path))
+        fd, tmp_path = tempfile.mkstemp(dir = directory)
+        try:
+            with os.fdopen(fd, 'w') as tmp:
+                json.dump(self.__state, tmp)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.rename(tmp_path, self.__path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self.__saved = time.time()
+        self.__dirty = False
+
+
+def _runChunks(journal, count, chunk_size, size, concurrency, function,
+               *args):
+    """
+    Transfer the chunks not recorded in the journal yet, calling
+    the function concurrently for each of them. The function is
+    called with the arguments given followed by the chunk number,
+    and must return the chunk number and digest of the chunk.
+    Return count of bytes transferred.
+
+    :rtype: integer
+    """
+    todo = [index for index in range(count)
+            if str(index) not in journal.chunks()]
+    transferred = 0
+    if not todo:
+        return transferred
+    with Executor(min(concurrency, len(todo))) as executor:
+        futures = [executor.submit(function, *(args + (index,)))
+                   for index in todo]
+        try:
+            for future in asCompleted(futures):
+                index, digest = future.result()
+                journal.chunkDone(index, digest)
+                transferred += _chunkLength(index, chunk_size, size)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            # keep the chunks done when the transfer is interrupted
+            journal.flush()
+    return transferred
+
+
+def _stats(started, size, count, resumed, transferred):
+    """
+    Return transfer statistics.
+
+    :rtype: dict
+    """
+    seconds = time.time() - started
+    return {'size': size, 'chunks': count, 'resumed': resumed,
+            'transferred': transferred, 'seconds': seconds,
+            'throughput': transferred / seconds if seconds else 0.0}
+
+
+def _probe(pool, source, timeout, attempts):
+    """
+    Request the first byte of the archive to learn its size and
+    version and whether the server supports ranges.
+
+    :rtype: (integer, string or None, boolean) tuple
+    """
+    for attempt in range(attempts):
+        url, generation = source.get()
+        try:
+            reply = _send(pool, url, {'Range': 'bytes=0-0'}, timeout)
+        except (socket.error, httplib.HTTPException) as exc:
+            error = TransferError('{0}: {1}'.format(_location(url), exc))
+            continue
+        validator = reply.getheader('ETag') or \
+            reply.getheader('Last-Modified')
+        if reply.status in (206, 416):
+            reply.read()
+            match = re.match(r'^bytes (?:\d+-\d+|\*)/(\d+)$',
+                             reply.getheader('Content-Range', ''))
+            if match is None:
+                raise TransferError(
+                    'Bad Content-Range: {0!r}'.format(
+                        reply.getheader('Content-Range')))
+            return int(match.group(1)), validator, True
+        if reply.status == 200:
+            length = reply.getheader('Content-Length')
+            reply.close()
+            if length is None:
+                raise TransferError('Unknown size of the archive')
+            return int(length), validator, False
+        error = _statusError(reply, url)
+        if reply.status in EXPIRED_STATUSES:
+            source.expired(generation)
+        elif reply.status < 500:
+            raise error
+    raise error
+
+
+def _fetchChunk(pool, source, dest, chunk_size, size, validator, ranges,
+                timeout, attempts, index):
+    """
+    Fetch the chunk of the archive and write it to the destination
+    file. Return the chunk number and SHA-256 digest of the chunk.
+
+    :rtype: (integer, string) tuple
+    """
+    start = index * chunk_size
+    end = start + _chunkLength(index, chunk_size, size) - 1
+    headers = {}
+    if ranges:
+        headers['Range'] = 'bytes={0}-{1}'.format(start, end)
+        if validator is not None:
+            headers['If-Range'] = validator
+    for attempt in range(attempts):
+        url, generation = source.get()
+        try:
+            reply = _send(pool, url, headers, timeout)
+        except (socket.error, httplib.HTTPException) as exc:
+            error = TransferError('{0}: {1}'.format(_location(url), exc))
+            continue
+        if reply.status in EXPIRED_STATUSES:
+            error = _statusError(reply, url)
+            source.expired(generation)
+            continue
+        if reply.status >= 500:
+            error = _statusError(reply, url)
+            continue
+        if reply.status not in ((206,) if ranges else (200,)):
+            if ranges and reply.status == 200:
+                reply.close()
+                raise TransferError('The archive has changed on the '
+                                    'server during the download')
+            raise _statusError(reply, url)
+        content_range = reply.getheader('Content-Range')
+        if ranges and content_range != 'bytes {0}-{1}/{2}'.format(
+                start, end, size):
+            reply.close()
+            raise TransferError(
+                'Bad Content-Range: {0!r}'.format(content_range))
+        try:
+            return index, _writeChunk(reply, dest, start, end - start + 1)
+        except (socket.error, httplib.HTTPException) as exc:
+            reply.close()
+            error = TransferError('{0}: {1}'.format(_location(url), exc))
+    raise error
+
+
+def _sendChunk(pool, receivers, path, chunk_size, size, timeout,
+               attempts, index):
+    """
+    Read the chunk of the archive from the file and send it to
+    a receiver. Return the chunk number and SHA-256 digest of
+    the chunk.
+
+    :rtype: (integer, string) tuple
+    """
+    start = index * chunk_size
+    length = _chunkLength(index, chunk_size, size)
+    with open(path, 'rb') as fd:
+        fd.seek(start)
+        data = fd.read(length)
+    if len(data) != length:
+        raise TransferError('{0}: file truncated'.format(path))
+    digest = hashlib.sha256(data).hexdigest()
+    # no auth headers: receiver URLs are pre-signed (see upload())
+    headers = {'Content-Type': 'application/octet-stream',
+               'Content-Range': 'bytes {0}-{1}/{2}'.format(
+                   start, start + length - 1, size),
+               'X-Checksum-SHA256': digest}
+    for attempt in range(attempts):
+        # spread the chunks over the receivers, failing over
+        # to the next one on errors
+        url = receivers[(index + attempt) % len(receivers)]
+        try:
+            reply = _send(pool, url, headers, timeout, 'PUT', data)
+            if reply.status < 500:
+                if reply.status // 100 != 2:
+                    raise _statusError(reply, url)
+                reply.read()
+                return index, digest
+            error = _statusError(reply, url)
+        except (socket.error, httplib.HTTPException) as exc:
+            error = TransferError('{0}: {1}'.format(_location(url), exc))
+    raise error
+
+
+def _commit(pool, receivers, manifest, timeout, attempts):
+    """
+    Finish the upload by sending the manifest to a receiver.
+    """
+    headers = {'Content-Type': 'application/json'}
+    for attempt in range(attempts):
+        url = receivers[attempt % len(receivers)]
+        try:
+            reply = _send(pool, url, headers, timeout, 'POST', manifest)
+            if reply.status < 500:
+                if reply.status // 100 != 2:
+                    raise _statusError(reply, url)
+                reply.read()
+                return
+            error = _statusError(reply, url)
+        except (socket.error, httplib.HTTPException) as exc:
+            error = TransferError('{0}: {1}'.format(_location(url), exc))
+    raise error
+
+
+def _writeChunk(reply, dest, offset, length):
+    """
+    Copy the response body to the destination file at the offset.
+    Return SHA-256 digest of the data written.
+
+    :rtype: string
+    """
+    digest = hashlib.sha256()
+    with open(dest, 'r+b') as fd:
+        fd.seek(offset)
+        while length > 0:
+            block = reply.read(min(BLOCK_SIZE, length))
+            if not block:
+                raise httplib.IncompleteRead('')
+            fd.write(block)
+            digest.update(block)
+            length -= len(block)
+    return digest.hexdigest()
+
+
+def _verifyChunks(dest, state):
+    """
+    Return the chunks recorded in the state whose digests match
+    the data in the destination file.
+
+    :rtype: dict of string: string
+    """
+    verified = {}
+    with open(dest, 'rb') as fd:
+        for key, expected in state.get('chunks', {}).items():
+            offset = int(key) * state['chunk_size']
+            length = _chunkLength(int(key), state['chunk_size'],
+                                  state['size'])
+            fd.seek(offset)
+            digest = hashlib.sha256()
+            while length > 0:
+                block = fd.read(min(BLOCK_SIZE, length))
+                if not block:
+                    break
+                digest.update(block)
+                length -= len(block)
+            if length == 0 and digest.hexdigest() == expected:
+                verified[key] = expected
+    return verified
+
+
+def _loadState(path):
+    """
+    Read the sidecar state file. Return None when there is no
+    file or it is corrupted.
+
+    :rtype: dict or None
+    """
+    try:
+        with open(path) as fd:
+            state = json.load(fd)
+    except (IOError, ValueError):
+        return None
+    if not isinstance(state, dict) or \
+            not isinstance(state.get('chunks'), dict):
+        return None
+    return state
+
+
+def _chunkLength(index, chunk_size, size):
+    """
+    Return length of the chunk in bytes.
+
+    :rtype: integer
+    """
+    return min(chunk_size, size - index * chunk_size)
+
+
+def _send(pool, url, headers, timeout, method = 'GET', body = None):
+    """
+    Send the request to the URL over a pooled connection.
+
+    :rtype: instance of VscApiClient.pool.PooledReply
+    """
+    parts = urlparse.urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (httplib.HTTPS_PORT if secure
+                          else httplib.HTTP_PORT)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return pool.request(parts.hostname, port, secure, method, path,
+                        body, headers, timeout)
+
+
+def _statusError(reply, url):
+    """
+    Read the rest of the unexpected response and return exception
+    describing it.
+
+    :rtype: instance of TransferError
+    """
+    try:
+        reply.read()
+    except (socket.error, httplib.HTTPException):
+        pass
+    return TransferError('{0}: {1} {2}'.format(
+        _location(url), reply.status, reply.reason))
+
+
+def _location(url):
+    """
+    Return the URL without the query string which can hold
+    an access token.
+
+    :rtype: string
+    """
+    parts = urlparse.urlsplit(url)
+    return urlparse.urlunsplit(parts[:3] + ('', ''))
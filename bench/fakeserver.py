@@ -0,0 +1,809 @@
+"""
+Local stand-in for VSC API Server.
+
+Implements the resources used by VscApiClient bindings over an
+in-memory store, including Basic authentication with 'auth' cookie
+issuing, X-VSC-User-ID learning headers, list_* redirectors, 'limit'
+and 'offset' paging of lists and ETag revalidation. Image archives
+are served from expiring download URLs with HTTP Range support
+and uploaded in chunks to image receivers.
+It is meant for benchmarks and manual testing only.
+
+Run standalone with:
+
+    python bench/fakeserver.py [--port PORT] [--latency SECONDS]
+"""
+
+import BaseHTTPServer
+import SocketServer
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+import urlparse
+import uuid
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_USERNAME = 'admin'
+DEFAULT_PASSWORD = 'admin'
+DEFAULT_URL_TTL = 300
+DEFAULT_RECEIVERS = 2
+
+
+class HttpError(Exception):
+    """
+    Error response to send.
+    """
+
+    def __init__(self, code, error_class = None, error_message = None):
+        Exception.__init__(self, code)
+        self.code = code
+        self.error_class = error_class
+        self.error_message = error_message
+
+
+class Store(object):
+    """
+    In-memory state of the fake VSC API Server.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.accounts = {}
+        self.sessions = {}
+        self.users = {}
+        self.roles = {}
+        self.role_minors = {}
+        self.user_roles = {}
+        self.jobs = {}
+        self.packages = {}
+        self.images = {}
+        self.acls = {}
+        self.job_profiles = {}
+        self.image_files = {}
+        self.download_tokens = {}
+        self.uploads = {}
+        self.receiver_hits = {}
+        self.addAccount(DEFAULT_USERNAME, DEFAULT_PASSWORD)
+
+    def addAccount(self, username, password, user_id = None):
+        """
+        Register user credentials. Return the user ID.
+        """
+        if user_id is None:
+            user_id = uuid.uuid4().hex
+        self.accounts[username] = (password, user_id)
+        self.users.setdefault(user_id, {'login': username})
+        return user_id
+
+    def populateJobs(self, count, owner = None, historic = False,
+                     payload_size = 10):
+        """
+        Add jobs with some payload to make 'full' listings realistic.
+        """
+        if owner is None:
+            owner = self.accounts[DEFAULT_USERNAME][1]
+        state = 'stopped' if historic else 'running'
+        for i in range(count):
+            job_id = uuid.uuid4().hex + uuid.uuid4().hex
+            self.jobs[job_id] = {
+                'id': job_id, 'owner': owner, 'state': state,
+                'historic': historic, 'created': time.time(),
+                'name': 'job-{0}'.format(i),
+                'nodes': [{'name': 'node{0}'.format(n), 'cpus': 8,
+                           'memory': 32768, 'ip': '10.0.{0}.{1}'.format(
+                               n // 250, n % 250)}
+                          for n in range(payload_size)]}
+
+    def setImageFile(self, image_id, data):
+        """
+        Set content of the image archive served by download URLs.
+        """
+        self.image_files[image_id] = (
+            data, '"{0}"'.format(hashlib.md5(data).hexdigest()))
+
+    def populateUsers(self, count):
+        """
+        Add users with some payload.
+        """
+        for i in range(count):
+            self.users[uuid.uuid4().hex] = {
+                'login': 'user{0}'.format(i),
+                'email': 'user{0}@example.com'.format(i),
+                'name': 'User Number {0}'.format(i),
+                'quota': {'cpus': 64, 'memory': 262144, 'jobs': 10}}
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Request handler of the fake VSC API Server.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # buffer the output so the response goes out in a single
+    # segment instead of one segment per header line
+    wbufsize = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.__handle()
+
+    def do_PUT(self):
+        self.__handle()
+
+    def do_POST(self):
+        self.__handle()
+
+    def do_DELETE(self):
+        self.__handle()
+
+    def __handle(self):
+        server = self.server
+        server.countRequest()
+        if server.latency:
+            time.sleep(server.latency)
+        url = urlparse.urlsplit(self.path)
+        self.query = dict(urlparse.parse_qsl(url.query))
+        if url.path.startswith('/download/') and self.command == 'GET':
+            self.__download(url.path[len('/download/'):])
+            return
+        match = re.match(r'^/receiver/(\d+)/([^/]+)$', url.path)
+        if match is not None and self.command in ('PUT', 'POST'):
+            try:
+                self.__receive(int(match.group(1)), match.group(2))
+            except HttpError as exc:
+                self.__sendError(exc)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else ''
+        self.extra_headers = []
+        try:
+            self.user_id = self.__authenticate()
+            self.entity = json.loads(body) if body else None
+            result = self.__dispatch(url.path.strip('/'))
+        except HttpError as exc:
+            self.__sendError(exc)
+            return
+        if isinstance(result, Redirect):
+            if not self.extra_headers:
+                self.extra_headers.append(('X-VSC-User-ID', self.user_id))
+            self.send_response(302)
+            self.send_header('Location', result.location)
+            self.send_header('Content-Length', '0')
+            self.__sendExtraHeaders()
+            self.end_headers()
+            return
+        if result is None:
+            encoded = ''
+        else:
+            encoded = json.dumps(result)
+        etag = '"{0}"'.format(hashlib.md5(encoded).hexdigest())
+        if self.command == 'GET' and \
+                self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.__sendExtraHeaders()
+            self.end_headers()
+            return
+        self.send_response(200)
+        if encoded:
+            self.send_header('Content-Type', 'application/json')
+        if self.command == 'GET':
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(encoded)))
+        self.__sendExtraHeaders()
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def __download(self, image_id):
+        """
+        Serve the image archive by a download URL, supporting
+        a single byte range and If-Range.
+        """
+        store = self.server.store
+        with store.lock:
+            token = store.download_tokens.get(self.query.get('token'))
+            image = store.image_files.get(image_id)
+        if token is None or token[0] != image_id or \
+                token[1] < time.time():
+            self.__sendError(HttpError(403))
+            return
+        if image is None:
+            self.__sendError(HttpError(404))
+            return
+        data, etag = image
+        start, end = 0, len(data) - 1
+        match = re.match(r'^bytes=(\d+)-(\d*)$',
+                         self.headers.get('Range', ''))
+        if match is not None and \
+                self.headers.get('If-Range', etag) == etag:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(end, int(match.group(2)))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header('Content-Range',
+                                 'bytes */{0}'.format(len(data)))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {0}-{1}/{2}'.format(
+                start, end, len(data)))
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        self.wfile.write(data[start:end + 1])
+
+    def __receive(self, receiver, image_id):
+        """
+        Act as an image receiver: accept a chunk of the image archive
+        with PUT or assemble the archive from the chunks with POST.
+        """
+        store = self.server.store
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else ''
+        with store.lock:
+            store.receiver_hits[receiver] = \
+                store.receiver_hits.get(receiver, 0) + 1
+            _get(store.images, image_id)
+        if self.command == 'PUT':
+            match = re.match(r'^bytes (\d+)-(\d+)/(\d+)$',
+                             self.headers.get('Content-Range', ''))
+            if match is None or \
+                    int(match.group(2)) - int(match.group(1)) + 1 != \
+                    len(body):
+                raise HttpError(400, 'BadArg', 'bad Content-Range')
+            if hashlib.sha256(body).hexdigest() != \
+                    self.headers.get('X-Checksum-SHA256'):
+                raise HttpError(400, 'BadArg', 'checksum mismatch')
+            with store.lock:
+                store.uploads.setdefault(image_id, {})[
+                    int(match.group(1))] = body
+            code = 201
+        else:
+            try:
+                manifest = json.loads(body)
+                size = manifest['size']
+                chunk_size = manifest['chunk_size']
+                digests = manifest['digests']
+            except (ValueError, KeyError, TypeError):
+                raise HttpError(400, 'BadArg', 'bad manifest')
+            with store.lock:
+                chunks = store.uploads.get(image_id, {})
+                parts = [chunks.get(index * chunk_size)
+                         for index in range(len(digests))]
+            if any(part is None or
+                   hashlib.sha256(part).hexdigest() != digest
+                   for part, digest in zip(parts, digests)):
+                raise HttpError(409, 'Conflict', 'chunks missing')
+            data = ''.join(parts)
+            if len(data) != size:
+                raise HttpError(409, 'Conflict', 'size mismatch')
+            with store.lock:
+                store.setImageFile(image_id, data)
+                store.uploads.pop(image_id, None)
+            code = 200
+        self.send_response(code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def __sendExtraHeaders(self):
+        for name, value in self.extra_headers:
+            self.send_header(name, value)
+
+    def __sendError(self, exc):
+        self.send_response(exc.code)
+        encoded = ''
+        if exc.error_class is not None:
+            encoded = json.dumps({'error_class': exc.error_class,
+                                  'error_message': exc.error_message})
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def __authenticate(self):
+        store = self.server.store
+        authorization = self.headers.get('Authorization', '')
+        if authorization.startswith('Basic '):
+            self.server.countLogin()
+            try:
+                username, password = base64.b64decode(
+                    authorization[6:]).split(':', 1)
+            except Exception:
+                raise HttpError(401)
+            account = store.accounts.get(username)
+            if account is None or account[0] != password:
+                raise HttpError(401)
+            cookie = uuid.uuid4().hex
+            with store.lock:
+                store.sessions[cookie] = account[1]
+            self.extra_headers.append(
+                ('Set-Cookie', 'auth={0}; Path=/'.format(cookie)))
+            self.extra_headers.append(('X-VSC-User-ID', account[1]))
+            return account[1]
+        for item in self.headers.get('Cookie', '').split(';'):
+            name, _sep, value = item.strip().partition('=')
+            if name == 'auth':
+                user_id = store.sessions.get(value)
+                if user_id is not None:
+                    return user_id
+        raise HttpError(401)
+
+    def __dispatch(self, path):
+        for method, pattern, function in _ROUTES:
+            if method != self.command:
+                continue
+            match = pattern.match(path)
+            if match is not None:
+                with self.server.store.lock:
+                    return function(self, self.server.store,
+                                    *match.groups())
+        raise HttpError(404)
+
+
+class Redirect(object):
+    """
+    Redirection result of a request handler.
+    """
+
+    def __init__(self, location):
+        self.location = location
+
+
+def _page(handler, items):
+    """
+    Apply 'limit' and 'offset' query parameters to the list.
+    """
+    offset = int(handler.query.get('offset', 0))
+    if 'limit' in handler.query:
+        return items[offset:offset + int(handler.query['limit'])]
+    return items[offset:]
+
+
+def _format(handler, allowed):
+    format = handler.query.get('format', allowed[0])
+    if format not in allowed:
+        raise HttpError(403, 'bad_argument', 'Bad format value')
+    return format
+
+
+def _get(collection, xid):
+    try:
+        return collection[xid]
+    except KeyError:
+        raise HttpError(404)
+
+
+def _create(handler, collection, xid, value):
+    if handler.query.get('create') == '1':
+        if xid in collection:
+            raise HttpError(403, 'bad_argument', 'Already exists')
+        collection[xid] = value
+    else:
+        _get(collection, xid)
+        collection[xid] = value
+
+
+def _redirect(handler, path):
+    query = dict(handler.query, user = handler.user_id)
+    return Redirect('/{0}?{1}'.format(
+        path, '&'.join('{0}={1}'.format(k, v) for k, v in query.items())))
+
+
+def _login(handler, store):
+    return None
+
+
+def _whoami(handler, store):
+    return {'id': handler.user_id}
+
+
+def _userList(handler, store):
+    format = _format(handler, ('ids_only', 'full'))
+    ids = sorted(store.users)
+    if format == 'full':
+        return _page(handler, [[xid, store.users[xid]] for xid in ids])
+    return _page(handler, ids)
+
+
+def _userGet(handler, store, user_id):
+    return _get(store.users, user_id)
+
+
+def _userPut(handler, store, user_id):
+    _create(handler, store.users, user_id, handler.entity)
+
+
+def _passwd(handler, store):
+    return None
+
+
+def _userRolesGet(handler, store, user_id):
+    _get(store.users, user_id)
+    return sorted(store.user_roles.get(user_id, ()))
+
+
+def _userRolesPut(handler, store, user_id):
+    _get(store.users, user_id)
+    store.user_roles[user_id] = set(handler.entity)
+
+
+def _userRolePut(handler, store, user_id, role_id):
+    _get(store.users, user_id)
+    _get(store.roles, role_id)
+    store.user_roles.setdefault(user_id, set()).add(role_id)
+
+
+def _userRoleDel(handler, store, user_id, role_id):
+    store.user_roles.get(user_id, set()).discard(role_id)
+
+
+def _roleList(handler, store):
+    format = _format(handler, ('ids_only', 'full'))
+    ids = sorted(store.roles)
+    if format == 'full':
+        return _page(handler, [[xid, store.roles[xid]] for xid in ids])
+    return _page(handler, ids)
+
+
+def _roleGet(handler, store, role_id):
+    return _get(store.roles, role_id)
+
+
+def _rolePut(handler, store, role_id):
+    _create(handler, store.roles, role_id, handler.entity)
+
+
+def _roleDel(handler, store, role_id):
+    _get(store.roles, role_id)
+    del store.roles[role_id]
+    store.role_minors.pop(role_id, None)
+    for minors in store.role_minors.values():
+        minors.discard(role_id)
+    for roles in store.user_roles.values():
+        roles.discard(role_id)
+
+
+def _roleMinorsGet(handler, store, role_id):
+    _get(store.roles, role_id)
+    return sorted(store.role_minors.get(role_id, ()))
+
+
+def _roleMinorsPut(handler, store, role_id):
+    _get(store.roles, role_id)
+    store.role_minors[role_id] = set(handler.entity)
+
+
+def _roleMinorPut(handler, store, major_id, minor_id):
+    _get(store.roles, major_id)
+    _get(store.roles, minor_id)
+    store.role_minors.setdefault(major_id, set()).add(minor_id)
+
+
+def _roleMinorDel(handler, store, major_id, minor_id):
+    store.role_minors.get(major_id, set()).discard(minor_id)
+
+
+def _roleMajorsGet(handler, store, role_id):
+    _get(store.roles, role_id)
+    return sorted(major for major, minors in store.role_minors.items()
+                  if role_id in minors)
+
+
+def _roleUsersGet(handler, store, role_id):
+    _get(store.roles, role_id)
+    return sorted(user for user, roles in store.user_roles.items()
+                  if role_id in roles)
+
+
+def _jobView(job, format):
+    if format == 'ids_only':
+        return job['id']
+    if format == 'basic':
+        return dict((k, job[k]) for k in ('id', 'owner', 'state', 'name'))
+    return job
+
+
+def _jobList(handler, store):
+    format = _format(handler, ('basic', 'full', 'ids_only'))
+    historic = handler.query.get('historic') == '1'
+    owner = handler.query.get('user')
+    jobs = sorted((job for job in store.jobs.values()
+                   if job['historic'] == historic and
+                   (owner is None or job['owner'] == owner)),
+                  key = lambda job: job['id'])
+    return _page(handler, [_jobView(job, format) for job in jobs])
+
+
+def _jobListRedirect(handler, store):
+    return _redirect(handler, 'job')
+
+
+def _jobGet(handler, store, job_id):
+    format = _format(handler, ('basic', 'full'))
+    return _jobView(_get(store.jobs, job_id), format)
+
+
+def _jobPut(handler, store, job_id):
+    job = {'id': job_id, 'owner': handler.user_id, 'state': 'queued',
+           'historic': False, 'created': time.time(), 'name': job_id,
+           'data': handler.entity, 'fwd': []}
+    _create(handler, store.jobs, job_id, job)
+
+
+def _jobStop(handler, store, job_id):
+    job = _get(store.jobs, job_id)
+    job['state'] = 'stopped'
+    job['historic'] = True
+
+
+def _jobFwdGet(handler, store, job_id):
+    return _get(store.jobs, job_id).get('fwd', [])
+
+
+def _jobFwdPut(handler, store, job_id):
+    _get(store.jobs, job_id)['fwd'] = [
+        ['192.0.2.1', 20000 + port, port] for port in handler.entity]
+
+
+def _objectList(collection):
+    def handler_function(handler, store):
+        format = _format(handler, ('full', 'ids_only'))
+        owner = handler.query.get('user')
+        items = sorted((xid, data) for xid, data in collection(store).items()
+                       if owner is None or data.get('owner') == owner)
+        if format == 'full':
+            return _page(handler, [data for _xid, data in items])
+        return _page(handler, [xid for xid, _data in items])
+    return handler_function
+
+
+def _objectGet(collection):
+    def handler_function(handler, store, xid):
+        return _get(collection(store), xid)
+    return handler_function
+
+
+def _objectPut(collection):
+    def handler_function(handler, store, xid):
+        data = dict(handler.entity or {}, id = xid,
+                    owner = handler.user_id)
+        _create(handler, collection(store), xid, data)
+    return handler_function
+
+
+def _objectDel(collection):
+    def handler_function(handler, store, xid):
+        _get(collection(store), xid)
+        del collection(store)[xid]
+        store.acls.pop(xid, None)
+    return handler_function
+
+
+def _aclGet(collection):
+    def handler_function(handler, store, xid):
+        _get(collection(store), xid)
+        return store.acls.get(xid, [])
+    return handler_function
+
+
+def _aclPut(collection):
+    def handler_function(handler, store, xid):
+        _get(collection(store), xid)
+        store.acls[xid] = handler.entity
+    return handler_function
+
+
+def _aclDel(collection):
+    def handler_function(handler, store, xid):
+        _get(collection(store), xid)
+        store.acls.pop(xid, None)
+    return handler_function
+
+
+def _genUrl(handler, store, image_id):
+    _get(store.images, image_id)
+    token = uuid.uuid4().hex
+    store.download_tokens[token] = (image_id,
+                                    time.time() + handler.server.url_ttl)
+    host, port = handler.server.server_address[:2]
+    return 'http://{0}:{1}/download/{2}?token={3}'.format(
+        host, port, image_id, token)
+
+
+def _imageReceivers(handler, store):
+    host, port = handler.server.server_address[:2]
+    return ['http://{0}:{1}/receiver/{2}'.format(host, port, index)
+            for index in range(handler.server.receivers)]
+
+
+def _jobProfileView(handler, store, public_only):
+    format = _format(handler, ('full', 'ids_only'))
+    owner = handler.query.get('user')
+    items = sorted(
+        (xid, item) for xid, item in store.job_profiles.items()
+        if (not public_only or item['public']) and
+        (owner is None or item['owner'] == owner))
+    if format == 'full':
+        return _page(handler, [[xid, item['data']] for xid, item in items])
+    return _page(handler, [xid for xid, _item in items])
+
+
+def _jobProfileList(handler, store):
+    return _jobProfileView(handler, store, False)
+
+
+def _jobProfilePublic(handler, store):
+    return _jobProfileView(handler, store, True)
+
+
+def _jobProfilePut(handler, store, xid):
+    item = {'data': handler.entity, 'owner': handler.user_id,
+            'public': handler.query.get('public') in ('1', 'True')}
+    _create(handler, store.job_profiles, xid, item)
+
+
+def _jobProfileDel(handler, store, xid):
+    _get(store.job_profiles, xid)
+    del store.job_profiles[xid]
+
+
+def _packages(store):
+    return store.packages
+
+
+def _images(store):
+    return store.images
+
+
+_ID = '([A-Za-z0-9._-]+)'
+
+_ROUTES = [(method, re.compile('^' + pattern + '$'), function)
+           for method, pattern, function in [
+    ('POST', 'login', _login),
+    ('POST', 'logout', _login),
+    ('GET', 'whoami', _whoami),
+    ('GET', 'aaa/user', _userList),
+    ('GET', 'aaa/user/' + _ID, _userGet),
+    ('PUT', 'aaa/user/' + _ID, _userPut),
+    ('POST', 'aaa/passwd', _passwd),
+    ('GET', 'aaa/user/' + _ID + '/roles', _userRolesGet),
+    ('PUT', 'aaa/user/' + _ID + '/roles', _userRolesPut),
+    ('PUT', 'aaa/user/' + _ID + '/roles/' + _ID, _userRolePut),
+    ('DELETE', 'aaa/user/' + _ID + '/roles/' + _ID, _userRoleDel),
+    ('GET', 'aaa/role', _roleList),
+    ('GET', 'aaa/role/' + _ID, _roleGet),
+    ('PUT', 'aaa/role/' + _ID, _rolePut),
+    ('DELETE', 'aaa/role/' + _ID, _roleDel),
+    ('GET', 'aaa/role/' + _ID + '/minors', _roleMinorsGet),
+    ('PUT', 'aaa/role/' + _ID + '/minors', _roleMinorsPut),
+    ('PUT', 'aaa/role/' + _ID + '/minors/' + _ID, _roleMinorPut),
+    ('DELETE', 'aaa/role/' + _ID + '/minors/' + _ID, _roleMinorDel),
+    ('GET', 'aaa/role/' + _ID + '/majors', _roleMajorsGet),
+    ('GET', 'aaa/role/' + _ID + '/users', _roleUsersGet),
+    ('GET', 'job', _jobList),
+    ('GET', 'list_jobs', _jobListRedirect),
+    ('GET', 'job/' + _ID, _jobGet),
+    ('PUT', 'job/' + _ID, _jobPut),
+    ('POST', 'job/' + _ID + '/stop', _jobStop),
+    ('GET', 'job/' + _ID + '/fwd', _jobFwdGet),
+    ('PUT', 'job/' + _ID + '/fwd', _jobFwdPut),
+    ('GET', 'package', _objectList(_packages)),
+    ('GET', 'list_packages',
+     lambda handler, store: _redirect(handler, 'package')),
+    ('GET', 'package/' + _ID, _objectGet(_packages)),
+    ('PUT', 'package/' + _ID, _objectPut(_packages)),
+    ('DELETE', 'package/' + _ID, _objectDel(_packages)),
+    ('GET', 'package/' + _ID + '/acl', _aclGet(_packages)),
+    ('PUT', 'package/' + _ID + '/acl', _aclPut(_packages)),
+    ('DELETE', 'package/' + _ID + '/acl', _aclDel(_packages)),
+    ('GET', 'image', _objectList(_images)),
+    ('GET', 'list_images',
+     lambda handler, store: _redirect(handler, 'image')),
+    ('GET', 'image/' + _ID, _objectGet(_images)),
+    ('PUT', 'image/' + _ID, _objectPut(_images)),
+    ('DELETE', 'image/' + _ID, _objectDel(_images)),
+    ('GET', 'image/' + _ID + '/acl', _aclGet(_images)),
+    ('PUT', 'image/' + _ID + '/acl', _aclPut(_images)),
+    ('DELETE', 'image/' + _ID + '/acl', _aclDel(_images)),
+    ('GET', 'image/' + _ID + '/genurl', _genUrl),
+    ('GET', 'image_receiver', _imageReceivers),
+    ('GET', 'list_job_profiles', _jobProfileList),
+    ('GET', 'list_public_job_profiles', _jobProfilePublic),
+    ('PUT', 'job_profile/' + _ID, _jobProfilePut),
+    ('DELETE', 'job_profile/' + _ID, _jobProfileDel)]]
+
+
+class FakeServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Fake VSC API Server running in background threads.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host = '127.0.0.1', port = 0, latency = 0,
+                 url_ttl = DEFAULT_URL_TTL,
+                 receivers = DEFAULT_RECEIVERS):
+        """
+        Class constructor.
+
+        :param host: address to listen on.
+        :type host: string
+        :param port: TCP port to listen on. Random free port when zero.
+        :type port: integer
+        :param latency: artificial delay of each response, in seconds.
+        :type latency: number
+        :param url_ttl: lifetime of image download URLs, in seconds.
+        :type url_ttl: number
+        :param receivers: count of image receiver URLs to advertise.
+        :type receivers: integer
+        """
+        BaseHTTPServer.HTTPServer.__init__(self, (host, port), Handler)
+        self.store = Store()
+        self.latency = latency
+        self.url_ttl = url_ttl
+        self.receivers = receivers
+        self.__counters_lock = threading.Lock()
+        self.requests = 0
+        self.logins = 0
+        self.__thread = None
+
+    def countRequest(self):
+        with self.__counters_lock:
+            self.requests += 1
+
+    def countLogin(self):
+        with self.__counters_lock:
+            self.logins += 1
+
+    def start(self):
+        """
+        Start serving in a background thread.
+        """
+        self.__thread = threading.Thread(target = self.serve_forever)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop serving.
+        """
+        self.shutdown()
+        self.server_close()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__.split('\n')[1])
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8914)
+    parser.add_argument('--latency', type = float, default = 0)
+    parser.add_argument('--jobs', type = int, default = 0,
+                        help = 'count of jobs to create on start')
+    args = parser.parse_args()
+    server = FakeServer(args.host, args.port, args.latency)
+    server.store.populateJobs(args.jobs)
+    print 'Listening on {0}:{1}, login {2}/{3}'.format(
+        args.host, server.port, DEFAULT_USERNAME, DEFAULT_PASSWORD)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Benchmarks of JSON codecs of VSC API Client.
+
+Encodes and decodes realistic payloads ('full' job listings, user
+listings and single job records) with each codec installed and
+prints results as JSON:
+
+    python bench/jsoncodecs.py --scale 2
+
+Lazy decoding is measured both for taking a few first elements of
+a listing and for walking the whole listing.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakeserver
+from VscApiClient import codec
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_REPEAT = 5
+
+# count of elements taken from a listing in the 'lazy_head' case
+HEAD_SIZE = 10
+
+
+def makePayloads(scale):
+    """
+    Return payloads to measure: dict of name: value.
+    """
+    store = fakeserver.Store()
+    store.populateJobs(2000 * scale, historic = True)
+    store.populateUsers(5000 * scale)
+    jobs = list(store.jobs.values())
+    users = [dict(data, id = user_id)
+             for user_id, data in store.users.items()]
+    return {'jobs_full': jobs, 'users': users, 'job': jobs[0]}
+
+
+def measure(function, repeat):
+    """
+    Call the function the repeat times. Return the best time
+    of a call, in seconds.
+    """
+    best = None
+    for _i in range(repeat):
+        started = time.time()
+        function()
+        elapsed = time.time() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def benchCodec(json_codec, payloads, repeat):
+    """
+    Measure the codec with each payload.
+    """
+    results = {}
+    for name, value in sorted(payloads.items()):
+        encoded = json.dumps(value)
+        # small payloads are measured in batches to get sane timings
+        batch = 1 if isinstance(value, list) else 1000
+        result = {'bytes': len(encoded), 'batch': batch}
+        seconds = measure(lambda: [json_codec.dumps(value)
+                                   for _i in range(batch)], repeat)
+        result['encode_seconds'] = seconds / batch
+        seconds = measure(lambda: [json_codec.loads(encoded)
+                                   for _i in range(batch)], repeat)
+        result['decode_seconds'] = seconds / batch
+        result['decode_mb_per_sec'] = \
+            len(encoded) / result['decode_seconds'] / 1e6
+        if isinstance(value, list):
+            result['lazy_head_seconds'] = measure(
+                lambda: json_codec.lazyList(encoded)[:HEAD_SIZE], repeat)
+            result['lazy_all_seconds'] = measure(
+                lambda: len(json_codec.lazyList(encoded)), repeat)
+        results[name] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description = __doc__.split('\n')[1],
+        formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type = int, default = 1,
+                        help = 'payload size multiplier')
+    parser.add_argument('--repeat', type = int, default = DEFAULT_REPEAT,
+                        help = 'count of runs to take the best time of')
+    parser.add_argument('--codec', action = 'append',
+                        choices = codec.PREFERENCE,
+                        help = 'codec to measure (default: all installed)')
+    parser.add_argument('--output', help = 'file to write results to')
+    args = parser.parse_args()
+    payloads = makePayloads(args.scale)
+    results = {'python': platform.python_version(),
+               'platform': platform.platform(),
+               'timestamp': time.time(),
+               'scale': args.scale,
+               'default_codec': codec.getCodec().name,
+               'codecs': {}}
+    for name in args.codec or codec.available():
+        results['codecs'][name] = benchCodec(
+            codec.getCodec(name), payloads, args.repeat)
+    encoded = json.dumps(results, indent = 2, sort_keys = True)
+    if args.output:
+        with open(args.output, 'w') as fd:
+            fd.write(encoded + '\n')
+    else:
+        print encoded
+
+
+if __name__ == '__main__':
+    main()
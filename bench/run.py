@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""
+Benchmarks of VSC API Client against a local fake VSC API Server.
+
+Measures throughput and latency of representative workloads and
+prints results as JSON. Results can be compared with a previous run
+to catch client side performance regressions:
+
+    python bench/run.py --output baseline.json
+    ... upgrade the client ...
+    python bench/run.py --compare baseline.json
+
+The exit code is 1 when throughput of any workload dropped by more
+than the tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakeserver
+from VscApiClient import VscApiClient
+from VscApiClient.cache import ValidatorCache
+from VscApiClient.metrics import Histogram, PERCENTILES
+
+# ----------------------------------------------------------------------
+# local definitions
+
+DEFAULT_TOLERANCE = 0.2
+
+
+class Workload(object):
+    """
+    Measures a sequence of operations.
+    """
+
+    def __init__(self, name, server):
+        self.name = name
+        self.server = server
+        self.histogram = Histogram()
+        self.requests = 0
+        self.seconds = 0.0
+
+    def run(self, operation, count):
+        """
+        Call the operation the count times, timing each call.
+        """
+        requests_before = self.server.requests
+        started = time.time()
+        for _i in range(count):
+            op_started = time.time()
+            operation()
+            self.histogram.add(time.time() - op_started)
+        self.seconds += time.time() - started
+        self.requests += self.server.requests - requests_before
+
+    def runOnce(self, operation, ops):
+        """
+        Call the operation once, counting it as the given count of
+        operations done (for batch operations).
+        """
+        requests_before = self.server.requests
+        started = time.time()
+        operation()
+        elapsed = time.time() - started
+        for _i in range(ops):
+            self.histogram.add(elapsed / ops)
+        self.seconds += elapsed
+        self.requests += self.server.requests - requests_before
+
+    def result(self):
+        ops = self.histogram.count
+        result = {'ops': ops, 'requests': self.requests,
+                  'seconds': self.seconds,
+                  'ops_per_sec': ops / self.seconds if self.seconds else None,
+                  'latency': {'mean': self.histogram.mean()}}
+        for percent in PERCENTILES:
+            result['latency']['p{0}'.format(percent)] = \
+                self.histogram.percentile(percent)
+        return result
+
+
+def makeClient(server, **kwargs):
+    return VscApiClient(fakeserver.DEFAULT_USERNAME,
+                        fakeserver.DEFAULT_PASSWORD, '127.0.0.1',
+                        server.port, secure = False, **kwargs)
+
+
+def benchSerialCrud(server, scale):
+    """
+    Create, read, update and delete packages one by one.
+    """
+    client = makeClient(server)
+    workload = Workload('serial_crud', server)
+
+    def operation():
+        package_id = client.packageCreate({'name': 'bench'})
+        client.packageGetData(package_id)
+        client.packageUpdate(package_id, {'name': 'bench2'})
+        client.packageDel(package_id)
+
+    workload.run(operation, 200 * scale)
+    return [workload]
+
+
+def benchLargeList(server, scale):
+    """
+    Decode large 'full' job listings: whole at once, incrementally,
+    lazily (taking the first jobs only) and revalidated with ETag.
+    """
+    server.store.populateJobs(2000 * scale, historic = True)
+    results = []
+    client = makeClient(server)
+    workload = Workload('large_list', server)
+    workload.run(lambda: client.jobListAll('full', True), 10)
+    results.append(workload)
+    workload = Workload('large_list_streamed', server)
+    workload.run(lambda: sum(1 for _job in
+                             client.iterJobListAll('full', True)), 10)
+    results.append(workload)
+    client = makeClient(server, lazy_lists = True)
+    workload = Workload('large_list_lazy_head', server)
+    workload.run(lambda: client.jobListAll('full', True)[:10], 10)
+    results.append(workload)
+    client = makeClient(server, validator_cache = ValidatorCache())
+    client.jobListAll('full', True)
+    workload = Workload('large_list_revalidated', server)
+    workload.run(lambda: client.jobListAll('full', True), 10)
+    results.append(workload)
+    return results
+
+
+def benchJobPolling(server, scale):
+    """
+    Poll status of many jobs: serially and with concurrent fan-out.
+    """
+    client = makeClient(server)
+    job_ids = [client.jobAdd({'bench': True}) for _i in range(100 * scale)]
+    results = []
+    workload = Workload('job_polling_serial', server)
+    workload.runOnce(lambda: [client.jobGetData(job_id)
+                              for job_id in job_ids], len(job_ids))
+    results.append(workload)
+    workload = Workload('job_polling_concurrent', server)
+    workload.runOnce(lambda: client.jobGetDataMany(job_ids), len(job_ids))
+    results.append(workload)
+    for job_id in job_ids:
+        client.jobStop(job_id)
+    return results
+
+
+def benchAuth(server, scale):
+    """
+    Authentication with credentials versus authentication by cookie.
+    """
+    client = makeClient(server)
+    results = []
+    workload = Workload('auth_login', server)
+    workload.run(client.login, 200 * scale)
+    results.append(workload)
+    workload = Workload('auth_cookie', server)
+    workload.run(client.whoami, 200 * scale)
+    results.append(workload)
+    return results
+
+
+BENCHMARKS = [benchSerialCrud, benchLargeList, benchJobPolling, benchAuth]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare throughput with the baseline. Return list of regressions.
+    """
+    regressions = []
+    for name, result in results['workloads'].items():
+        base = baseline.get('workloads', {}).get(name)
+        if base is None or not base.get('ops_per_sec'):
+            continue
+        ratio = result['ops_per_sec'] / base['ops_per_sec']
+        result['baseline_ratio'] = ratio
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description = __doc__.split('\n')[1],
+        formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type = int, default = 1,
+                        help = 'workload size multiplier')
+    parser.add_argument('--latency', type = float, default = 0,
+                        help = 'artificial server latency, in seconds')
+    parser.add_argument('--output', help = 'file to write results to')
+    parser.add_argument('--compare', metavar = 'BASELINE',
+                        help = 'results of a previous run to compare with')
+    parser.add_argument('--tolerance', type = float,
+                        default = DEFAULT_TOLERANCE,
+                        help = 'allowed relative throughput drop')
+    args = parser.parse_args()
+    results = {'python': platform.python_version(),
+               'platform': platform.platform(),
+               'timestamp': time.time(),
+               'scale': args.scale,
+               'latency': args.latency,
+               'workloads': {}}
+    for benchmark in BENCHMARKS:
+        server = fakeserver.FakeServer(latency = args.latency)
+        server.start()
+        try:
+            for workload in benchmark(server, args.scale):
+                results['workloads'][workload.name] = workload.result()
+        finally:
+            server.stop()
+    regressions = []
+    if args.compare:
+        with open(args.compare) as fd:
+            regressions = compare(results, json.load(fd), args.tolerance)
+        results['regressions'] = regressions
+    encoded = json.dumps(results, indent = 2, sort_keys = True)
+    if args.output:
+        with open(args.output, 'w') as fd:
+            fd.write(encoded + '\n')
+    else:
+        print encoded
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
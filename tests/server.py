@@ -0,0 +1,48 @@
+"""
+Base of the tests run against the fake VSC API Server
+from the bench directory.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench'))
+
+import fakeserver
+
+from VscApiClient import VscApiClient
+from VscApiClient.pool import ConnectionPool
+
+
+class ServerTestCase(unittest.TestCase):
+    """
+    Test case running a fake VSC API Server for each test.
+    """
+
+    def setUp(self):
+        self.server = fakeserver.FakeServer()
+        self.server.start()
+        self.pools = []
+
+    def tearDown(self):
+        # close persistent connections, so the server threads
+        # serving them are done before the interpreter exits
+        for pool in self.pools:
+            pool.clear()
+        self.server.stop()
+
+    def makeClient(self, **kwargs):
+        """
+        Return a client of the fake server authenticating as
+        the default user.
+
+        :rtype: instance of VscApiClient
+        """
+        if 'pool' not in kwargs:
+            kwargs['pool'] = ConnectionPool()
+        self.pools.append(kwargs['pool'])
+        return VscApiClient(fakeserver.DEFAULT_USERNAME,
+                            fakeserver.DEFAULT_PASSWORD, '127.0.0.1',
+                            self.server.port, secure = False, **kwargs)
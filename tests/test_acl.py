@@ -0,0 +1,46 @@
+"""
+Unit tests of VscApiClient.acl.
+"""
+
+import unittest
+
+from VscApiClient import acl
+
+
+class _AclClient(object):
+    """
+    Client keeping package ACLs in memory.
+    """
+
+    def __init__(self, acls):
+        self.acls = acls
+
+    def packageGetAcl(self, package_id):
+        return list(self.acls[package_id])
+
+    def packageSetAcl(self, package_id, new_acl):
+        self.acls[package_id] = new_acl
+
+
+class TransformAclsTest(unittest.TestCase):
+
+    def test_bad_transform(self):
+        client = _AclClient({'a': [1], 'b': [2]})
+
+        def transform(object_id, old):
+            if object_id == 'a':
+                return None
+            return old + [3]
+
+        report = acl.transformAcls(client, 'package', ['a', 'b'],
+                                   transform)
+        self.assertIsInstance(report['a']['error'], TypeError)
+        self.assertFalse(report['a']['changed'])
+        self.assertEqual(client.acls['a'], [1])
+        self.assertIsNone(report['b']['error'])
+        self.assertEqual(report['b']['added'], [3])
+        self.assertEqual(client.acls['b'], [2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Unit tests of VscApiClient.asyncclient.
+"""
+
+import threading
+import time
+import unittest
+
+from VscApiClient.asyncclient import AsyncVscApiClient
+
+
+class _Client(object):
+    """
+    Client counting calls made at the same time.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def call(self):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.01)
+        with self.lock:
+            self.running -= 1
+
+
+class _SafeClient(_Client):
+
+    thread_safe = True
+
+
+class SerializationTest(unittest.TestCase):
+
+    def run_calls(self, client):
+        with AsyncVscApiClient(client = client,
+                               max_concurrency = 4) as async_client:
+            futures = [async_client.submit(lambda c: c.call())
+                       for _ in range(8)]
+            for future in futures:
+                future.result()
+        return client.max_running
+
+    def test_not_thread_safe(self):
+        self.assertEqual(self.run_calls(_Client()), 1)
+
+    def test_thread_safe(self):
+        self.assertGreater(self.run_calls(_SafeClient()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
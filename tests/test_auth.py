@@ -0,0 +1,47 @@
+"""
+Unit tests of the single-flight authentication of VscApiClient.
+"""
+
+import threading
+import unittest
+
+from tests.server import ServerTestCase
+
+
+class SingleFlightTest(ServerTestCase):
+
+    def _burst(self, client, count = 8):
+        errors = []
+
+        def call():
+            try:
+                client.whoami()
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target = call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_first_requests(self):
+        self.server.latency = 0.05
+        client = self.makeClient()
+        self._burst(client)
+        self.assertEqual(self.server.logins, 1)
+
+    def test_concurrent_401(self):
+        client = self.makeClient()
+        client.whoami()
+        self.assertEqual(self.server.logins, 1)
+        # the server forgets the session: every request gets a 401
+        self.server.store.sessions.clear()
+        self.server.latency = 0.05
+        self._burst(client)
+        self.assertEqual(self.server.logins, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Unit tests of VscApiClient.cache.
+"""
+
+import unittest
+
+from VscApiClient.cache import ResponseCache, ValidatorCache
+
+from tests.server import ServerTestCase
+
+
+class TtlTest(unittest.TestCase):
+
+    def test_default_ttls(self):
+        cache = ResponseCache()
+        self.assertEqual(cache.ttl('package/p1'), 60)
+        self.assertEqual(cache.ttl('image/i1'), 60)
+        self.assertEqual(cache.ttl('package/p1/acl'), 0)
+        self.assertEqual(cache.ttl('image/i1/acl'), 0)
+        self.assertEqual(cache.ttl('image/i1/genurl'), 0)
+        self.assertEqual(cache.ttl('aaa/role/r1/users'), 0)
+        self.assertEqual(cache.ttl('image_receiver'), 300)
+
+    def test_longest_pattern(self):
+        cache = ResponseCache({'package/*': 10, 'package/*/acl': 5})
+        self.assertEqual(cache.ttl('package/p1'), 10)
+        self.assertEqual(cache.ttl('package/p1/acl'), 5)
+
+
+class AclCacheTest(ServerTestCase):
+
+    def test_acl_not_cached(self):
+        client = self.makeClient(cache = ResponseCache())
+        other = self.makeClient()
+        package_id = client.packageCreate({'name': 'p'})
+        client.packageSetAcl(package_id, [{'user': 'u1'}])
+        self.assertEqual(client.packageGetAcl(package_id), [{'user': 'u1'}])
+        other.packageSetAcl(package_id, [{'user': 'u2'}])
+        self.assertEqual(client.packageGetAcl(package_id), [{'user': 'u2'}])
+
+    def test_package_cached(self):
+        client = self.makeClient(cache = ResponseCache())
+        package_id = client.packageCreate({'name': 'p'})
+        client.packageGetData(package_id)
+        requests = self.server.requests
+        client.packageGetData(package_id)
+        self.assertEqual(self.server.requests, requests)
+
+
+class RevalidationTest(ServerTestCase):
+
+    def test_not_modified(self):
+        validators = ValidatorCache()
+        client = self.makeClient(validator_cache = validators)
+        package_id = client.packageCreate({'name': 'p'})
+        first = client.packageGetData(package_id)
+        second = client.packageGetData(package_id)
+        self.assertEqual(second, first)
+        # the decoded body stored is reused as is
+        self.assertIs(second, first)
+        self.assertEqual(validators.stats()['not_modified'], 1)
+
+    def test_modified(self):
+        validators = ValidatorCache()
+        client = self.makeClient(validator_cache = validators)
+        other = self.makeClient()
+        package_id = client.packageCreate({'name': 'p'})
+        client.packageGetData(package_id)
+        other.packageUpdate(package_id, {'name': 'q'})
+        self.assertEqual(client.packageGetData(package_id)['name'], 'q')
+        self.assertEqual(validators.stats()['not_modified'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Unit tests of VscApiClient which do not need a VSC API Server.
+"""
+
+import unittest
+
+from VscApiClient import VscApiClient, _orderSrv
+
+
+class _StaticClient(VscApiClient):
+    """
+    Client answering every request with the same list, as a server
+    ignoring 'limit' and 'offset' query parameters does.
+    """
+
+    def __init__(self, items):
+        VscApiClient.__init__(self, 'user', 'password', '127.0.0.1', 1,
+                              secure = False)
+        self.items = items
+        self.calls = 0
+
+    def _request(self, method, path, params = None, data = None,
+                 reauth = False, binding = None, hedge = False):
+        self.calls += 1
+        return list(self.items)
+
+
+class PagingTest(unittest.TestCase):
+
+    def test_offset_ignored(self):
+        client = _StaticClient(range(5))
+        result = list(client.aaaListUsersPaged(page_size = 5))
+        self.assertEqual(result, range(5))
+        self.assertEqual(client.calls, 2)
+
+    def test_paging_ignored(self):
+        client = _StaticClient(range(7))
+        result = list(client.aaaListUsersPaged(page_size = 5))
+        self.assertEqual(result, range(7))
+        self.assertEqual(client.calls, 1)
+
+
+class OrderSrvTest(unittest.TestCase):
+
+    def test_priority(self):
+        records = [(20, 5, 'b', 1), (10, 0, 'a', 1), (30, 0, 'c', 1)]
+        self.assertEqual(_orderSrv(records), [('a', 1), ('b', 1), ('c', 1)])
+
+    def test_zero_weights(self):
+        records = [(10, 0, host, 1) for host in 'abcd']
+        first = set()
+        for _ in range(200):
+            result = _orderSrv(records)
+            self.assertEqual(sorted(result), [(host, 1) for host in 'abcd'])
+            first.add(result[0][0])
+        self.assertEqual(first, set('abcd'))
+
+
+if __name__ == '__main__':
+    unittest.main()
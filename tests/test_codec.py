@@ -0,0 +1,32 @@
+"""
+Unit tests of VscApiClient.codec.
+"""
+
+import unittest
+
+from VscApiClient import codec
+
+
+class LazyListTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        data = '[{"id": 1, "acl": [1, 2]}, {"id": 2}]'
+        for name in codec.available():
+            json_codec = codec.getCodec(name)
+            value = {'items': json_codec.lazyList(data)}
+            self.assertEqual(json_codec.loads(json_codec.dumps(value)),
+                             {'items': json_codec.loads(data)})
+
+    def test_not_serializable(self):
+        for name in codec.available():
+            self.assertRaises(TypeError, codec.getCodec(name).dumps,
+                              object())
+
+    def test_lazy(self):
+        items = codec.getCodec('json').lazyList('[1, 2, 3')
+        self.assertEqual(items[0], 1)
+        self.assertRaises(ValueError, list, items)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+"""
+Unit tests of VscApiClient.concurrency.
+"""
+
+import threading
+import unittest
+
+from VscApiClient.concurrency import Executor, asCompleted
+
+
+class ExecutorTest(unittest.TestCase):
+
+    def test_burst_runs_concurrently(self):
+        # all the functions must run at the same time to finish
+        workers = 4
+        for _round in range(200):
+            lock = threading.Lock()
+            ready = threading.Event()
+            running = [0]
+
+            def task():
+                with lock:
+                    running[0] += 1
+                    if running[0] == workers:
+                        ready.set()
+                return ready.wait(1)
+
+            with Executor(workers) as executor:
+                futures = [executor.submit(task)
+                           for _i in range(workers)]
+                self.assertTrue(all(future.result(5)
+                                    for future in futures))
+
+    def test_queued(self):
+        with Executor(2) as executor:
+            futures = executor.map(lambda x: x * 2, range(20))
+            self.assertEqual(sorted(future.result()
+                                    for future in asCompleted(futures)),
+                             range(0, 40, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Unit tests of VSC API endpoint failover.
+"""
+
+import socket
+import time
+import unittest
+
+import dns.name
+import dns.resolver
+
+import VscApiClient as package
+from VscApiClient.endpoints import EndpointTracker
+from VscApiClient.pool import ConnectionPool
+
+from tests.server import ServerTestCase
+
+
+class TrackerTest(unittest.TestCase):
+
+    def test_order(self):
+        tracker = EndpointTracker(backoff_base = 60)
+        addrs = [('a', 1), ('b', 1), ('c', 1)]
+        tracker.markDead(('a', 1))
+        self.assertFalse(tracker.isAlive(('a', 1)))
+        self.assertEqual(tracker.order(addrs), [('b', 1), ('c', 1)])
+        tracker.markAlive(('a', 1))
+        self.assertEqual(tracker.order(addrs), addrs)
+
+    def test_probe_due(self):
+        tracker = EndpointTracker(backoff_base = 0.01)
+        addrs = [('a', 1), ('b', 1)]
+        tracker.markDead(('a', 1))
+        time.sleep(0.02)
+        self.assertEqual(tracker.order(addrs), [('b', 1), ('a', 1)])
+
+    def test_all_dead(self):
+        tracker = EndpointTracker(backoff_base = 60)
+        addrs = [('a', 1), ('b', 1)]
+        for addr in addrs:
+            tracker.markDead(addr)
+        self.assertEqual(len(tracker.order(addrs)), 1)
+
+
+class _Record(object):
+
+    def __init__(self, priority, port):
+        self.priority = priority
+        self.weight = 0
+        self.target = dns.name.from_text('127.0.0.1')
+        self.port = port
+
+
+class _Answer(list):
+
+    expiration = 0
+
+
+class FailoverTest(ServerTestCase):
+
+    def setUp(self):
+        ServerTestCase.setUp(self)
+        # a port nobody listens on
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        self.dead_port = sock.getsockname()[1]
+        sock.close()
+        self.query = dns.resolver.query
+        dns.resolver.query = self.fakeQuery
+        package._resolve_cache.clear()
+
+    def tearDown(self):
+        dns.resolver.query = self.query
+        package._resolve_cache.clear()
+        ServerTestCase.tearDown(self)
+
+    def fakeQuery(self, name, rdtype):
+        answer = _Answer([_Record(10, self.dead_port),
+                          _Record(20, self.server.port)])
+        answer.expiration = time.time() + 300
+        return answer
+
+    def test_failover(self):
+        pool = ConnectionPool()
+        self.pools.append(pool)
+        client = package.VscApiClient('admin', 'admin', 'svc.local',
+                                      secure = False, pool = pool)
+        self.assertEqual(client._getAddrs()[0],
+                         ('127.0.0.1', self.dead_port))
+        client.whoami()
+        client.whoami()
+        # the dead server is tried once only
+        self.assertEqual(client.getPoolStats()['requests'], 3)
+        self.assertEqual(self.server.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+"""
+Unit tests of VscApiClient job bindings.
+"""
+
+from tests.server import ServerTestCase
+
+
+class JobGetDataManyTest(ServerTestCase):
+
+    def test_duplicates(self):
+        client = self.makeClient()
+        job_ids = [client.jobAdd({'n': index}) for index in range(3)]
+        requests = self.server.requests
+        result = client.jobGetDataMany(job_ids + job_ids[::-1] + ['none'])
+        self.assertEqual(sorted(result), sorted(job_ids + ['none']))
+        self.assertEqual(self.server.requests - requests, 4)
+        for job_id in job_ids:
+            self.assertEqual(result[job_id]['id'], job_id)
+        self.assertIsInstance(result['none'], Exception)
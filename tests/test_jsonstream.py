@@ -0,0 +1,55 @@
+"""
+Unit tests of VscApiClient.jsonstream.
+"""
+
+import StringIO
+import json
+import unittest
+
+from VscApiClient import jsonstream
+
+from tests.server import ServerTestCase
+
+
+def _iter(data, chunk_size):
+    return list(jsonstream.iterArray(StringIO.StringIO(data).read,
+                                     chunk_size))
+
+
+class IterArrayTest(unittest.TestCase):
+
+    def test_chunk_sizes(self):
+        items = [1, -2.5e3, 'a, "b" ]', {'k': [1, {}]}, [], None, True,
+                 12345678901234567890]
+        data = ' [ ' + ' , '.join(json.dumps(item) for item in items) + ' ]'
+        for chunk_size in range(1, 12):
+            self.assertEqual(_iter(data, chunk_size), items)
+
+    def test_empty(self):
+        self.assertEqual(_iter('', 3), [])
+        self.assertEqual(_iter(' [ ] ', 1), [])
+
+    def test_errors(self):
+        for data in ('{}', '[1, 2', '[1 2]', '[1,', '[nul]'):
+            self.assertRaises(ValueError, _iter, data, 2)
+
+
+class IterRequestTest(ServerTestCase):
+
+    def test_iter_users(self):
+        self.server.store.populateUsers(50)
+        client = self.makeClient()
+        self.assertEqual(list(client.iterUsers()),
+                         client.aaaListUsers())
+
+    def test_early_break(self):
+        self.server.store.populateUsers(50)
+        client = self.makeClient()
+        for _user_id in client.iterUsers():
+            break
+        # the connection is closed, not returned to the pool unread
+        self.assertEqual(len(client.aaaListUsers()), 51)
+
+
+if __name__ == '__main__':
+    unittest.main()
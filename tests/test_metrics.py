@@ -0,0 +1,59 @@
+"""
+Unit tests of VscApiClient.metrics.
+"""
+
+import unittest
+
+from VscApiClient import metrics
+from VscApiClient.errors import NotFoundError
+
+from tests.server import ServerTestCase
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_percentile_bounds(self):
+        histogram = metrics.Histogram()
+        values = [index / 1000.0 for index in range(1, 1001)]
+        for value in reversed(values):
+            histogram.add(value)
+        error = metrics.HISTOGRAM_FACTOR - 1
+        for percent in (1, 50, 95, 99, 100):
+            exact = values[int(len(values) * percent / 100.0) - 1]
+            estimate = histogram.percentile(percent)
+            self.assertGreaterEqual(estimate, exact)
+            self.assertLessEqual(estimate, exact * (1 + error))
+        self.assertEqual(histogram.percentile(100), 1.0)
+        self.assertAlmostEqual(histogram.mean(), 0.5005)
+
+    def test_empty(self):
+        histogram = metrics.Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertIsNone(histogram.mean())
+
+    def test_tiny_values(self):
+        histogram = metrics.Histogram()
+        histogram.add(0)
+        histogram.add(metrics.HISTOGRAM_MIN_VALUE / 2)
+        self.assertLessEqual(histogram.percentile(99),
+                             metrics.HISTOGRAM_MIN_VALUE)
+
+
+class CollectorTest(ServerTestCase):
+
+    def test_collected(self):
+        collector = metrics.HistogramCollector()
+        client = self.makeClient(instrument = collector)
+        for _ in range(3):
+            client.whoami()
+        self.assertRaises(NotFoundError, client.jobGetData, 'none')
+        stats = collector.dump()
+        self.assertEqual(stats['whoami']['count'], 3)
+        self.assertEqual(stats['whoami']['statuses'], {'200': 3})
+        self.assertEqual(stats['jobGetData']['errors'], 1)
+        self.assertGreater(collector.percentile('whoami', 50), 0)
+        self.assertIsNone(collector.percentile('jobStop', 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Unit tests of VscApiClient.pool.
+"""
+
+import httplib
+import socket
+import threading
+import unittest
+
+from VscApiClient.pool import ConnectionPool
+
+from tests.server import ServerTestCase
+
+
+class ReuseTest(ServerTestCase):
+
+    def test_reused(self):
+        pool = ConnectionPool()
+        client = self.makeClient(pool = pool)
+        for _ in range(10):
+            client.whoami()
+        stats = client.getPoolStats()
+        self.assertEqual(stats['requests'], 10)
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(stats['reused'], 9)
+
+    def test_concurrent(self):
+        client = self.makeClient(pool = ConnectionPool(max_idle = 4))
+        threads = [threading.Thread(target = client.whoami)
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for _ in range(10):
+            client.whoami()
+        stats = client.getPoolStats()
+        self.assertLessEqual(stats['created'], 4)
+        self.assertEqual(stats['created'] + stats['reused'], 14)
+
+
+class LostResponseTest(unittest.TestCase):
+    """
+    Server closing each connection without a response to the second
+    request sent over it, as a server closing an idle connection
+    at the moment the request arrives does.
+    """
+
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(5)
+        self.port = self.listener.getsockname()[1]
+        self.methods = []
+        thread = threading.Thread(target = self.serve)
+        thread.daemon = True
+        thread.start()
+
+    def tearDown(self):
+        self.listener.close()
+
+    def serve(self):
+        while True:
+            try:
+                conn = self.listener.accept()[0]
+            except socket.error:
+                return
+            thread = threading.Thread(target = self.handle, args = (conn,))
+            thread.daemon = True
+            thread.start()
+
+    def handle(self, conn):
+        for index in range(2):
+            data = conn.recv(65536)
+            if not data:
+                break
+            self.methods.append(data.split(' ', 1)[0])
+            if index == 0:
+                conn.sendall('HTTP/1.1 200 OK\r\n'
+                             'Content-Length: 2\r\n\r\nok')
+        conn.close()
+
+    def request(self, pool, method):
+        return pool.request('127.0.0.1', self.port, False, method, '/',
+                            '', {}, 5)
+
+    def test_idempotent_resent(self):
+        pool = ConnectionPool()
+        self.request(pool, 'GET').read()
+        reply = self.request(pool, 'GET')
+        self.assertEqual(reply.read(), 'ok')
+        self.assertEqual(self.methods, ['GET'] * 3)
+        self.assertEqual(pool.stats()['resets'], 1)
+
+    def test_not_idempotent_raised(self):
+        pool = ConnectionPool()
+        self.request(pool, 'POST').read()
+        self.assertRaises((socket.error, httplib.HTTPException),
+                          self.request, pool, 'POST')
+        self.assertEqual(self.methods, ['POST'] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Unit tests of VscApiClient.provision.
+"""
+
+import unittest
+
+from VscApiClient.errors import BadArgError, DependencyError
+
+from tests.server import ServerTestCase
+
+
+class ProvisionTest(ServerTestCase):
+
+    SPEC = {'users': {'u1': {'name': 'u1'}, 'u2': {'name': 'u2'}},
+            'roles': {'r1': {'name': 'r1'}, 'r2': {'name': 'r2'}},
+            'role_minors': {'r1': ['r2']},
+            'user_roles': {'u1': ['r1'], 'u2': ['r2']}}
+
+    def test_created(self):
+        client = self.makeClient()
+        results = client.bulkProvision(self.SPEC)
+        self.assertEqual(len(results), 7)
+        self.assertEqual(set(results.values()), set([None]))
+        store = self.server.store
+        self.assertTrue(set(['u1', 'u2']).issubset(store.users))
+        self.assertEqual(set(store.roles), set(['r1', 'r2']))
+        self.assertEqual(store.role_minors['r1'], set(['r2']))
+        self.assertEqual(store.user_roles['u1'], set(['r1']))
+        self.assertEqual(store.user_roles['u2'], set(['r2']))
+
+    def test_dependents_skipped(self):
+        client = self.makeClient()
+        client.aaaAddRole({'name': 'r1'}, 'r1')
+        results = client.bulkProvision(self.SPEC)
+        self.assertIsNotNone(results[('role', 'r1')])
+        self.assertIsInstance(results[('role_minor', 'r1', 'r2')],
+                              DependencyError)
+        self.assertIsInstance(results[('user_roles', 'u1')],
+                              DependencyError)
+        # operations not depending on the failed one are done
+        self.assertIsNone(results[('user_roles', 'u2')])
+        self.assertEqual(self.server.store.user_roles['u2'], set(['r2']))
+        self.assertNotIn('u1', self.server.store.user_roles)
+
+    def test_unknown_key(self):
+        client = self.makeClient()
+        self.assertRaises(BadArgError, client.bulkProvision,
+                          {'groups': {}})
+        self.assertEqual(self.server.requests, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Unit tests of VscApiClient.rbac.
+"""
+
+import unittest
+
+from VscApiClient.rbac import RoleGraph
+
+from tests.server import ServerTestCase
+
+
+class UnknownUserTest(unittest.TestCase):
+
+    def test_ignored(self):
+        graph = RoleGraph()
+        graph.addUserRole('u1', 'r1')
+        graph.setUserRoles('u2', ['r1'])
+        self.assertIsNone(graph.userRoles('u1'))
+        self.assertIsNone(graph.userRoles('u2'))
+        self.assertIsNone(graph.effectiveUserRoles('u2'))
+
+
+class RoleGraphTest(ServerTestCase):
+
+    def test_transitive(self):
+        client = self.makeClient()
+        top, middle, bottom = [client.aaaAddRole({'name': name})
+                               for name in ('top', 'middle', 'bottom')]
+        client.aaaAddRoleRoleRelation(top, middle)
+        client.aaaAddRoleRoleRelation(middle, bottom)
+        user_id = client.whoami()
+        client.aaaAddUserRoleRelation(user_id, top)
+        graph = client.aaaGetRoleGraph(with_users = True)
+        self.assertEqual(graph.effectiveUserRoles(user_id),
+                         set([top, middle, bottom]))
+        self.assertEqual(graph.majors(bottom, transitive = True),
+                         set([top, middle]))
+        # changes made by the client are applied to the graph
+        client.aaaSetUserRoles(user_id, [bottom])
+        self.assertEqual(graph.effectiveUserRoles(user_id), set([bottom]))
+        client.aaaAddRoleRoleRelation(bottom, top)
+        self.assertEqual(map(sorted, graph.findCycles()),
+                         [sorted([top, middle, bottom])])
+
+
+class SyncTest(ServerTestCase):
+
+    def test_changes_only(self):
+        client = self.makeClient()
+        role1, role2, role3 = [client.aaaAddRole({'name': name})
+                               for name in ('r1', 'r2', 'r3')]
+        client.aaaAddRoleRoleRelation(role1, role2)
+        desired = {'role_minors': {role1: [role2, role3]},
+                   'user_roles': {client.whoami(): [role1, 'none']}}
+        results = client.aaaSync(desired)
+        self.assertEqual(
+            sorted(change for change, error in results.items()
+                   if error is None),
+            sorted([('add_role_minor', role1, role3),
+                    ('add_user_role', client.whoami(), role1)]))
+        self.assertEqual(sorted(client.aaaListRoleMinors(role1)),
+                         sorted([role2, role3]))
+        self.assertEqual(
+            client.aaaSync(desired).keys(),
+            [('add_user_role', client.whoami(), 'none')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Unit tests of VscApiClient.records.
+"""
+
+import unittest
+
+from VscApiClient.errors import BadArgError
+from VscApiClient.records import Record, RecordTable
+
+from tests.server import ServerTestCase
+
+
+class RecordTableTest(unittest.TestCase):
+
+    OBJECTS = [{'id': str(i), 'state': ('running', 'stopped')[i % 2],
+                'name': 'job-{0}'.format(i)} for i in range(10)]
+
+    def test_slice(self):
+        table = RecordTable.fromObjects('job', self.OBJECTS)
+        view = table[2:8:2]
+        self.assertIsInstance(view, RecordTable)
+        self.assertEqual(view.column('id'), ['2', '4', '6'])
+        self.assertEqual(view[1:].column('id'), ['4', '6'])
+        self.assertEqual(view[-1].id, '6')
+
+    def test_where(self):
+        table = RecordTable.fromObjects('job', self.OBJECTS)
+        stopped = table.where(state = 'stopped')
+        self.assertEqual(len(stopped), 5)
+        self.assertEqual(stopped.where(id = ('1', '2', '3')).column('id'),
+                         ['1', '3'])
+        self.assertEqual(table.distinct('state'),
+                         {'running': 5, 'stopped': 5})
+        self.assertEqual(len(table.where(owner = 'nobody')), 0)
+        self.assertEqual(len(table.where(owner = None)), 10)
+
+    def test_missing_key(self):
+        table = RecordTable.fromObjects(None, [{'a': 1}, {'b': 2}])
+        self.assertEqual(table.column('a'), [1, None])
+        self.assertEqual(table.toList('dict'),
+                         [{'a': 1, 'b': None}, {'a': None, 'b': 2}])
+
+
+class ResultTypeTest(ServerTestCase):
+
+    def setUp(self):
+        ServerTestCase.setUp(self)
+        self.server.store.populateJobs(6, payload_size = 2)
+        for job_id in sorted(self.server.store.jobs)[:2]:
+            self.server.store.jobs[job_id]['state'] = 'stopped'
+
+    def test_record(self):
+        client = self.makeClient()
+        plain = client.jobList(format = 'full')
+        records = client.jobList(format = 'full', result_type = 'record')
+        self.assertEqual(len(records), 6)
+        for record in records:
+            self.assertIsInstance(record, Record)
+            self.assertFalse(hasattr(record, '__dict__'))
+            self.assertIsInstance(record.nodes[0], Record)
+        self.assertEqual(records, plain)
+        self.assertRaises(AttributeError, setattr, records[0], 'state', '')
+        job = client.jobGetData(plain[0]['id'], result_type = 'record')
+        self.assertEqual(job.id, plain[0]['id'])
+        self.assertEqual(job['owner'], plain[0]['owner'])
+
+    def test_table(self):
+        client = self.makeClient()
+        plain = client.jobList(format = 'full')
+        table = client.jobList(format = 'full', result_type = 'table')
+        self.assertIsInstance(table, RecordTable)
+        self.assertEqual(table.toList('dict'), plain)
+        self.assertEqual(table.distinct('state'),
+                         {'running': 4, 'stopped': 2})
+        self.assertEqual(len(table.where(state = 'stopped')), 2)
+
+    def test_bad_type(self):
+        client = self.makeClient()
+        self.assertRaises(BadArgError, client.jobList,
+                          result_type = 'tuple')
+        self.assertRaises(BadArgError, client.jobGetData, 'a' * 64,
+                          result_type = 'table')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Unit tests of VSC API endpoint resolution.
+"""
+
+import time
+import unittest
+
+import dns.exception
+import dns.name
+import dns.resolver
+
+import VscApiClient as package
+from VscApiClient import VscApiClient
+
+
+class _Record(object):
+
+    def __init__(self, priority, weight, target, port):
+        self.priority = priority
+        self.weight = weight
+        self.target = dns.name.from_text(target)
+        self.port = port
+
+
+class _Answer(list):
+
+    expiration = 0
+
+
+class ResolveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.query = dns.resolver.query
+        self.queries = 0
+        self.error = None
+        package._resolve_cache.clear()
+        dns.resolver.query = self.fakeQuery
+
+    def tearDown(self):
+        dns.resolver.query = self.query
+        package._resolve_cache.clear()
+
+    def fakeQuery(self, name, rdtype):
+        self.queries += 1
+        if self.error is not None:
+            raise self.error
+        answer = _Answer([_Record(10, 0, 'a.svc.local', 1111),
+                          _Record(20, 0, 'b.svc.local', 2222)])
+        answer.expiration = time.time() + 300
+        return answer
+
+    def test_srv_port_kept(self):
+        client = VscApiClient(hostname = 'svc.local', secure = False)
+        self.assertEqual(client.getEndPoint(), 'svc.local')
+        self.assertEqual(package._resolve_cache.keys(),
+                         [('svc.local', None)])
+        self.assertEqual(client._getAddrs(), [('a.svc.local', 1111),
+                                              ('b.svc.local', 2222)])
+        self.assertEqual(self.queries, 1)
+
+    def test_srv_explicit_port(self):
+        client = VscApiClient(hostname = 'svc.local', port = 1234,
+                              secure = False)
+        self.assertEqual(client.getEndPoint(), 'svc.local:1234')
+        client._getAddrs()
+        self.assertEqual(self.queries, 1)
+
+    def test_stale_cached(self):
+        client = VscApiClient(hostname = 'svc.local', secure = False)
+        expires, records = package._resolve_cache[('svc.local', None)]
+        package._resolve_cache[('svc.local', None)] = (0, records)
+        self.error = dns.exception.Timeout()
+        for _ in range(3):
+            self.assertEqual(len(client._getAddrs()), 2)
+        self.assertEqual(self.queries, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+"""
+Unit tests of VscApiClient.retry.
+"""
+
+import socket
+import unittest
+
+from VscApiClient.errors import TooManyRequestsError
+from VscApiClient.retry import RetryBudget, RetryPolicy
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(budget = RetryBudget())
+
+    def test_idempotent(self):
+        self.assertTrue(self.policy.shouldRetry('GET', socket.error(), 1))
+        self.assertTrue(self.policy.shouldRetry('PUT', socket.error(), 1))
+        self.assertFalse(self.policy.shouldRetry('POST', socket.error(), 1))
+
+    def test_create(self):
+        self.assertFalse(self.policy.shouldRetry(
+            'PUT', socket.error(), 1, {'create': 1}))
+        self.assertTrue(self.policy.shouldRetry(
+            'PUT', TooManyRequestsError(), 1, {'create': 1}))
+
+    def test_retry_after_capped(self):
+        policy = RetryPolicy(retry_after_max = 2)
+        self.assertEqual(policy.backoff(1, TooManyRequestsError(1000)), 2)
+        self.assertEqual(policy.backoff(1, TooManyRequestsError(1.5)), 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Unit tests of VscApiClient.session.
+"""
+
+import os
+import shutil
+import tempfile
+
+from VscApiClient.session import SessionStore
+
+from tests.server import ServerTestCase
+
+
+class _CountingStore(SessionStore):
+
+    def __init__(self, path):
+        SessionStore.__init__(self, path)
+        self.saves = 0
+
+    def save(self, *args):
+        self.saves += 1
+        SessionStore.save(self, *args)
+
+
+class _Reply(object):
+
+    def __init__(self, cookie, user_id):
+        self.headers = {'Set-Cookie': 'auth={0}; Path=/'.format(cookie),
+                        'X-VSC-User-ID': user_id}
+
+    def getheader(self, name, default = None):
+        return self.headers.get(name, default)
+
+
+class SessionStoreTest(ServerTestCase):
+
+    def setUp(self):
+        ServerTestCase.setUp(self)
+        self.directory = tempfile.mkdtemp()
+        self.store = _CountingStore(
+            os.path.join(self.directory, 'sessions.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        ServerTestCase.tearDown(self)
+
+    def test_reused(self):
+        client = self.makeClient(session_store = self.store)
+        user_id = client.whoami()
+        client = self.makeClient(session_store = self.store)
+        self.assertEqual(client.whoami(), user_id)
+        self.assertEqual(client.getUserId(), user_id)
+        self.assertEqual(self.server.logins, 1)
+
+    def test_saved_on_change(self):
+        client = self.makeClient(session_store = self.store)
+        client.whoami()
+        self.assertEqual(self.store.saves, 1)
+        # the server repeating the same cookie
+        cookie = client.getCookieKey()
+        for _ in range(3):
+            client._learnReply(_Reply(cookie, client.getUserId()))
+        self.assertEqual(self.store.saves, 1)
+        client._learnReply(_Reply('new', client.getUserId()))
+        self.assertEqual(self.store.saves, 2)
+        self.assertEqual(self.store.load(client.getEndPoint(), 'admin',
+                                         'admin')[0], 'new')
@@ -0,0 +1,69 @@
+"""
+Unit tests of VscApiClient.throttle.
+"""
+
+import threading
+import time
+import unittest
+
+from VscApiClient.throttle import Throttle, TokenBucket
+
+from tests.server import ServerTestCase
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst(self):
+        bucket = TokenBucket(10, 2)
+        delays = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(delays[:2], [0, 0])
+        self.assertAlmostEqual(delays[2], 0.1, places = 2)
+        self.assertAlmostEqual(delays[3], 0.2, places = 2)
+
+    def test_bad_rate(self):
+        self.assertRaises(ValueError, TokenBucket, 0)
+
+
+class ThrottleTest(ServerTestCase):
+
+    def test_read_rate(self):
+        client = self.makeClient(throttle = Throttle(read_rate = 20,
+                                                     read_burst = 1))
+        started = time.time()
+        for _ in range(5):
+            client.whoami()
+        self.assertGreaterEqual(time.time() - started, 0.19)
+
+    def test_writes_not_limited_by_reads(self):
+        client = self.makeClient(throttle = Throttle(read_rate = 1,
+                                                     read_burst = 1))
+        client.whoami()
+        started = time.time()
+        for _ in range(3):
+            client.jobAdd({})
+        self.assertLess(time.time() - started, 0.5)
+
+    def test_max_in_flight(self):
+        self.server.latency = 0.05
+        client = self.makeClient(throttle = Throttle(max_in_flight = 1))
+        client.whoami()
+        threads = [threading.Thread(target = client.whoami)
+                   for _ in range(4)]
+        started = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.time() - started, 0.19)
+
+    def test_back_off(self):
+        throttle = Throttle()
+        throttle.backOff(0.1)
+        started = time.time()
+        throttle.acquire('GET')
+        throttle.release()
+        self.assertGreaterEqual(time.time() - started, 0.09)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,25 @@
+"""
+Unit tests of VscApiClient.transfer.
+"""
+
+import unittest
+
+from VscApiClient import transfer
+
+
+class ArgumentsTest(unittest.TestCase):
+
+    def test_download(self):
+        for kwargs in ({'attempts': 0}, {'chunk_size': 0},
+                       {'concurrency': 0}):
+            self.assertRaises(ValueError, transfer.download, None,
+                              'image', 'dest', **kwargs)
+
+    def test_upload(self):
+        for kwargs in ({'attempts': 0}, {'chunk_size': -1},
+                       {'concurrency': 0}):
+            self.assertRaises(ValueError, transfer.upload, None,
+                              'image', 'path', **kwargs)
+
+if __name__ == '__main__':
+    unittest.main()